@@ -199,6 +199,46 @@ DEFAULT_MAX_SCORE = 6
 
 # Maximum number of comments to serve per request
 DEFAULT_COMMENT_LIMIT = 300
+# Default and maximum number of question ratings to serve per page
+DEFAULT_RATINGS_PAGE_SIZE = 5000
+MAX_RATINGS_PAGE_SIZE = 50000
+# Default and maximum number of comments returned by a moderator search
+DEFAULT_COMMENT_SEARCH_LIMIT = 50
+MAX_COMMENT_SEARCH_LIMIT = 500
+# Admin changelists with more rows than this show estimated counts
+ADMIN_EXACT_COUNT_THRESHOLD = 10000
+# Seconds an estimated admin changelist count may be stale
+ADMIN_COUNT_CACHE_TIMEOUT = 300
+# Number of rows to fetch per query when exporting data
+EXPORT_CHUNK_SIZE = 2000
+# Selections with more rows than this are exported in the background
+EXPORT_JOB_THRESHOLD = 20000
+# Number of worker processes that run background exports
+EXPORT_WORKER_PROCESSES = 2
+# Days to keep finished background exports before deleting them
+EXPORT_RETENTION_DAYS = 7
+# Seconds a background export may run before it is presumed abandoned and failed
+EXPORT_JOB_TIMEOUT = 6*60*60
+# Seconds a row must age before incremental exports include it
+INCREMENTAL_EXPORT_LAG = 60
+# Seconds the rendered peer responses page (and the summaries it shows) may be stale.
+# Pages cached by other processes are only evicted early if `CACHES` names a backend
+# shared by every process (for instance, memcached)
+PEER_RESPONSES_CACHE_TIMEOUT = 300
+# Seconds before a lock on recomputing question summaries is presumed abandoned
+SUMMARY_REFRESH_LOCK_TIMEOUT = 120
+# Comments whose MinHash signatures agree on at least this fraction of hashes are near-duplicates
+COMMENT_DUPLICATE_THRESHOLD = 0.8
+# Set to `True` to link each new near-duplicate comment to the earliest comment it
+# duplicates, which excludes it from the comments respondents rate
+LINK_DUPLICATE_COMMENTS = False
+# JPEG quality (1 to 95) of the recompressed landing image and bloom icon
+ASSET_JPEG_QUALITY = 80
+# Seconds cached feature phone instructions (and the TwiML built from them) may be
+# stale in processes other than the one that changed them. Without a `CACHES` backend
+# shared by every process (for instance, memcached), changes only reach the other
+# processes once this timeout passes
+INSTRUCTIONS_CACHE_TIMEOUT = 60
 # Default standard error of unrated comment (that is, fewer than two ratings)
 DEFAULT_STANDARD_ERROR = 4.5
 # Set to `True` to enable service workers for offline functionality
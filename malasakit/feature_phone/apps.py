@@ -8,3 +8,11 @@ from django.apps import AppConfig
 class FeaturePhoneConfig(AppConfig):
     name = 'feature_phone'
     verbose_name = 'Feature Phone'
+
+    def ready(self):
+        """
+        Enable behavior defined in :mod:`feature_phone.signals` when the
+        application starts.
+        """
+        # pylint: disable=unused-variable
+        from feature_phone import signals
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.3 on 2026-10-19 02:26
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feature_phone', '0013_auto_20180301_1438'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='respondent',
+            name='timestamp',
+            field=models.DateTimeField(auto_now_add=True, null=True),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.3 on 2026-10-19 03:02
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feature_phone', '0014_respondent_timestamp'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='respondent',
+            name='timestamp',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='response',
+            name='timestamp',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-19 04:23
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+def copy_timestamps(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    for model_name in ['Respondent', 'Response']:
+        model = apps.get_model('feature_phone', model_name)
+        model.objects.using(db_alias).update(modified=models.F('timestamp'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feature_phone', '0016_question_related_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='respondent',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='response',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(copy_timestamps, migrations.RunPython.noop),
+    ]
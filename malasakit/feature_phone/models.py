@@ -15,12 +15,18 @@ References:
 """
 
 from __future__ import unicode_literals
+from collections import OrderedDict
+import os
+import time
+from uuid import uuid4
 
 from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models import Case, Value, When
 from django.utils.translation import ugettext_lazy as _
 
 from pcari.models import LANGUAGE_VALIDATOR, ViewMeta
@@ -85,6 +91,13 @@ class Recording(models.Model):
     recording = models.FileField(upload_to=generate_recording_path)
     text = models.TextField(blank=True, default='')
 
+    @property
+    def media_url(self):
+        """ str: The URL of the recording, or ``None`` if no file was recorded. """
+        if self.recording.name:
+            return os.path.join(settings.MEDIA_URL, self.recording.name)
+        return None
+
     class Meta(ViewMeta):
         abstract = True
 
@@ -115,12 +128,189 @@ class Instructions(Recording):
         unique_together = ('key', 'language')
 
 
+class InstructionsCache(object):
+    """
+    An ``InstructionsCache`` holds the contents of :class:`Instructions` in
+    this process, so webhooks can speak static prompts without querying the
+    database.
+
+    Entries map ``(key, language)`` pairs to ``(media URL, text)`` pairs, or
+    to ``None`` for instructions that do not exist. Saving or deleting
+    instructions (see :mod:`feature_phone.signals`) replaces a version number
+    in the Django cache, and the entries are emptied once a lookup sees a new
+    version. With a cache shared by every process (see ``CACHES``), changes
+    made in one process (for instance, the one serving the admin site) reach
+    the others on their next lookup. With the default ``LocMemCache``, only
+    the process that made the change sees the new version, so entries are
+    also emptied after ``settings.INSTRUCTIONS_CACHE_TIMEOUT`` seconds.
+
+    Attributes:
+        shared_cache: The Django cache holding the version number.
+        entries (dict): The cached entries.
+        version (str): The version number the entries were read under.
+        loaded (float): The time the entries were last emptied, in seconds
+            since the epoch.
+    """
+    VERSION_KEY = 'feature-phone:instructions-version'
+
+    def __init__(self, shared_cache=cache):
+        self.shared_cache = shared_cache
+        self.entries, self.version, self.loaded = {}, None, None
+
+    def get_version(self):
+        """ Return the version number in the Django cache. """
+        version = self.shared_cache.get(self.VERSION_KEY)
+        if version is None:
+            self.shared_cache.add(self.VERSION_KEY, uuid4().hex, None)
+            version = self.shared_cache.get(self.VERSION_KEY)
+        return version
+
+    def get_entries(self):
+        """ Return the entries, after emptying them if the version changed or they expired. """
+        version, now = self.get_version(), time.time()
+        if (version != self.version or self.loaded is None
+                or now - self.loaded > settings.INSTRUCTIONS_CACHE_TIMEOUT):
+            self.entries, self.version, self.loaded = {}, version, now
+        return self.entries
+
+    def get_many(self, keys, language):
+        """
+        Look up instructions by key, querying the database once for all the
+        keys not yet cached.
+
+        Returns:
+            list: A ``(media URL, text)`` pair for each key, in order, or
+            ``None`` for each key without instructions in the language.
+        """
+        entries = self.get_entries()
+        missing = {key for key in keys if (key, language) not in entries}
+        if missing:
+            found = {}
+            instructions = Instructions.objects.filter(key__in=missing, language=language)
+            for instruction in instructions.only('key', 'recording', 'text'):
+                found[instruction.key] = instruction.media_url, instruction.text
+            for key in missing:
+                entries[key, language] = found.get(key)
+        return [entries[key, language] for key in keys]
+
+    def invalidate(self):
+        """ Empty the entries, and those of every process sharing the Django cache. """
+        self.entries = {}
+        self.shared_cache.set(self.VERSION_KEY, uuid4().hex, None)
+
+
+# pylint: disable=invalid-name
+instructions_cache = InstructionsCache()
+
+
+def make_question_key(related_object, language):
+    """ Make the key of the :class:`Question` that asks a web question in a language. """
+    components = [related_object._meta.label_lower.replace('.', '-'),
+                  unicode(related_object.pk), language]
+    return '-'.join(components)
+
+
+def make_batches(items, size):
+    items = list(items)
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+class QuestionManager(models.Manager):
+    """
+    A ``QuestionManager`` keeps feature phone questions in sync with the web
+    questions they ask.
+    """
+    def sync(self, texts, batch_size=500):
+        """
+        Create or update the questions that ask web questions over the phone.
+
+        Questions are matched to web questions by key (see
+        :func:`make_question_key`). Existing questions are fetched, and
+        missing ones created, in batches rather than one at a time. Questions
+        whose text differs are updated with one query per batch.
+
+        Args:
+            texts: An iterable of ``(related_object, language, text)`` tuples,
+                where ``related_object`` is a web question.
+            batch_size (int): The maximum number of questions per query.
+
+        Returns:
+            tuple: The numbers of questions created, updated and unchanged.
+        """
+        questions = OrderedDict()
+        for related_object, language, text in texts:
+            questions[make_question_key(related_object, language), language] = related_object, text
+
+        existing = {}
+        for keys in make_batches({key for key, _ in questions}, batch_size):
+            rows = self.filter(key__in=keys).values_list('key', 'language', 'pk', 'text')
+            existing.update(((key, language), (pk, text)) for key, language, pk, text in rows)
+        changed = [(existing[identifier][0], text)
+                   for identifier, (_, text) in questions.items()
+                   if identifier in existing and existing[identifier][1] != text]
+        missing = OrderedDict((identifier, question) for identifier, question in questions.items()
+                              if identifier not in existing)
+
+        with transaction.atomic(using=self.db):
+            for batch in make_batches(changed, batch_size):
+                instructions = Instructions.objects.using(self.db)
+                instructions = instructions.filter(pk__in=[pk for pk, _ in batch])
+                instructions.update(text=Case(*[When(pk=pk, then=Value(text)) for pk, text in batch],
+                                              output_field=models.TextField()))
+            if missing:
+                self.create_in_bulk(missing, batch_size)
+        if changed or missing:
+            # Bulk updates and inserts do not send ``post_save``
+            instructions_cache.invalidate()
+        return len(missing), len(changed), len(questions) - len(missing) - len(changed)
+
+    def create_in_bulk(self, questions, batch_size):
+        """
+        Create questions from a mapping of ``(key, language)`` pairs to
+        ``(related_object, text)`` pairs.
+
+        ``bulk_create`` rejects models with multi-table inheritance, so the
+        parent :class:`Instructions` are created in bulk, then the rows of the
+        question table are inserted directly.
+        """
+        Instructions.objects.using(self.db).bulk_create([
+            Instructions(key=key, language=language, text=text)
+            for (key, language), (_, text) in questions.items()
+        ], batch_size=batch_size)
+        # Not every backend returns primary keys from ``bulk_create``
+        instruction_ids = {}
+        for keys in make_batches({key for key, _ in questions}, batch_size):
+            rows = Instructions.objects.using(self.db).filter(key__in=keys)
+            instruction_ids.update(((key, language), pk) for key, language, pk
+                                   in rows.values_list('key', 'language', 'pk'))
+
+        connection = connections[self.db]
+        fields = self.model._meta.local_concrete_fields
+        questions = [
+            self.model(instructions_ptr_id=instruction_ids[identifier],
+                       related_object_type=ContentType.objects.get_for_model(related_object),
+                       related_object_id=related_object.pk)
+            for identifier, (related_object, _) in questions.items()
+        ]
+        statement = 'INSERT INTO {0} ({1}) VALUES ({2})'.format(
+            connection.ops.quote_name(self.model._meta.db_table),
+            ', '.join(connection.ops.quote_name(field.column) for field in fields),
+            ', '.join(['%s']*len(fields)))
+        with connection.cursor() as cursor:
+            cursor.executemany(statement, [
+                [field.get_db_prep_save(getattr(question, field.attname), connection)
+                 for field in fields]
+                for question in questions
+            ])
+
+
 class Question(Instructions, RelatedObjectMixin):
     """
     A ``Question`` is a type of Instruction that is specifically spoken to the caller during the
     quantitative and qualitative question part of the call.
     """
     # pylint: disable=model-no-explicit-unicode
+    objects = QuestionManager()
 
     def validate_unique(self, exclude=None):
         super(Question, self).clean()
@@ -138,6 +328,12 @@ class Question(Instructions, RelatedObjectMixin):
                                         'on combined files: %(fields)s'),
                                       {'fields': ', '.join(map(repr, fields))})
 
+    class Meta(ViewMeta):
+        indexes = [
+            models.Index(fields=['related_object_type', 'related_object_id'],
+                         name='feature_phone_q_related_idx'),
+        ]
+
 
 class Response(Recording, RelatedObjectMixin):
     """
@@ -145,13 +341,15 @@ class Response(Recording, RelatedObjectMixin):
 
     Attributes:
         timestamp (datetime.datetime): When this Response was made.
+        modified (datetime.datetime): When this Response was last saved.
         respondent: The Respondent who made this Response.
         url (str): The voice response's Twilio URL.
         prompt_type: The type of the prompt which this Response addressed.
         prompt_id: The ID of the prompt which this Response addressed.
         prompt: The prompt which this Response addressed.
     """
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+    modified = models.DateTimeField(auto_now=True, null=True, db_index=True)
     respondent = models.ForeignKey('Respondent', on_delete=models.CASCADE,
                                    related_name='responses')
     url = models.URLField(blank=True, default='', verbose_name='URL')
@@ -196,6 +394,12 @@ class Respondent(models.Model):
             from :attr:`pcari.models.LANGUAGES`.
         related_object: Ties the respondent with the corresponding database
             object from v1.25
+        timestamp (datetime.datetime): When this respondent called. (This
+            field is ``None`` for respondents created before the field was
+            introduced.)
+        modified (datetime.datetime): When this respondent was last saved.
+            (This field is ``None`` for respondents without a ``timestamp``
+            that were not saved since.)
     """
     call_sid = models.CharField(max_length=64, unique=True)
     age = models.FileField(upload_to='respondent/age/', null=True, blank=True,
@@ -211,10 +415,11 @@ class Respondent(models.Model):
                                           blank=True, default=None,
                                           on_delete=models.CASCADE,
                                           related_name='related_object')
+    timestamp = models.DateTimeField(auto_now_add=True, null=True, db_index=True)
+    modified = models.DateTimeField(auto_now=True, null=True, db_index=True)
 
     def __unicode__(self):
         return 'Respondent {0}'.format(self.pk)
 
-
     class Meta(ViewMeta):
         pass
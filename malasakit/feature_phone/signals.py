@@ -0,0 +1,22 @@
+"""
+This module defines actions that should be taken on special events.
+
+References:
+    * `Django Reference on Signals <https://docs.djangoproject.com/en/dev/topics/signals/>`_
+"""
+
+from __future__ import unicode_literals
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from feature_phone.models import Instructions, Question, instructions_cache
+
+
+@receiver(post_save, sender=Instructions)
+@receiver(post_delete, sender=Instructions)
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def handle_instructions_change(**_):
+    """ Reload cached instructions when any are saved or deleted. """
+    instructions_cache.invalidate()
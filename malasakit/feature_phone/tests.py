@@ -1,3 +1,147 @@
-from django.test import TestCase
+"""
+This module defines unit tests for the feature phone application.
+"""
 
-# Create your tests here.
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import TestCase, Client, RequestFactory
+from django.urls import reverse
+from django.utils import translation
+from twilio.twiml.voice_response import VoiceResponse
+
+from feature_phone.models import Instructions, InstructionsCache, instructions_cache
+from feature_phone.views import PromptGenderView, speak, twiml_cache
+
+IRB_PROMPTS = ['welcome', 'introduction', 'irb-notice', 'irb-notice-prompt']
+
+
+class InstructionsCacheTestCase(TestCase):
+    fixtures = ['en-instructions']
+
+    def setUp(self):
+        instructions_cache.invalidate()
+        translation.activate('en')
+        self.addCleanup(translation.deactivate)
+
+    def speak(self, keys):
+        voice_response = VoiceResponse()
+        speak(voice_response, keys)
+        return unicode(voice_response)
+
+    def test_static_prompts_make_no_queries(self):
+        with self.assertNumQueries(1):
+            twiml = self.speak(IRB_PROMPTS)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.speak(IRB_PROMPTS), twiml)
+        self.assertIn('Welcome to Malasakit.', twiml)
+
+        client = Client()
+        url = reverse('feature-phone:prompt-gender')
+        client.post(url)
+        with self.assertNumQueries(0):
+            response = client.post(url)
+        self.assertContains(response, '<Say>')
+
+    def test_invalidated_on_save(self):
+        self.speak(IRB_PROMPTS)
+        welcome = Instructions.objects.get(key='welcome', language='en')
+        welcome.text = 'Maligayang pagdating.'
+        welcome.save()
+        self.assertIn('Maligayang pagdating.', self.speak(['welcome']))
+
+        welcome.delete()
+        self.assertEqual(self.speak(['welcome']), self.speak([]))
+
+    def test_missing_instructions(self):
+        self.assertEqual(self.speak(['welcome', 'no-such-key']), self.speak([]))
+        with self.assertNumQueries(0):
+            self.speak(['no-such-key'])
+        Instructions.objects.create(key='no-such-key', language='en', text='Found.')
+        self.assertIn('Found.', self.speak(['no-such-key']))
+
+    def test_languages_cached_separately(self):
+        Instructions.objects.create(key='welcome', language='tl', text='Mabuhay.')
+        self.assertIn('Welcome to Malasakit.', self.speak(['welcome']))
+        with translation.override('tl'):
+            self.assertIn('Mabuhay.', self.speak(['welcome']))
+
+    def change_welcome(self, text):
+        # Updates do not send ``post_save``, like a change made in another process
+        Instructions.objects.filter(key='welcome', language='en').update(text=text)
+
+    def test_invalidated_across_processes(self):
+        shared_cache = LocMemCache('shared', {})
+        admin, worker = InstructionsCache(shared_cache), InstructionsCache(shared_cache)
+        self.assertEqual(worker.get_many(['welcome'], 'en'), [(None, 'Welcome to Malasakit.')])
+        self.change_welcome('Mabuhay.')
+        self.assertEqual(worker.get_many(['welcome'], 'en'), [(None, 'Welcome to Malasakit.')])
+        admin.invalidate()
+        self.assertEqual(worker.get_many(['welcome'], 'en'), [(None, 'Mabuhay.')])
+
+    def test_entries_expire_without_shared_cache(self):
+        admin = InstructionsCache(LocMemCache('admin', {}))
+        worker = InstructionsCache(LocMemCache('worker', {}))
+        worker.get_many(['welcome'], 'en')
+        self.change_welcome('Mabuhay.')
+        admin.invalidate()
+        self.assertEqual(worker.get_many(['welcome'], 'en'), [(None, 'Welcome to Malasakit.')])
+        worker.loaded -= settings.INSTRUCTIONS_CACHE_TIMEOUT + 1
+        self.assertEqual(worker.get_many(['welcome'], 'en'), [(None, 'Mabuhay.')])
+
+
+class TwimlCacheTestCase(TestCase):
+    fixtures = ['en-instructions']
+
+    def setUp(self):
+        instructions_cache.invalidate()
+        self.client = Client()
+
+    def post(self, name):
+        response = self.client.post(reverse(name))
+        self.assertEqual(response.status_code, 200)
+        return response.content
+
+    def test_static_prompts_cached(self):
+        for name in ['prompt-gender', 'prompt-age', 'prompt-barangay']:
+            twiml = self.post('feature-phone:' + name)
+            with self.assertNumQueries(0):
+                self.assertEqual(self.post('feature-phone:' + name), twiml)
+        twiml = self.post('feature-phone:end')
+        self.assertIn(b'<Hangup />', twiml)
+        self.assertEqual(self.post('feature-phone:end'), twiml)
+
+    def test_session_still_initialized(self):
+        self.post('feature-phone:quantitative-question-instructions')
+        session = self.client.session
+        session['index'] = 3
+        session.save()
+        twiml = self.post('feature-phone:quantitative-question-instructions')
+        self.assertIn(b'feature-phone/quantitative-questions/prompt/', twiml)
+        self.assertEqual(self.client.session['index'], 0)
+        self.assertEqual(self.client.session['obj-keys'], [])
+
+    def test_invalidated_on_save(self):
+        self.post('feature-phone:prompt-gender')
+        gender_prompt = Instructions.objects.get(key='gender-prompt', language='en')
+        gender_prompt.text = 'Pindutin ang isa.'
+        gender_prompt.save()
+        self.assertIn(b'Pindutin ang isa.', self.post('feature-phone:prompt-gender'))
+
+    def test_languages_cached_separately(self):
+        Instructions.objects.create(key='gender-prompt', language='tl', text='Kasarian?')
+        self.assertNotIn(b'Kasarian?', self.post('feature-phone:prompt-gender'))
+        view = PromptGenderView.as_view()
+        with translation.override('tl'):
+            twiml = view(RequestFactory().post(reverse('feature-phone:prompt-gender'))).content
+        self.assertIn(b'Kasarian?', twiml)
+        self.assertIn(b'/tl/feature-phone/gender/save/', twiml)
+
+    def test_incomplete_prompts_not_cached(self):
+        Instructions.objects.filter(key='gender-prompt').update(key='renamed')
+        instructions_cache.invalidate()
+        self.assertNotIn(b'<Say>', self.post('feature-phone:prompt-gender'))
+        self.assertNotIn(('PromptGenderView', 'en'), twiml_cache.entries)
+        self.post('feature-phone:prompt-age')
+        self.assertIn(('PromptAgeView', 'en'), twiml_cache.entries)
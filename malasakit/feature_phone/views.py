@@ -23,11 +23,12 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 from django.urls import reverse
 from django.utils.decorators import method_decorator
+from django.utils.encoding import force_bytes
 from django.utils.translation import get_language
 import numpy as np
 from twilio.twiml.voice_response import VoiceResponse, Gather
 
-from feature_phone.models import Respondent, Question, Response, Instructions
+from feature_phone.models import Respondent, Question, Response, instructions_cache
 from pcari import models as web_models
 
 REPEAT_DIGIT = '*'
@@ -35,6 +36,21 @@ SKIP_DIGIT = '#'
 LOGGER = logging.getLogger('pcari')
 
 
+def play(action, url, text):
+    """
+    Play a voice recording from a file, or speak its text if there is no file.
+
+    Arguments:
+        action: A Twilio object that supports `Say` and `Play` verbs.
+        url (str): The URL of the recording file, or `None`.
+        text (str): The text of the recording.
+    """
+    if url:
+        action.play(url)
+    elif text:
+        action.say(text)
+
+
 def play_recording(action, recording):
     """
     Play a voice recording, either from a file or using speech synthesis.
@@ -43,37 +59,84 @@ def play_recording(action, recording):
         action: A Twilio object that supports `Say` and `Play` verbs.
         recording: A `Recording` instance.
     """
-    if recording.recording.name:
-        url = os.path.join(settings.MEDIA_URL, recording.recording.name)
-        action.play(url)
-    elif recording.text:
-        action.say(recording.text)
+    play(action, recording.media_url, recording.text)
 
 
 def speak(action, instruction_keys, pause_duration=0):
     """
     Play a list of instructions.
 
+    Instructions are read from :data:`feature_phone.models.instructions_cache`,
+    so prompts spoken before (in this process) make no queries.
+
     Arguments:
         action: A Twilio object that supports `Say`, `Play`, and `Pause` verbs.
         instruction_keys (list): A list of instruction keys.
         pause_duration (float): The delay between instructions in seconds.
 
+    Returns:
+        bool: Whether every instruction was found (otherwise, none are played).
+
     Note:
         To minimize possibly unwanted latency, a pause does not follow the last
         instruction spoken.
     """
-    try:
-        instructions = [Instructions.objects.get(key=key, language=get_language())
-                        for key in instruction_keys]
-    except Instructions.DoesNotExist:
+    instructions = instructions_cache.get_many(instruction_keys, get_language())
+    if None in instructions:
         LOGGER.warn('Could not play all instructions: %s', repr(instruction_keys))
-        return
+        return False
 
-    for index, instruction in enumerate(instructions):
-        play_recording(action, instruction)
+    for index, (url, text) in enumerate(instructions):
+        play(action, url, text)
         if index < len(instructions) - 1 and pause_duration > 0:
             action.pause(pause_duration)
+    return True
+
+
+class TwimlCache(object):
+    """
+    A ``TwimlCache`` holds the TwiML of responses that depend only on the
+    language and on instructions (for instance, static prompts), serialized
+    to bytes, so those webhooks skip both the ORM and the TwiML builder.
+
+    Since the TwiML embeds the text and recordings of instructions, entries
+    are dropped whenever :data:`feature_phone.models.instructions_cache`
+    empties its entries (when instructions change, or its entries expire).
+
+    Attributes:
+        entries (dict): Maps ``(name, language)`` pairs to TwiML bytes.
+        instructions (dict): The instructions cache entries the TwiML was
+            rendered from.
+    """
+    def __init__(self):
+        self.entries, self.instructions = {}, None
+
+    def get(self, name, render):
+        """
+        Get the TwiML of a response in the current language.
+
+        Args:
+            name (str): The name of the response.
+            render: A function that accepts no arguments and returns the
+                TwiML bytes and whether every instruction was found. Only
+                complete responses are cached, so missing instructions are
+                looked up again on the next call.
+        """
+        instructions = instructions_cache.get_entries()
+        if instructions is not self.instructions:
+            self.entries, self.instructions = {}, instructions
+        key = name, get_language()
+        entries = self.entries
+        if key in entries:
+            return entries[key]
+        twiml, complete = render()
+        if complete:
+            entries[key] = twiml
+        return twiml
+
+
+# pylint: disable=invalid-name
+twiml_cache = TwimlCache()
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -99,6 +162,10 @@ class PromptView(View):
             may take.
         recording_callback (str): The name of the view that will handle actions
             made after Twilio finalizes the recording.
+        cache_twiml (bool): A flag that determines whether the TwiML of this
+            view is served from :data:`twiml_cache`. Only views whose
+            :meth:`ask` depends on nothing but the language and instructions
+            may set this flag.
 
     Note:
         Keypresses made while a prompt plays will interrupt the playback, while
@@ -113,30 +180,36 @@ class PromptView(View):
     play_beep = True
     recording_max_duration = 60
     recording_callback = None
+    cache_twiml = False
     http_method_names = ['post']
 
     def ask(self, request, action):
+        """ Speak the prompts, and return whether every instruction was found. """
         # pylint: disable=unused-argument
-        if self.prompts:
-            speak(action, self.prompts)
-        else:
+        if not self.prompts:
             raise NotImplementedError
+        return speak(action, self.prompts)
 
     def fallback(self, voice_response):
         pass
 
-    def post(self, request):
-        """ Serve the Twilio client directions for collecting input. """
+    def render(self, request):
+        """
+        Build the Twilio client directions for collecting input.
+
+        Returns:
+            tuple: The TwiML bytes, and whether :meth:`ask` found every instruction.
+        """
         voice_response = VoiceResponse()
         if self.accept_keypress:
             keypress_timeout = 0 if self.accept_speech else self.timeout
             gather = Gather(input='dtmf', action=reverse(self.submit_view),
                             finish_on_key='', timeout=keypress_timeout,
                             num_digits=1)
-            self.ask(request, gather)
+            complete = self.ask(request, gather)
             voice_response.append(gather)
         else:
-            self.ask(request, voice_response)
+            complete = self.ask(request, voice_response)
         if self.accept_speech:
             end_keys = SKIP_DIGIT + REPEAT_DIGIT + digits if self.accept_keypress else ''
             voice_response.record(action=reverse(self.submit_view),
@@ -146,7 +219,15 @@ class PromptView(View):
                                   finish_on_key=end_keys)
         self.fallback(voice_response)
         voice_response.redirect(reverse(self.submit_view))
-        return HttpResponse(voice_response, content_type='application/xml')
+        return force_bytes(voice_response), complete
+
+    def post(self, request):
+        """ Serve the Twilio client directions for collecting input. """
+        if self.cache_twiml:
+            twiml = twiml_cache.get(type(self).__name__, lambda: self.render(request))
+        else:
+            twiml, _ = self.render(request)
+        return HttpResponse(twiml, content_type='application/xml')
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -178,6 +259,7 @@ class PromptIRBNoticeView(PromptView):
     prompts = ['welcome', 'introduction', 'irb-notice', 'irb-notice-prompt']
     accept_keypress = True
     accept_speech = False
+    cache_twiml = True
 
     def post(self, request):
         related_object = web_models.Respondent.objects.create()
@@ -214,6 +296,7 @@ class PromptGenderView(PromptView):
     prompts = ['gender-prompt']
     accept_keypress = True
     accept_speech = False
+    cache_twiml = True
 
 
 class SaveGenderView(SaveView):
@@ -242,6 +325,7 @@ class PromptAgeView(PromptView):
     accept_keypress = False
     accept_speech = True
     recording_callback = 'feature-phone:download-age'
+    cache_twiml = True
 
 
 @csrf_exempt
@@ -265,6 +349,7 @@ class PromptBarangayView(PromptView):
     accept_keypress = False
     accept_speech = True
     recording_callback = 'feature-phone:download-barangay'
+    cache_twiml = True
 
 
 @csrf_exempt
@@ -288,12 +373,13 @@ class QuantiativeQuestionInstructionsView(PromptView):
     accept_speech = False
     timeout = 0
     prompts = ['quantitative-question-instructions', 'quantitative-question-reminder']
+    cache_twiml = True
 
-    def ask(self, request, action):
-        speak(action, self.prompts)
+    def post(self, request):
         request.session['index'] = 0
         question_type = ContentType.objects.get_for_model(web_models.QuantitativeQuestion)
         request.session['obj-keys'] = fetch_question_pks(question_type)
+        return super(QuantiativeQuestionInstructionsView, self).post(request)
 
 
 class PromptQuantitativeQuestionView(PromptView):
@@ -360,6 +446,7 @@ class CommentRatingInstructions(PromptView):
     accept_speech = False
     timeout = 0
     prompts = ['comment-rating-instructions']
+    cache_twiml = True
 
     def post(self, request):
         try:
@@ -474,10 +561,15 @@ def end(request):
         if key in request.session:
             del request.session[key]
 
+    return HttpResponse(twiml_cache.get('end', render_end), content_type='application/xml')
+
+
+def render_end():
+    """ Build the TwiML that thanks the listener and hangs up (see :meth:`TwimlCache.get`). """
     voice_response = VoiceResponse()
-    speak(voice_response, ['end'])
+    complete = speak(voice_response, ['end'])
     voice_response.hangup()
-    return HttpResponse(voice_response, content_type='application/xml')
+    return force_bytes(voice_response), complete
 
 
 def select_comment_pks(num_to_select=2):
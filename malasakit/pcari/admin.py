@@ -7,9 +7,9 @@ References:
 """
 
 from __future__ import unicode_literals
-from base64 import b64encode
 from collections import OrderedDict
-import json
+import hashlib
+import mimetypes
 import os
 
 from django.conf import settings
@@ -17,21 +17,34 @@ from django.conf.urls import url
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin, GroupAdmin
 from django.contrib.auth.models import User, Group
-from django.contrib.contenttypes.models import ContentType
-from django.core.files.base import ContentFile
-from django.core.files.storage import default_storage
-from django.shortcuts import redirect, reverse, render
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Prefetch, QuerySet
+from django.http import FileResponse, HttpResponseBadRequest, JsonResponse
+from django.shortcuts import get_object_or_404, redirect, reverse, render
+from django.utils import timezone
+from django.utils.functional import cached_property
+from django.utils.html import format_html
 from django.views.decorators.http import require_POST
 
+from pcari.assets import save_image_asset
 from pcari.models import QualitativeQuestion, Comment, CommentRating
 from pcari.models import OptionQuestion, OptionQuestionChoice
 from pcari.models import QuantitativeQuestionRating, QuantitativeQuestion
-from pcari.models import Location, Respondent
-from pcari.views import export_data, translate
+from pcari.models import Location, Respondent, ExportJob
+from pcari.exports import export_data, export_ratings_matrix, export_wide_data
+from pcari.exports import export_snapshot_data, export_pivoted_data, queue_export_job
+from pcari.exports import INCREMENTAL_EXPORT_MODELS, export_incremental_data
+from pcari.exports import WIDE_EXPORT_MODELS, SNAPSHOT_MODELS
+from pcari.search import filter_comments, search_comments
+from pcari.views import fetch_response_throughput, translate
 from feature_phone import models as phone_models
 
 __all__ = [
     'MalasakitAdminSite',
+    'EstimatedCountPaginator',
     'QuantitativeQuestionAdmin',
     'QuantitativeQuestionRatingAdmin',
     'QualitativeQuestionAdmin',
@@ -41,9 +54,18 @@ __all__ = [
     'OptionQuestionChoiceAdmin',
     'LocationAdmin',
     'RespondentAdmin',
+    'ExportJobAdmin',
 ]
 
 
+# Models whose rows the ratings matrix reveals
+RATINGS_MATRIX_MODELS = (QuantitativeQuestionRating, CommentRating)
+# Models whose rows the wide export reveals (responses are joined with their respondents)
+WIDE_EXPORT_PERMISSION_MODELS = (Respondent, ) + WIDE_EXPORT_MODELS
+# Models whose rows the pivoted export reveals
+PIVOTED_EXPORT_MODELS = (Respondent, QuantitativeQuestionRating, OptionQuestionChoice)
+
+
 class MalasakitAdminSite(admin.AdminSite):
     """
     A custom admin site for Malasakit with augmented configuration and
@@ -58,6 +80,22 @@ class MalasakitAdminSite(admin.AdminSite):
                 name='configuration'),
             url(r'^statistics/$', self.admin_view(self.statistics),
                 name='statistics'),
+            url(r'^statistics/response-throughput/$',
+                self.admin_view(fetch_response_throughput),
+                name='response-throughput'),
+            url(r'^statistics/ratings-matrix/$', self.admin_view(self.download_ratings_matrix),
+                name='ratings-matrix'),
+            url(r'^statistics/wide-export/$', self.admin_view(self.download_wide_export),
+                name='wide-export'),
+            url(r'^statistics/pivoted-export/$', self.admin_view(self.download_pivoted_export),
+                name='pivoted-export'),
+            url(r'^statistics/snapshot/$', self.admin_view(self.download_snapshot),
+                name='snapshot'),
+            url(r'^statistics/incremental-export/$',
+                self.admin_view(self.download_incremental_export),
+                name='incremental-export'),
+            url(r'^comment-search/$', self.admin_view(self.search_comments),
+                name='comment-search'),
             url(r'^change-landing-image/$',
                 self.admin_view(require_POST(self.change_landing_image)),
                 name='change-landing-image'),
@@ -78,42 +116,127 @@ class MalasakitAdminSite(admin.AdminSite):
         """ Render a statistics page. """
         return render(request, 'admin/statistics.html', self.each_context(request))
 
-    def change_landing_image(self, request):
-        """ Save an image file as the landing page image. """
-        # pylint: disable=no-self-use
-        uploaded_file = request.FILES['landing-image']
-        img_dir = os.path.join(settings.STATIC_ROOT, 'img')
-        if not os.path.exists(img_dir):
-            os.mkdir(img_dir)
+    def has_export_permission(self, request, models_to_export):
+        """
+        Return true if the user of a request may see every model in an
+        export, that is, if the user has "change" or "view" permissions on
+        each of them. Exports bypass the changelists of the models they read,
+        so they are not otherwise restricted to users who could see the rows.
+        """
+        return all(model in self._registry
+                   and self._registry[model].has_change_permission(request)
+                   for model in models_to_export)
+
+    def download_ratings_matrix(self, request):
+        """ Download the ratings matrix as a NumPy file. """
+        if not self.has_export_permission(request, RATINGS_MATRIX_MODELS):
+            raise PermissionDenied
+        return export_ratings_matrix(request.GET.get('format', 'npz'))
+
+    def download_wide_export(self, request):
+        """ Download every response, joined with its respondent and question, as a CSV file. """
+        if not self.has_export_permission(request, WIDE_EXPORT_PERMISSION_MODELS):
+            raise PermissionDenied
+        return export_wide_data()
+
+    def download_pivoted_export(self, request):
+        """ Download every respondent's answers, one column per question, as a CSV file. """
+        if not self.has_export_permission(request, PIVOTED_EXPORT_MODELS):
+            raise PermissionDenied
+        return export_pivoted_data()
+
+    def download_snapshot(self, request):
+        """ Download every table as a ZIP archive of CSV files. """
+        if not self.has_export_permission(request, SNAPSHOT_MODELS):
+            raise PermissionDenied
+        return export_snapshot_data()
+
+    def download_incremental_export(self, request):
+        """
+        Download the rows of a model created after a cursor (see
+        :func:`pcari.exports.export_incremental`).
+
+        Query parameters:
+            model: A lowercase model label (for instance, ``pcari.comment``).
+            cursor: The ``X-Next-Cursor`` header of the previous export.
+            format: Either ``csv`` (default) or ``jsonl``.
+            limit: The maximum number of rows to export (optional).
+        """
+        label = request.GET.get('model', '').lower()
+        if label not in INCREMENTAL_EXPORT_MODELS:
+            return HttpResponseBadRequest('no such model "{0}"'.format(label))
+        if not self.has_export_permission(request, [INCREMENTAL_EXPORT_MODELS[label]]):
+            raise PermissionDenied
+        try:
+            limit = int(request.GET['limit']) if 'limit' in request.GET else None
+        except ValueError:
+            return HttpResponseBadRequest('limit must be an integer')
+        if limit is not None and limit <= 0:
+            return HttpResponseBadRequest('limit must be positive')
+        return export_incremental_data(INCREMENTAL_EXPORT_MODELS[label],
+                                       request.GET.get('cursor', ''),
+                                       request.GET.get('format', 'csv'), limit)
+
+    def search_comments(self, request):
+        """
+        Search comments as JSON, from the best match to the worst (see
+        :func:`pcari.search.search_comments`).
+
+        Query parameters:
+            q: The text to search for.
+            limit: The maximum number of comments to return.
+
+        Returns:
+            A ``JsonResponse`` containing a JSON object of the form::
+
+                {
+                    "results": [
+                        {
+                            "id": <comment.id>,
+                            "msg": "<comment.message>",
+                            "tag": "<comment.tag>",
+                            "qid": <comment.question_id>,
+                            "language": "<comment.language>",
+                            "flagged": <comment.flagged>,
+                            "rank": <relevance>
+                        },
+                        ...
+                    ]
+                }
 
-        destination = os.path.join(img_dir, 'landing')
-        default_storage.delete(destination)
-        default_storage.save(destination, ContentFile(uploaded_file.read()))
+            Higher ranks are better matches. Ranks are ``null`` if the
+            database does not support full-text search.
+        """
+        if not self.has_export_permission(request, [Comment]):
+            raise PermissionDenied
+        try:
+            limit = int(request.GET.get('limit', settings.DEFAULT_COMMENT_SEARCH_LIMIT))
+        except ValueError as error:
+            return HttpResponseBadRequest(unicode(error))
+        limit = max(1, min(limit, settings.MAX_COMMENT_SEARCH_LIMIT))
+        results = search_comments(request.GET.get('q', ''), limit)
+        return JsonResponse({
+            'results': [{
+                'id': comment.id,
+                'msg': comment.message,
+                'tag': comment.tag,
+                'qid': comment.question_id,
+                'language': comment.language,
+                'flagged': comment.flagged,
+                'rank': rank,
+            } for comment, rank in results],
+        })
 
-        request.session['messages'] = ['Successfully changed landing image.']
-        return redirect(reverse('admin:configuration'))
+    def change_landing_image(self, request):
+        """ Process an image file into variants of the landing page image. """
+        # pylint: disable=no-self-use
+        return save_uploaded_asset(request, 'landing-image',
+                                   'Successfully changed landing image.')
 
     def change_bloom_icon(self, request):
-        """ Save an image file as a custom bloom icon. """
+        """ Process an image file into variants of a custom bloom icon. """
         # pylint: disable=no-self-use
-        uploaded_file = request.FILES['bloom-icon']
-        image_data = b64encode(uploaded_file.read())
-        content_type = uploaded_file.content_type
-
-        parent_dir = os.path.join(settings.STATIC_ROOT, 'data')
-        if not os.path.exists(parent_dir):
-            os.mkdir(parent_dir)
-
-        path = os.path.join(parent_dir, 'bloom-icon.json')
-        with open(path, 'wb+') as destination:
-            obj = {
-                'content-type': content_type,
-                'encoded-image': image_data,
-            }
-            json.dump(obj, destination)
-
-        request.session['messages'] = ['Successfully uploaded bloom icon.']
-        return redirect(reverse('admin:configuration'))
+        return save_uploaded_asset(request, 'bloom-icon', 'Successfully uploaded bloom icon.')
 
     def filter_actions(self, model, action_names=None):
         """
@@ -146,10 +269,50 @@ site.register(Group, GroupAdmin)
 site.filter_actions(Group, ['delete_selected'])
 
 
+def save_uploaded_asset(request, name, success_message):
+    """ Process the file uploaded under an asset's name, then return to the configuration page. """
+    uploaded_file = request.FILES.get(name)
+    if uploaded_file is None:
+        request.session['messages'] = ['No file was uploaded.']
+    else:
+        try:
+            save_image_asset(name, uploaded_file.read())
+        except ValueError as error:
+            request.session['messages'] = ['Could not process image: {0}.'.format(error)]
+        else:
+            request.session['messages'] = [success_message]
+    return redirect(reverse('admin:configuration'))
+
+
+def get_viewable_model_names(request):
+    """
+    Find the names of the models the user of a request has "view" permissions
+    on (for instance, ``respondent`` for ``pcari.view_respondent``).
+
+    Django checks permissions many times per changelist, so the names are
+    resolved once per request and user, then cached on the request.
+
+    Returns:
+        frozenset: Lowercase model names, without app labels.
+    """
+    user = request.user
+    cached = getattr(request, '_viewable_model_names', None)
+    if cached is None or cached[0] != user.pk:
+        codenames = (perm.split('.', 1)[1] for perm in user.get_all_permissions())
+        names = frozenset(codename[len('view_'):] for codename in codenames
+                          if codename.startswith('view_'))
+        cached = request._viewable_model_names = (user.pk, names)
+    return cached[1]
+
+
 class AdminViewMixin(admin.ModelAdmin):
     """
     Super class for admins to implement 'view' permissions.
     """
+    def has_view_permission(self, request):
+        """ Return true if the user has "view" permissions on this model. """
+        return self.model.__name__.lower() in get_viewable_model_names(request)
+
     def has_change_permission(self, request, obj=None):
         """
         Django calls this to determine if a user can see objects in the admin
@@ -159,10 +322,7 @@ class AdminViewMixin(admin.ModelAdmin):
         """
         if super(AdminViewMixin, self).has_change_permission(request, obj):
             return True
-        for perm in request.user.get_all_permissions():
-            if 'view_' + self.model.__name__.lower() == perm.split('.')[1]:
-                return True
-        return False
+        return self.has_view_permission(request)
 
     def get_readonly_fields(self, request, obj=None):
         """
@@ -173,18 +333,96 @@ class AdminViewMixin(admin.ModelAdmin):
         """
         if super(AdminViewMixin, self).has_change_permission(request, obj):
             return self.readonly_fields
-        for perm in request.user.get_all_permissions():
-            if 'view_' + self.model.__name__.lower() == perm.split('.')[1]:
-                return [field.name for field in self.opts.local_fields]
+        if self.has_view_permission(request):
+            return [field.name for field in self.opts.local_fields]
         return self.readonly_fields
 
 
+def estimate_table_rows(model, using='default'):
+    """
+    Estimate the number of rows in a model's table from the statistics the
+    database keeps for its query planner, without scanning the table.
+
+    Returns:
+        int: The estimate, or ``None`` if the database has no statistics (for
+        instance, SQLite before ``ANALYZE`` first runs).
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' "
+                           "AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            # The first number of each entry is the approximate number of rows
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [table])
+            row = cursor.fetchone()
+            return int(row[0].split()[0]) if row is not None else None
+        elif connection.vendor == 'mysql':
+            cursor.execute('SELECT TABLE_ROWS FROM information_schema.TABLES '
+                           'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s', [table])
+            row = cursor.fetchone()
+            return int(row[0]) if row is not None and row[0] is not None else None
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    A paginator for changelists of large tables, where an exact ``COUNT(*)``
+    takes seconds (on InnoDB, or over annotated ``QuerySet``s that must be
+    grouped before counting).
+
+    The paginator fetches the primary keys of at most
+    ``settings.ADMIN_EXACT_COUNT_THRESHOLD + 1`` objects. Smaller result sets
+    are counted exactly. Larger ones are estimated from table statistics, if
+    the ``QuerySet`` is unfiltered and the database keeps statistics, or else
+    counted once and cached for ``settings.ADMIN_COUNT_CACHE_TIMEOUT`` seconds.
+    Estimates may lag the true count, so the last pages may be missing or
+    empty.
+    """
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super(EstimatedCountPaginator, self).count
+        threshold = settings.ADMIN_EXACT_COUNT_THRESHOLD
+        primary_keys = queryset.order_by().values_list('pk', flat=True)
+        num_objects = len(primary_keys[:threshold + 1])
+        if num_objects <= threshold:
+            return num_objects
+
+        estimate = None
+        if not queryset.query.has_filters():
+            estimate = estimate_table_rows(queryset.model, queryset.db)
+        if estimate is None:
+            sql, params = primary_keys.query.sql_with_params()
+            query_hash = hashlib.md5(repr((queryset.db, sql, params)).encode('utf-8'))
+            key = 'admin-count-{0}'.format(query_hash.hexdigest())
+            estimate = cache.get(key)
+            if estimate is None:
+                estimate = primary_keys.count()
+                cache.set(key, estimate, settings.ADMIN_COUNT_CACHE_TIMEOUT)
+        return max(estimate, num_objects)
+
+
 class ResponseAdmin(AdminViewMixin):
     """
     Base admin behavior for :class:`pcari.models.Response` models.
     """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '(Empty)'
     ordering = ('-timestamp',)
+    actions = ['export_selected_as_wide_csv']
+    list_select_related = ('respondent', )
+
+    def export_selected_as_wide_csv(self, request, queryset):
+        """ Export the selected responses joined with their respondents and questions. """
+        if queryset.count() > settings.EXPORT_JOB_THRESHOLD:
+            return export_in_background(self, request, queryset, 'wide')
+        return export_wide_data([queryset])
+    export_selected_as_wide_csv.short_description = 'Export selected responses as wide CSV'
 
 
 @admin.register(CommentRating, site=site)
@@ -206,6 +444,7 @@ class CommentRatingAdmin(ResponseAdmin):
     list_display = ('respondent', 'get_comment_message', 'get_score', 'timestamp')
     list_display_links = ('get_comment_message',)
     list_filter = ('timestamp', )
+    list_select_related = ('respondent', 'comment')
     readonly_fields = ('timestamp', )
     search_fields = ('score', 'comment__message')
 
@@ -243,14 +482,22 @@ class CommentAdmin(ResponseAdmin):
                     'display_mean_score', 'display_wilson_score')
     list_display_links = ('display_message',)
     list_filter = ('timestamp', 'language', 'flagged', 'tag')
-    search_fields = ('message', 'tag')
-    actions = ('flag_comments', 'unflag_comments')
+    # Only shows the search box; searches go through ``get_search_results``
+    search_fields = ('message', )
+    actions = ('flag_comments', 'unflag_comments', 'export_selected_as_wide_csv')
+
+    def get_search_results(self, request, queryset, search_term):
+        """ Search messages and tags with the full-text index (see :mod:`pcari.search`). """
+        # pylint: disable=unused-argument
+        if not search_term.strip():
+            return queryset, False
+        return filter_comments(queryset, search_term), False
 
     def flag_comments(self, request, queryset):
         """
         Flag selected comments in bulk and inform the user how many were flagged.
         """
-        num_flagged = queryset.update(flagged=True)
+        num_flagged = queryset.update(flagged=True, modified=timezone.now())
         message = '{0} comment{1} successfully flagged.'
         message = message.format(num_flagged, 's' if num_flagged != 1 else '')
         self.message_user(request, message)
@@ -259,7 +506,7 @@ class CommentAdmin(ResponseAdmin):
         """
         Unflag selected comments in bulk and inform how many were unflagged.
         """
-        num_unflagged = queryset.update(flagged=False)
+        num_unflagged = queryset.update(flagged=False, modified=timezone.now())
         message = '{0} comment{1} successfully unflagged.'
         message = message.format(num_unflagged, 's' if num_unflagged != 1 else '')
         self.message_user(request, message)
@@ -272,6 +519,7 @@ class QuantitativeQuestionRatingAdmin(ResponseAdmin):
     """
     def question_prompt(self, rating):
         return rating.question.prompt.strip() or self.empty_value_display
+    question_prompt.admin_order_field = 'question__prompt'
 
     def get_score(self, rating):
         # pylint: disable=no-self-use
@@ -282,8 +530,9 @@ class QuantitativeQuestionRatingAdmin(ResponseAdmin):
     list_display = ('respondent', 'question_prompt', 'timestamp', 'get_score')
     list_display_links = ('question_prompt', )
     list_filter = ('timestamp', )
+    list_select_related = ('respondent', 'question')
     readonly_fields = ('timestamp', )
-    search_fields = ('question_prompt', 'score')
+    search_fields = ('question__prompt', 'score')
 
 
 @admin.register(OptionQuestionChoice, site=site)
@@ -293,6 +542,7 @@ class OptionQuestionChoiceAdmin(ResponseAdmin):
     """
     def question_prompt(self, choice):
         return choice.question.prompt.strip() or self.empty_value_display
+    question_prompt.admin_order_field = 'question__prompt'
 
     def option_display(self, choice):
         return choice.option or self.empty_value_display
@@ -301,28 +551,24 @@ class OptionQuestionChoiceAdmin(ResponseAdmin):
     list_display = ('respondent', 'question_prompt', 'timestamp', 'option_display')
     list_display_links = ('question_prompt', )
     list_filter = ('timestamp', )
-    search_fields = ('question_prompt', 'option')
+    list_select_related = ('respondent', 'question')
+    search_fields = ('question__prompt', 'option')
 
 
 def export_to_feature_phone(modeladmin, request, queryset):
-    """ Export the selected questions to the feature phone application. """
-    # pylint: disable=unused-argument
-    for question in queryset:
-        for language, _ in settings.LANGUAGES:
-            components = [question._meta.label_lower.replace('.', '-'),
-                          unicode(question.pk), language]
-            phone_models.Question.objects.get_or_create(
-                key='-'.join(components),
-                defaults={
-                    'text': translate(question.prompt, language),
-                    'language': language,
-                    'related_object_type': ContentType.objects.get_for_model(question),
-                    'related_object': question,
-                }
-            )
-    message = 'Successfully copied {} question{}.'
-    count = queryset.count()
-    modeladmin.message_user(request, message.format(count, 's' if count > 1 else ''))
+    """
+    Export the selected questions to the feature phone application, in every
+    language, and update the text of questions already exported.
+    """
+    questions = list(queryset)
+    texts = [(question, language, translate(question.prompt, language))
+             for question in questions for language, _ in settings.LANGUAGES]
+    created, updated, unchanged = phone_models.Question.objects.sync(texts)
+    message = ('Successfully copied {0} question{1} ({2} created, {3} updated, '
+               '{4} unchanged).')
+    count = len(questions)
+    modeladmin.message_user(request, message.format(count, 's' if count != 1 else '',
+                                                    created, updated, unchanged))
 export_to_feature_phone.short_description = 'Use questions for feature phone'
 
 
@@ -445,6 +691,15 @@ class RespondentAdmin(AdminViewMixin):
         comments = list(respondent.comments)
         return '(No comments)' if not comments else ''.join(map(unicode, comments))
 
+    def get_queryset(self, request):
+        """ Fetch each page of respondents with a constant number of queries. """
+        queryset = super(RespondentAdmin, self).get_queryset(request)
+        # The base manager skips the rating statistics, which are not displayed
+        comments = Prefetch('comment_set', queryset=Comment._base_manager.order_by('pk'))
+        return queryset.annotate_progress().select_related('location').prefetch_related(comments)
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '(Empty)'
     list_display = ('id', 'comments', 'age', 'gender', 'display_location',
                     'language', 'num_questions_rated', 'num_comments_rated')
@@ -453,9 +708,70 @@ class RespondentAdmin(AdminViewMixin):
                      'submitted_personal_data', 'completed_survey')
 
 
+@admin.register(ExportJob, site=site)
+class ExportJobAdmin(AdminViewMixin):
+    """
+    Admin behavior for :class:`pcari.models.ExportJob`, which doubles as a
+    status page for background exports.
+    """
+    def display_progress(self, job):
+        # pylint: disable=no-self-use
+        template = '{0} of {1} rows ({2:.0%})'
+        return template.format(job.rows_written, job.num_rows, job.progress)
+    display_progress.short_description = 'Progress'
+
+    def download_link(self, job):
+        if job.status != ExportJob.FINISHED or not job.artifact:
+            return self.empty_value_display
+        link = reverse('admin:pcari_exportjob_download', args=(job.pk, ))
+        return format_html('<a href="{0}">{1}</a>', link, os.path.basename(job.artifact.name))
+    download_link.short_description = 'Download'
+
+    def get_urls(self):
+        urls = super(ExportJobAdmin, self).get_urls()
+        return [
+            url(r'^(?P<job_id>\d+)/download/$', self.admin_site.admin_view(self.download),
+                name='pcari_exportjob_download'),
+        ] + urls
+
+    def download(self, request, job_id):
+        """ Download the artifact of a finished export job. """
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+        job = get_object_or_404(ExportJob, pk=job_id, status=ExportJob.FINISHED)
+        content_type, _ = mimetypes.guess_type(job.artifact.name)
+        artifact = job.artifact.storage.open(job.artifact.name, 'rb')
+        response = FileResponse(artifact, content_type=content_type)
+        filename = os.path.basename(job.artifact.name)
+        response['Content-Disposition'] = 'attachment; filename="{0}"'.format(filename)
+        response['Content-Length'] = job.artifact.size
+        return response
+
+    def has_add_permission(self, request):
+        return False
+
+    empty_value_display = '(None)'
+    fields = ('model', 'data_format', 'status', 'display_progress', 'download_link',
+              'error', 'requested_by', 'created', 'started', 'finished')
+    readonly_fields = fields
+    list_display = ('id', 'model', 'data_format', 'status', 'display_progress',
+                    'requested_by', 'created', 'finished', 'download_link')
+    list_filter = ('status', 'data_format')
+
+
+def export_in_background(modeladmin, request, queryset, data_format):
+    """ Queue an export job for the selected model instances and link to its status. """
+    job = queue_export_job(queryset, data_format, request.user)
+    link = reverse('admin:pcari_exportjob_change', args=(job.pk, ))
+    message = format_html('{0} rows are being exported in the background. '
+                          'Follow its progress <a href="{1}">here</a>.', job.num_rows, link)
+    modeladmin.message_user(request, message)
+
+
 def export_selected_as_csv(modeladmin, request, queryset):
     """ Export the selected model instances as comma-separated values (CSV). """
-    # pylint: disable=unused-argument
+    if queryset.count() > settings.EXPORT_JOB_THRESHOLD:
+        return export_in_background(modeladmin, request, queryset, 'csv')
     return export_data(queryset, 'csv')
 
 export_selected_as_csv.short_description = 'Export selected rows as CSV'
@@ -464,7 +780,8 @@ site.add_action(export_selected_as_csv)
 
 def export_selected_as_xlsx(modeladmin, request, queryset):
     """ Export the selected model instances as an Excel spreadsheet. """
-    # pylint: disable=unused-argument
+    if queryset.count() > settings.EXPORT_JOB_THRESHOLD:
+        return export_in_background(modeladmin, request, queryset, 'xlsx')
     return export_data(queryset, 'xlsx')
 
 export_selected_as_xlsx.short_description = 'Export selected rows as an Excel spreadsheet'
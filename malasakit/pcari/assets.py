@@ -0,0 +1,245 @@
+"""
+This module turns images uploaded through the admin site (the landing page
+image and the bloom icon) into static assets that can be cached forever.
+
+Each upload is scaled down to a few bounded sizes and recompressed: images
+with transparency as optimized PNGs, and all others as progressive JPEGs. SVG
+uploads are stored unchanged, since they scale without losing resolution.
+Every variant is named after a hash of its contents, so a URL never refers to
+different bytes, and a new upload always gets new URLs.
+
+The manifest (``data/assets.json`` under ``STATIC_ROOT``) maps each asset
+name to its variants, and is the only file clients must revalidate. Templates
+read it through :mod:`pcari.templatetags.assets`, while ``client.js`` and
+``sw.js`` fetch it directly.
+
+References:
+  * `Pillow Image Module <https://pillow.readthedocs.io/en/6.2.x/reference/Image.html>`_
+  * `Responsive Images <https://developer.mozilla.org/en-US/docs/Learn/HTML/Multimedia_and_embedding/Responsive_images>`_
+"""
+
+from __future__ import unicode_literals
+from collections import OrderedDict, namedtuple
+import hashlib
+import io
+import json
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from PIL import Image, ImageOps
+
+__all__ = ['IMAGE_ASSETS', 'process_image', 'save_image_asset', 'load_manifest', 'get_asset']
+
+MANIFEST_PATH = posixpath.join('data', 'assets.json')
+HASH_LENGTH = 12
+SVG_PATTERN = re.compile(br'<svg[\s>]')
+SVG_SNIFF_LENGTH = 4096
+
+
+class ImageAsset(namedtuple('ImageAsset', ['directory', 'sizes', 'default_size'])):
+    """
+    An ``ImageAsset`` describes how uploads of one image are processed.
+
+    Attributes:
+        directory (str): The directory of the variants, relative to
+            ``STATIC_ROOT``.
+        sizes (tuple): The maximum width and height of each variant, in
+            pixels. Images are never scaled up.
+        default_size (int): The maximum size of the variant used where only
+            one variant can be (for instance, the ``src`` of an ``<img>``).
+    """
+    __slots__ = ()
+
+
+class ImageVariant(namedtuple('ImageVariant', ['contents', 'extension', 'content_type',
+                                               'width', 'height'])):
+    """
+    An ``ImageVariant`` is one encoded size of an image. Vector images have
+    a ``width`` and ``height`` of ``None``.
+    """
+    __slots__ = ()
+
+
+# Maps asset names to ``ImageAsset`` instances
+IMAGE_ASSETS = OrderedDict([
+    ('landing-image', ImageAsset('img', (480, 960, 1920), 960)),
+    ('bloom-icon', ImageAsset('img', (128, 256), 128)),
+])
+
+# The manifest most recently read or written by this process, with the
+# ``(path, mtime, size)`` of the file it was read from
+_manifest_cache = {}
+
+
+def get_storage():
+    return FileSystemStorage(location=settings.STATIC_ROOT, base_url=settings.STATIC_URL)
+
+
+def is_svg(data):
+    return SVG_PATTERN.search(data[:SVG_SNIFF_LENGTH]) is not None
+
+
+def encode_image(image, transparent):
+    """ Recompress an image as an optimized PNG or a progressive JPEG. """
+    buf = io.BytesIO()
+    if transparent:
+        image.save(buf, 'PNG', optimize=True)
+        extension, content_type = 'png', 'image/png'
+    else:
+        image.save(buf, 'JPEG', quality=settings.ASSET_JPEG_QUALITY, optimize=True,
+                   progressive=True)
+        extension, content_type = 'jpg', 'image/jpeg'
+    width, height = image.size
+    return ImageVariant(buf.getvalue(), extension, content_type, width, height)
+
+
+def process_image(data, sizes):
+    """
+    Scale an image down to bounded sizes, and recompress each size.
+
+    Args:
+        data (bytes): The contents of an image file.
+        sizes: The maximum width and height of each variant, in pixels.
+
+    Returns:
+        list: ``ImageVariant`` instances, from the smallest to the largest.
+        Sizes larger than the image yield one variant at the image's own
+        size. An SVG image yields one variant: itself.
+
+    Raises:
+        ValueError: if the data is not an image Pillow can read, or an SVG.
+    """
+    if is_svg(data):
+        return [ImageVariant(data, 'svg', 'image/svg+xml', None, None)]
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.load()
+    except (IOError, SyntaxError):
+        raise ValueError('unsupported image format')
+
+    image = ImageOps.exif_transpose(image)
+    transparent = (image.mode in ('RGBA', 'LA', 'PA')
+                   or (image.mode == 'P' and 'transparency' in image.info))
+    image = image.convert('RGBA' if transparent else 'RGB')
+
+    variants = []
+    for size in sorted(sizes):
+        variant = image.copy()
+        variant.thumbnail((size, size), Image.LANCZOS)
+        variants.append(encode_image(variant, transparent))
+        if size >= max(image.size):
+            break
+    return variants
+
+
+def make_variant_path(name, directory, variant):
+    """ Name a variant after its asset, its width and a hash of its contents. """
+    digest = hashlib.sha1(variant.contents).hexdigest()[:HASH_LENGTH]
+    components = [name] if variant.width is None else [name, unicode(variant.width)]
+    filename = '{0}.{1}.{2}'.format('-'.join(components), digest, variant.extension)
+    return posixpath.join(directory, filename)
+
+
+def get_manifest_path():
+    return os.path.join(settings.STATIC_ROOT, MANIFEST_PATH)
+
+
+def load_manifest():
+    """
+    Read the asset manifest. The parsed manifest is reused until the file
+    changes, so callers must not modify it.
+
+    Returns:
+        OrderedDict: Maps asset names to entries written by
+        :func:`save_image_asset`. Empty if no asset has been uploaded.
+    """
+    path = get_manifest_path()
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return OrderedDict()
+    key = (path, stat.st_mtime, stat.st_size)
+    if _manifest_cache.get('key') != key:
+        with open(path, 'rb') as manifest_file:
+            manifest = json.load(manifest_file, object_pairs_hook=OrderedDict)
+        _manifest_cache.update(key=key, manifest=manifest)
+    return _manifest_cache['manifest']
+
+
+def write_manifest(manifest):
+    """ Replace the manifest atomically, so readers never see a partial file. """
+    path = get_manifest_path()
+    parent_dir = os.path.dirname(path)
+    if not os.path.exists(parent_dir):
+        os.makedirs(parent_dir)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    os.rename(temp_path, path)
+    stat = os.stat(path)
+    _manifest_cache.update(key=(path, stat.st_mtime, stat.st_size), manifest=manifest)
+
+
+def get_asset(name):
+    """ Return the manifest entry of an asset, or ``None`` if it was never uploaded. """
+    return load_manifest().get(name)
+
+
+def save_image_asset(name, data):
+    """
+    Process an upload of an asset, store its variants, and point the
+    manifest at them.
+
+    The variants of the previous upload are kept (and listed under
+    ``previous``), since pages cached by service workers may still refer to
+    them. Variants of earlier uploads are deleted.
+
+    Args:
+        name (str): A key of ``IMAGE_ASSETS``.
+        data (bytes): The contents of the uploaded file.
+
+    Returns:
+        OrderedDict: The new manifest entry, with the keys ``src`` (the path
+        of the default variant), ``type`` (the content type), ``variants``
+        (a list of ``path``, ``width`` and ``height`` mappings, from the
+        smallest to the largest) and ``previous`` (the paths of the variants
+        of the previous upload).
+
+    Raises:
+        ValueError: if the data is not an image.
+    """
+    asset = IMAGE_ASSETS[name]
+    variants = process_image(data, asset.sizes)
+    storage = get_storage()
+
+    entries = []
+    for variant in variants:
+        path = make_variant_path(name, asset.directory, variant)
+        if not storage.exists(path):
+            storage.save(path, ContentFile(variant.contents))
+        entries.append(OrderedDict([('path', path), ('width', variant.width),
+                                    ('height', variant.height)]))
+
+    default = entries[0]
+    for entry in entries[1:]:
+        if max(entry['width'], entry['height']) <= asset.default_size:
+            default = entry
+    current_paths = [variant['path'] for variant in entries]
+
+    manifest = OrderedDict(load_manifest())
+    previous = manifest.get(name) or {'variants': [], 'previous': []}
+    previous_paths = [variant['path'] for variant in previous['variants']
+                      if variant['path'] not in current_paths]
+    entry = OrderedDict([('src', default['path']), ('type', variants[0].content_type),
+                         ('variants', entries), ('previous', previous_paths)])
+    manifest[name] = entry
+    write_manifest(manifest)
+
+    for path in previous.get('previous', []):
+        if path not in current_paths and path not in previous_paths:
+            storage.delete(path)
+    return entry
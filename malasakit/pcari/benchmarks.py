@@ -0,0 +1,304 @@
+"""
+This module defines benchmarks of export and JSON endpoint throughput on
+synthetic data.
+
+Each benchmark runs in a separate process, so the peak resident set size
+(RSS) it reports is not inflated by earlier benchmarks. Reports are plain
+JSON, so the reports of two revisions can be compared with
+:func:`compare_reports`.
+"""
+
+from __future__ import division, unicode_literals
+from collections import OrderedDict
+import multiprocessing
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils import timezone
+
+from pcari.encoders import ROW_ENCODERS, get_row_encoder
+from pcari.exports import SNAPSHOT_MODELS, WIDE_EXPORT_MODELS
+from pcari.exports import export_csv, export_excel, export_data, export_wide_csv
+from pcari.exports import export_snapshot, export_pivoted_csv
+from pcari.models import Respondent, Location, Comment, CommentRating
+from pcari.models import QuantitativeQuestion, QuantitativeQuestionRating
+from pcari.models import QualitativeQuestion, OptionQuestion, OptionQuestionChoice
+from pcari.views import fetch_question_ratings
+
+__all__ = ['BENCHMARKS', 'seed_database', 'run_benchmark', 'run_benchmarks',
+           'compare_reports']
+
+NUM_QUANTITATIVE_QUESTIONS = 10
+NUM_QUALITATIVE_QUESTIONS = 3
+NUM_OPTION_QUESTIONS = 2
+NUM_LOCATIONS = 5
+COMMENT_RATINGS_PER_RESPONDENT = 2
+WORDS = ('flood', 'typhoon', 'evacuation', 'barangay', 'warning', 'road', 'water',
+         'shelter', 'radio', 'family', 'school', 'relief', 'power', 'signal')
+
+# Maps benchmark names to functions accepting a chunk size and returning the
+# number of rows and bytes exported
+BENCHMARKS = OrderedDict()
+
+
+def register_benchmark(name):
+    def register(function):
+        BENCHMARKS[name] = function
+        return function
+    return register
+
+
+def seed_database(num_respondents, seed=0, batch_size=500):
+    """
+    Populate an empty database with synthetic questions and responses.
+
+    Every respondent rates every quantitative question, answers every option
+    question, writes one comment and rates up to
+    ``COMMENT_RATINGS_PER_RESPONDENT`` comments written before theirs. About
+    one in ten ratings is skipped.
+
+    Args:
+        num_respondents (int): The number of respondents to create.
+        seed (int): The seed of the random number generator, so that the same
+            arguments always generate the same data.
+        batch_size (int): The number of respondents to create per batch.
+    """
+    rng = random.Random(seed)
+
+    def random_score(question):
+        if rng.random() < 0.1:
+            return QuantitativeQuestionRating.SKIPPED
+        return rng.randint(question.min_score, question.max_score)
+
+    with transaction.atomic():
+        locations = [Location.objects.create(province='Province {0}'.format(index),
+                                             enabled=True)
+                     for index in range(NUM_LOCATIONS)]
+        quantitative_questions = [QuantitativeQuestion.objects.create(tag='Q{0}'.format(index))
+                                  for index in range(NUM_QUANTITATIVE_QUESTIONS)]
+        qualitative_questions = [QualitativeQuestion.objects.create()
+                                 for _ in range(NUM_QUALITATIVE_QUESTIONS)]
+        option_questions = [OptionQuestion.objects.create(options=['Yes', 'No', 'Unsure'])
+                            for _ in range(NUM_OPTION_QUESTIONS)]
+
+        comment_ids = []
+        for start in range(0, num_respondents, batch_size):
+            uuids = [uuid.UUID(int=rng.getrandbits(128))
+                     for _ in range(min(batch_size, num_respondents - start))]
+            Respondent.objects.bulk_create([
+                Respondent(uuid=respondent_uuid, age=rng.randint(18, 80),
+                           gender=rng.choice('MF'), location=rng.choice(locations),
+                           language=rng.choice(settings.LANGUAGES)[0])
+                for respondent_uuid in uuids
+            ])
+            # Not every backend returns primary keys from ``bulk_create``
+            respondent_ids = Respondent.objects.filter(uuid__in=uuids).values_list('id', flat=True)
+            respondent_ids = sorted(respondent_ids)
+
+            QuantitativeQuestionRating.objects.bulk_create([
+                QuantitativeQuestionRating(respondent_id=respondent_id, question=question,
+                                           score=random_score(question))
+                for respondent_id in respondent_ids for question in quantitative_questions
+            ])
+            OptionQuestionChoice.objects.bulk_create([
+                OptionQuestionChoice(respondent_id=respondent_id, question=question,
+                                     option=rng.choice(question.options))
+                for respondent_id in respondent_ids for question in option_questions
+            ])
+            if comment_ids:
+                CommentRating.objects.bulk_create([
+                    CommentRating(respondent_id=respondent_id, comment_id=comment_id,
+                                  score=rng.randint(settings.DEFAULT_MIN_SCORE,
+                                                    settings.DEFAULT_MAX_SCORE))
+                    for respondent_id in respondent_ids
+                    for comment_id in rng.sample(comment_ids, min(len(comment_ids),
+                                                                  COMMENT_RATINGS_PER_RESPONDENT))
+                ])
+            Comment.objects.bulk_create([
+                Comment(respondent_id=respondent_id, question=rng.choice(qualitative_questions),
+                        message=' '.join(rng.choice(WORDS) for _ in range(rng.randint(5, 40))))
+                for respondent_id in respondent_ids
+            ])
+            comment_ids.extend(Comment.objects.filter(respondent_id__in=respondent_ids)
+                               .values_list('id', flat=True))
+
+
+def consume(chunks):
+    """ Exhaust an iterable of byte strings and return their total length. """
+    return sum(len(chunk) for chunk in chunks)
+
+
+@register_benchmark('export_csv')
+def benchmark_export_csv(chunk_size):
+    queryset = QuantitativeQuestionRating._base_manager.all()
+    return queryset.count(), consume(export_csv(queryset, chunk_size))
+
+
+@register_benchmark('export_excel')
+def benchmark_export_excel(chunk_size):
+    queryset = QuantitativeQuestionRating._base_manager.all()
+    with tempfile.TemporaryFile() as stream:
+        export_excel(stream, queryset, chunk_size)
+        return queryset.count(), stream.tell()
+
+
+@register_benchmark('export_data_csv')
+def benchmark_export_data_csv(chunk_size):
+    # pylint: disable=unused-argument
+    queryset = QuantitativeQuestionRating._base_manager.all()
+    return queryset.count(), consume(export_data(queryset, 'csv').streaming_content)
+
+
+@register_benchmark('export_data_xlsx')
+def benchmark_export_data_xlsx(chunk_size):
+    # pylint: disable=unused-argument
+    queryset = QuantitativeQuestionRating._base_manager.all()
+    return queryset.count(), consume(export_data(queryset, 'xlsx').streaming_content)
+
+
+@register_benchmark('export_wide_csv')
+def benchmark_export_wide_csv(chunk_size):
+    querysets = [model._base_manager.all() for model in WIDE_EXPORT_MODELS]
+    num_rows = sum(queryset.count() for queryset in querysets)
+    return num_rows, consume(export_wide_csv(querysets, chunk_size))
+
+
+@register_benchmark('export_pivoted_csv')
+def benchmark_export_pivoted_csv(chunk_size):
+    return Respondent.objects.count(), consume(export_pivoted_csv(chunk_size))
+
+
+@register_benchmark('export_snapshot')
+def benchmark_export_snapshot(chunk_size):
+    num_rows = sum(model._base_manager.count() for model in SNAPSHOT_MODELS)
+    return num_rows, consume(export_snapshot(chunk_size=chunk_size))
+
+
+@register_benchmark('encode_rows_jsonl')
+def benchmark_encode_rows_jsonl(chunk_size):
+    # pylint: disable=unused-argument
+    # Include compiling the encoder, which happens once per process
+    ROW_ENCODERS.clear()
+    encoder = get_row_encoder(Respondent, 'jsonl')
+    rows = Respondent._base_manager.values_list(*encoder.field_names)
+    num_rows, num_bytes = 0, 0
+    for row in rows.iterator():
+        num_rows, num_bytes = num_rows + 1, num_bytes + len(encoder.encode(row))
+    return num_rows, num_bytes
+
+
+@register_benchmark('fetch_question_ratings')
+def benchmark_fetch_question_ratings(chunk_size):
+    # pylint: disable=unused-argument
+    request = RequestFactory().get(reverse('fetch-question-ratings'))
+    num_rows = QuantitativeQuestionRating.objects.filter(question__enabled=True).count()
+    return num_rows, len(fetch_question_ratings(request).content)
+
+
+def get_peak_rss():
+    """ Return the peak resident set size of this process, in megabytes. """
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, while macOS reports bytes
+    return peak_rss/(2**20 if sys.platform == 'darwin' else 2**10)
+
+
+def run_benchmark(name, chunk_size=settings.EXPORT_CHUNK_SIZE):
+    """
+    Run one benchmark in the current process.
+
+    Returns:
+        OrderedDict: The wall time in seconds, the number of rows and bytes
+        exported, the throughput in rows per second, the peak RSS in
+        megabytes, and how much the RSS grew past its level at the start.
+    """
+    initial_rss = get_peak_rss()
+    start = time.time()
+    num_rows, num_bytes = BENCHMARKS[name](chunk_size)
+    seconds = time.time() - start
+    peak_rss = get_peak_rss()
+    return OrderedDict([
+        ('seconds', round(seconds, 3)),
+        ('rows', num_rows),
+        ('bytes', num_bytes),
+        ('rows_per_second', round(num_rows/seconds, 1) if seconds else None),
+        ('peak_rss_mb', round(peak_rss, 1)),
+        ('rss_growth_mb', round(peak_rss - initial_rss, 1)),
+    ])
+
+
+def get_revision():
+    """ Return the Git commit checked out, or ``None`` if unavailable. """
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+                                       stderr=subprocess.STDOUT).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(names=None, chunk_size=settings.EXPORT_CHUNK_SIZE, callback=None):
+    """
+    Run benchmarks against the default database, each in a fresh process.
+
+    Args:
+        names (list): The names of the benchmarks to run, in order. Defaults
+            to every benchmark in ``BENCHMARKS``.
+        chunk_size (int): The maximum number of rows to fetch per query.
+        callback: An optional function called with the name and result of
+            each benchmark once it finishes.
+
+    Returns:
+        OrderedDict: A report with the benchmark results under ``results``.
+    """
+    names = names or list(BENCHMARKS)
+    report = OrderedDict([
+        ('created', timezone.now().isoformat()),
+        ('revision', get_revision()),
+        ('python', platform.python_version()),
+        ('database', connections['default'].vendor),
+        ('respondents', Respondent.objects.count()),
+        ('chunk_size', chunk_size),
+        ('results', OrderedDict()),
+    ])
+    for name in names:
+        # Forked processes must not share the parent's database connections
+        connections.close_all()
+        pool = multiprocessing.Pool(1, initializer=connections.close_all)
+        try:
+            result = pool.apply(run_benchmark, (name, chunk_size))
+        finally:
+            pool.terminate()
+            pool.join()
+        report['results'][name] = result
+        if callback is not None:
+            callback(name, result)
+    return report
+
+
+def compare_reports(baseline, report, metrics=('seconds', 'rows_per_second', 'peak_rss_mb')):
+    """
+    Compare the results of two reports.
+
+    Returns:
+        list: A ``(name, metric, baseline value, value, relative change)``
+        tuple for each metric of each benchmark in both reports. The relative
+        change is ``None`` if the baseline value is zero or missing.
+    """
+    rows = []
+    for name, result in report['results'].items():
+        if name not in baseline['results']:
+            continue
+        for metric in metrics:
+            old, new = baseline['results'][name].get(metric), result.get(metric)
+            change = (new - old)/old if old and new is not None else None
+            rows.append((name, metric, old, new, change))
+    return rows
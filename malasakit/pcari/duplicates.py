@@ -0,0 +1,223 @@
+"""
+This module finds near-duplicate comments (for instance, copy-pasted
+suggestions from a campaign) without comparing every pair of comments.
+
+Each message is reduced to a set of character shingles (substrings of
+``SHINGLE_SIZE`` characters, after lowercasing and collapsing punctuation and
+whitespace) and signed with MinHash: the minimum hash of the shingles under
+each of ``NUM_PERMUTATIONS`` random hash functions. The fraction of equal
+minimums in two signatures estimates the Jaccard similarity of the shingle
+sets.
+
+Signatures are split into ``NUM_BANDS`` bands, and each comment is placed in
+one bucket per band (locality-sensitive hashing). Only comments sharing a
+bucket are compared, so a lookup reads a few index entries rather than every
+signature. With 16 bands of 4 hashes, comments with a similarity of 0.8 share
+a bucket with probability over 99.9%, but comments with a similarity of 0.3
+only about 12% of the time.
+
+References:
+  * `Mining of Massive Datasets, Chapter 3 <http://infolab.stanford.edu/~ullman/mmds/ch3.pdf>`_
+"""
+
+from __future__ import division, unicode_literals
+import hashlib
+import random
+import re
+import struct
+import zlib
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+import numpy as np
+
+from pcari.models import Comment, CommentSignature, CommentBucket
+
+__all__ = ['make_signature', 'estimate_similarity', 'index_comment', 'index_comments',
+           'find_near_duplicates', 'link_near_duplicate']
+
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 64
+NUM_BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS//NUM_BANDS
+# A Mersenne prime, small enough that products of hashes fit in 64 bits
+PRIME = 2**31 - 1
+NON_WORD_PATTERN = re.compile(r'\W+', re.UNICODE)
+
+# Each permutation maps a shingle hash ``x`` to ``(a*x + b) % PRIME``
+_rng = random.Random(0)
+COEFFICIENTS = np.array([_rng.randint(1, PRIME - 1) for _ in range(NUM_PERMUTATIONS)],
+                        dtype=np.int64)
+OFFSETS = np.array([_rng.randint(0, PRIME - 1) for _ in range(NUM_PERMUTATIONS)],
+                   dtype=np.int64)
+
+
+def make_shingles(message):
+    """ Return the set of character shingles of a message, after normalizing it. """
+    text = NON_WORD_PATTERN.sub(' ', message.lower()).strip()
+    if not text:
+        return set()
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[index:index + SHINGLE_SIZE] for index in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def make_signature(message):
+    """
+    Sign a message with MinHash.
+
+    Returns:
+        numpy.ndarray: ``NUM_PERMUTATIONS`` minimum hashes, or ``None`` if the
+        message contains no words.
+    """
+    shingles = make_shingles(message)
+    if not shingles:
+        return None
+    hashes = np.array([zlib.crc32(shingle.encode('utf-8')) & 0xffffffff
+                       for shingle in shingles], dtype=np.int64) % PRIME
+    permuted = (np.outer(COEFFICIENTS, hashes) + OFFSETS[:, np.newaxis]) % PRIME
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def pack_signature(signature):
+    return signature.astype('<u4').tobytes()
+
+
+def unpack_signature(minhash):
+    return np.frombuffer(bytes(minhash), dtype='<u4')
+
+
+def make_bucket_keys(signature):
+    """ Hash each band of a signature, with its index, into a signed 64-bit bucket key. """
+    keys = []
+    for band in range(NUM_BANDS):
+        rows = signature[band*ROWS_PER_BAND:(band + 1)*ROWS_PER_BAND]
+        digest = hashlib.md5(struct.pack('<H', band) + pack_signature(rows)).digest()
+        keys.append(struct.unpack('<q', digest[:8])[0])
+    return keys
+
+
+def estimate_similarity(signature, other_signature):
+    """ Estimate the Jaccard similarity of two messages from their signatures. """
+    return float(np.mean(signature == other_signature))
+
+
+def index_comments(comments, batch_size=1000):
+    """
+    Sign comments and place them in buckets, replacing any existing signatures.
+
+    Args:
+        comments: A ``QuerySet`` of comments.
+        batch_size (int): The number of comments to sign per transaction.
+
+    Returns:
+        int: The number of comments signed. (Comments without words are
+        removed from the index, but not counted.)
+    """
+    num_signed = 0
+    comments = comments.order_by('pk').values_list('pk', 'message')
+    last_id = 0
+    while True:
+        batch = list(comments.filter(pk__gt=last_id)[:batch_size])
+        if not batch:
+            return num_signed
+        last_id = batch[-1][0]
+        num_signed += index_messages(batch)
+
+
+def index_messages(messages):
+    """ Sign ``(comment ID, message)`` pairs, and return how many had words. """
+    signatures, buckets = [], []
+    for comment_id, message in messages:
+        signature = make_signature(message or '')
+        if signature is not None:
+            signatures.append(CommentSignature(comment_id=comment_id,
+                                               minhash=pack_signature(signature)))
+            buckets.extend(CommentBucket(comment_id=comment_id, key=key)
+                           for key in make_bucket_keys(signature))
+    comment_ids = [comment_id for comment_id, _ in messages]
+    with transaction.atomic():
+        CommentSignature.objects.filter(comment_id__in=comment_ids).delete()
+        CommentBucket.objects.filter(comment_id__in=comment_ids).delete()
+        CommentSignature.objects.bulk_create(signatures)
+        CommentBucket.objects.bulk_create(buckets)
+    return len(signatures)
+
+
+def index_comment(comment):
+    """
+    Sign one comment and place it in buckets (see :func:`index_comments`).
+
+    Returns:
+        bool: Whether the comment was signed.
+    """
+    return index_messages([(comment.pk, comment.message)]) > 0
+
+
+def find_near_duplicates(comment, threshold=None):
+    """
+    Find the comments whose messages are nearly identical to a comment's.
+
+    Args:
+        comment: A signed comment.
+        threshold (float): The minimum estimated similarity. Defaults to
+            ``settings.COMMENT_DUPLICATE_THRESHOLD``.
+
+    Returns:
+        list: ``(comment ID, similarity)`` pairs, from the most to the least
+        similar. The comment itself is excluded.
+    """
+    if threshold is None:
+        threshold = settings.COMMENT_DUPLICATE_THRESHOLD
+    try:
+        signature = unpack_signature(CommentSignature.objects.get(comment_id=comment.pk).minhash)
+    except CommentSignature.DoesNotExist:
+        return []
+    candidate_ids = (CommentBucket.objects.filter(key__in=make_bucket_keys(signature))
+                     .exclude(comment_id=comment.pk).values('comment_id'))
+    signatures = CommentSignature.objects.filter(comment_id__in=candidate_ids)
+    matches = []
+    for comment_id, minhash in signatures.values_list('comment_id', 'minhash'):
+        similarity = estimate_similarity(signature, unpack_signature(minhash))
+        if similarity >= threshold:
+            matches.append((comment_id, similarity))
+    return sorted(matches, key=lambda match: (-match[1], match[0]))
+
+
+def link_near_duplicate(comment, threshold=None, has_translations=None):
+    """
+    Link a comment to the earliest comment in the same language it nearly
+    duplicates, through its ``original`` field, and mark it as a
+    ``duplicate``. Respondents are not asked to rate linked comments.
+
+    Only comments without an ``original`` (and without translations) are
+    linked, and only to earlier comments without an ``original``, so links
+    never form chains.
+
+    Args:
+        comment: A signed comment.
+        threshold (float): The minimum estimated similarity (see
+            :func:`find_near_duplicates`).
+        has_translations (bool): Whether any comment references this comment
+            through ``original``, if already known. Otherwise, the database is
+            queried.
+
+    Returns:
+        int: The primary key of the comment linked to, or ``None``.
+    """
+    if has_translations is None:
+        has_translations = comment.translations.exists()
+    if comment.original_id is not None or has_translations:
+        return None
+    matches = [comment_id for comment_id, _ in find_near_duplicates(comment, threshold)]
+    earlier = Comment._base_manager.filter(pk__in=matches, pk__lt=comment.pk, original=None,
+                                           language=comment.language)
+    original_id = earlier.order_by('pk').values_list('pk', flat=True).first()
+    if original_id is None:
+        return None
+    # An update does not send ``post_save``, which would index the comment again
+    Comment._base_manager.filter(pk=comment.pk).update(original_id=original_id, duplicate=True,
+                                                       modified=timezone.now())
+    comment.original_id, comment.duplicate = original_id, True
+    return original_id
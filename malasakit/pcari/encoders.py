@@ -0,0 +1,184 @@
+"""
+This module defines how rows of model field values are converted into cells
+for exports and JSON responses.
+
+Each row is a ``tuple`` of raw values, as returned by
+``QuerySet.values_list``, so no model instances are constructed. Encoders are
+compiled once per model, format and set of fields, then reused from
+:data:`ROW_ENCODERS`.
+"""
+
+from __future__ import unicode_literals
+from base64 import b64encode
+from collections import OrderedDict, namedtuple
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+from django.db.models import OneToOneRel
+from django.utils import timezone
+
+from pcari.models import get_concrete_fields
+
+__all__ = [
+    'select_fields_for_export',
+    'resolve_field',
+    'make_row_encoder',
+    'make_json_line_encoder',
+    'RowEncoder',
+    'get_row_encoder',
+]
+
+# Fields whose values the CSV writer already serializes correctly
+CSV_NATIVE_FIELDS = (models.CharField, models.TextField, models.IntegerField,
+                     models.AutoField, models.ForeignKey)
+
+# Compiled encoders, keyed by model, format and lookups (see ``get_row_encoder``)
+ROW_ENCODERS = {}
+
+
+def select_fields_for_export(model):
+    concrete_fields = get_concrete_fields(model)
+    return [field for field in concrete_fields
+            if not isinstance(field, OneToOneRel)]
+
+
+def resolve_field(model, lookup):
+    """ Find the field a lookup (for example, ``respondent__location__country``) refers to. """
+    field_names = lookup.split('__')
+    for field_name in field_names[:-1]:
+        model = model._meta.get_field(field_name).related_model
+    return model._meta.get_field(field_names[-1])
+
+
+def make_csv_cell_encoder(field):
+    """ Return a function serializing values of ``field`` for CSV, or ``None`` if unneeded. """
+    return None if isinstance(field, CSV_NATIVE_FIELDS) else unicode
+
+
+def make_excel_cell_encoder(field):
+    """ Return a function converting values of ``field`` for Excel, or ``None`` if unneeded. """
+    if isinstance(field, models.DateTimeField):
+        # Excel has no notion of time zones
+        return lambda value: timezone.make_naive(value, timezone.utc)
+    if isinstance(field, models.UUIDField):
+        return unicode
+    return None
+
+
+def make_json_cell_encoder(field):
+    """ Return a function converting values of ``field`` for JSON, or ``None`` if unneeded. """
+    if isinstance(field, models.BinaryField):
+        return lambda value: b64encode(bytes(value)).decode('ascii')
+    if isinstance(field, models.DateTimeField):
+        # Unlike ``DjangoJSONEncoder``, keep microseconds so dumps are lossless
+        return lambda value: value.isoformat()
+    if isinstance(field, models.UUIDField):
+        return unicode
+    return None
+
+
+def make_row_encoder(fields, make_cell_encoder=make_csv_cell_encoder):
+    """
+    Build a function that converts a row of raw values into cells a writer
+    accepts.
+
+    The fields that need conversion are determined once, rather than per cell.
+    Related instances are represented by their primary keys.
+
+    Args:
+        fields (list): The model fields, in the order their values appear in
+            each row.
+        make_cell_encoder: A function that accepts a field and returns a
+            function converting non-null values of that field, or ``None`` if
+            the values need no conversion.
+
+    Returns:
+        A function that accepts a row (a ``tuple``) and returns a ``list``.
+    """
+    encoders = [(index, make_cell_encoder(field)) for index, field in enumerate(fields)]
+    encoders = [(index, encode) for index, encode in encoders if encode is not None]
+
+    def encode_row(row):
+        row = list(row)
+        for index, encode in encoders:
+            if row[index] is not None:
+                row[index] = encode(row[index])
+        return row
+    return encode_row
+
+
+def make_json_line_encoder(fields, keys=None):
+    """
+    Build a function that converts a row of raw values into a line of JSON
+    (a UTF-8 encoded ``str`` ending in a newline) with field names (or the
+    given ``keys``) as keys. Datetimes are written in ISO 8601 format and
+    binary data in base 64.
+    """
+    keys = keys or [field.name for field in fields]
+    encode_row = make_row_encoder(fields, make_json_cell_encoder)
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+
+    def encode_line(row):
+        instance = OrderedDict(zip(keys, encode_row(row)))
+        return encoder.encode(instance).encode('utf-8') + b'\n'
+    return encode_line
+
+
+CELL_ENCODER_FACTORIES = {
+    'csv': make_csv_cell_encoder,
+    'xlsx': make_excel_cell_encoder,
+    'json': make_json_cell_encoder,
+}
+
+
+class RowEncoder(namedtuple('RowEncoder', ['fields', 'field_names', 'encode'])):
+    """
+    A ``RowEncoder`` is a compiled encoder for rows of one model.
+
+    Attributes:
+        fields (tuple): The model fields, in the order their values appear in
+            each row.
+        field_names (tuple): The lookups to pass to ``QuerySet.values_list``
+            to fetch rows in that order.
+        encode: A function that accepts a row and returns a ``list`` of cells
+            (or, for the ``jsonl`` format, a line of JSON).
+    """
+    __slots__ = ()
+
+
+def get_row_encoder(model, data_format='csv', lookups=None):
+    """
+    Fetch the row encoder for a model, compiling it on first use.
+
+    Args:
+        model: The model class of the rows.
+        data_format (str): What the cells are written as. Current options are:
+            * ``csv`` (default): Values a ``csv.writer`` accepts.
+            * ``xlsx``: Values an ``openpyxl`` worksheet accepts.
+            * ``json``: Values ``DjangoJSONEncoder`` encodes losslessly.
+            * ``jsonl``: A line of JSON per row, keyed by lookup.
+        lookups (tuple): The fields (or lookups across relations) of each
+            row. Defaults to the fields of :func:`select_fields_for_export`.
+
+    Returns:
+        A :class:`RowEncoder`.
+
+    Raises:
+        ValueError: if the ``data_format`` is invalid.
+    """
+    key = model, data_format, lookups
+    if key not in ROW_ENCODERS:
+        if lookups is None:
+            fields = tuple(select_fields_for_export(model))
+            lookups = tuple(field.name for field in fields)
+        else:
+            fields = tuple(resolve_field(model, lookup) for lookup in lookups)
+
+        if data_format == 'jsonl':
+            encode = make_json_line_encoder(fields, lookups)
+        elif data_format in CELL_ENCODER_FACTORIES:
+            encode = make_row_encoder(fields, CELL_ENCODER_FACTORIES[data_format])
+        else:
+            raise ValueError('no such data format "{0}"'.format(data_format))
+        ROW_ENCODERS[key] = RowEncoder(fields, lookups, encode)
+    return ROW_ENCODERS[key]
@@ -0,0 +1,931 @@
+"""
+This module defines how data are exported for offline analysis.
+
+References:
+  * `Creating Files for Download <https://docs.djangoproject.com/en/dev/howto/outputting-csv/>`_
+  * `NumPy File Format <https://docs.scipy.org/doc/numpy/neps/npy-format.html>`_
+"""
+
+from __future__ import unicode_literals
+from collections import OrderedDict
+import datetime
+import errno
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import tempfile
+import time
+import traceback
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db.models import F, Q
+from django.http import FileResponse, HttpResponseBadRequest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+import numpy as np
+from openpyxl import Workbook
+import unicodecsv as csv
+
+from pcari.models import Respondent, QuantitativeQuestion, QuantitativeQuestionRating
+from pcari.models import Comment, CommentRating, OptionQuestionChoice
+from pcari.models import ExportJob, Location
+from pcari.models import QualitativeQuestion, OptionQuestion
+from pcari.encoders import select_fields_for_export, get_row_encoder
+from pcari.views import profile
+from pcari.zipstream import ZipStream
+from feature_phone import models as phone_models
+
+__all__ = [
+    'select_fields_for_export',
+    'iterate_rows',
+    'export_csv',
+    'export_excel',
+    'export_data',
+    'WIDE_EXPORT_COLUMNS',
+    'export_wide_csv',
+    'export_wide_data',
+    'queue_export_job',
+    'run_export_job',
+    'SNAPSHOT_MODELS',
+    'export_snapshot',
+    'export_snapshot_data',
+    'INCREMENTAL_EXPORT_MODELS',
+    'parse_cursor',
+    'format_cursor',
+    'export_incremental',
+    'export_incremental_data',
+    'dump_model',
+    'fetch_sorted_ids',
+    'fill_ratings_matrix',
+    'export_ratings_matrix',
+    'fill_option_choice_matrix',
+    'export_pivoted_csv',
+    'export_pivoted_data',
+]
+
+
+LOGGER = logging.getLogger('pcari')
+
+# Columns of the wide export, which has one row per response of any kind
+WIDE_EXPORT_COLUMNS = (
+    'response_type', 'response_id', 'timestamp',
+    'respondent_id', 'respondent_uuid', 'age', 'gender', 'language', 'sector',
+    'country', 'province', 'municipality', 'division',
+    'question_id', 'question_tag', 'question_prompt',
+    'score', 'option', 'message',
+)
+
+WIDE_EXPORT_RESPONDENT_LOOKUPS = {
+    'response_id': 'id',
+    'timestamp': 'timestamp',
+    'respondent_id': 'respondent',
+    'respondent_uuid': 'respondent__uuid',
+    'age': 'respondent__age',
+    'gender': 'respondent__gender',
+    'language': 'respondent__language',
+    'sector': 'respondent__sector',
+    'country': 'respondent__location__country',
+    'province': 'respondent__location__province',
+    'municipality': 'respondent__location__municipality',
+    'division': 'respondent__location__division',
+}
+
+WIDE_EXPORT_MODELS = (QuantitativeQuestionRating, OptionQuestionChoice, Comment, CommentRating)
+
+# Lookups of the columns specific to each response model (other columns are blank)
+WIDE_EXPORT_LOOKUPS = {
+    QuantitativeQuestionRating: {
+        'question_id': 'question',
+        'question_tag': 'question__tag',
+        'question_prompt': 'question__prompt',
+        'score': 'score',
+    },
+    OptionQuestionChoice: {
+        'question_id': 'question',
+        'question_tag': 'question__tag',
+        'question_prompt': 'question__prompt',
+        'option': 'option',
+    },
+    Comment: {
+        'question_id': 'question',
+        'question_tag': 'question__tag',
+        'question_prompt': 'question__prompt',
+        'message': 'message',
+    },
+    CommentRating: {
+        'question_id': 'comment__question',
+        'question_tag': 'comment__question__tag',
+        'question_prompt': 'comment__question__prompt',
+        'score': 'score',
+        'message': 'comment__message',
+    },
+}
+
+# Models included in a full snapshot of the dataset, in the order they are written
+SNAPSHOT_MODELS = (
+    Respondent, Location,
+    QualitativeQuestion, QuantitativeQuestion, OptionQuestion,
+    Comment, CommentRating, QuantitativeQuestionRating, OptionQuestionChoice,
+    phone_models.Respondent, phone_models.Instructions, phone_models.Question,
+    phone_models.Response,
+)
+
+# Models with a modification timestamp that can be exported incrementally, by label
+INCREMENTAL_EXPORT_MODELS = OrderedDict((model._meta.label_lower, model) for model in (
+    Respondent, Comment, CommentRating, QuantitativeQuestionRating, OptionQuestionChoice,
+    phone_models.Respondent, phone_models.Response,
+))
+
+
+class Echo(object):
+    """ A pseudo-buffer that returns what is written instead of storing it. """
+    def write(self, value):
+        return value
+
+
+def iterate_rows(queryset, field_names, chunk_size=settings.EXPORT_CHUNK_SIZE,
+                 progress_callback=None):
+    """
+    Iterate over the values of a ``QuerySet`` in chunks, in ascending order of
+    primary key.
+
+    Each chunk is a separate query that resumes after the last primary key
+    seen, so at most one chunk is held in memory and no long-running cursor
+    is kept open (``MySQLdb``, for instance, buffers entire result sets
+    client-side).
+
+    Args:
+        queryset: A Django ``QuerySet`` of instances to export.
+        field_names (list): The names of the fields whose values to fetch.
+        chunk_size (int): The maximum number of rows to fetch per query.
+        progress_callback: An optional function called with the number of
+            rows in each chunk once the chunk has been consumed.
+
+    Returns:
+        A generator of lists of rows (``tuple``s of values, without the
+        primary key), one list per chunk.
+    """
+    queryset = queryset.order_by('pk').values_list('pk', *field_names)
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            break
+        last_pk = chunk[-1][0]
+        yield [row[1:] for row in chunk]
+        if progress_callback is not None:
+            progress_callback(len(chunk))
+        if len(chunk) < chunk_size:
+            break
+
+
+def export_csv(queryset, chunk_size=settings.EXPORT_CHUNK_SIZE, progress_callback=None):
+    """
+    Export the given ``QuerySet`` as comma-separated values.
+
+    Args:
+        queryset: A Django ``QuerySet`` of instances to export.
+        chunk_size (int): The maximum number of rows to fetch per query.
+        progress_callback: See :func:`iterate_rows`.
+
+    Returns:
+        A generator of UTF-8 encoded ``str`` chunks, starting with the header.
+    """
+    encoder = get_row_encoder(queryset.model, 'csv')
+    writer = csv.writer(Echo(), encoding='utf-8')
+
+    yield writer.writerow(encoder.field_names)
+    for rows in iterate_rows(queryset, encoder.field_names, chunk_size, progress_callback):
+        yield b''.join(writer.writerow(encoder.encode(row)) for row in rows)
+
+
+@profile
+def export_excel(stream, queryset, chunk_size=settings.EXPORT_CHUNK_SIZE,
+                 progress_callback=None):
+    """
+    Export the given ``QuerySet`` as an Excel spreadsheet.
+
+    The workbook is write-only, so rows are flushed to a temporary file as
+    they are appended rather than kept in memory.
+
+    Args:
+        stream: A ``file``-like object with a ``write`` method.
+        queryset: A Django ``QuerySet`` of instances to export.
+        chunk_size (int): The maximum number of rows to fetch per query.
+        progress_callback: See :func:`iterate_rows`.
+
+    Returns:
+        `None`. Has a side effect of writing to the ``stream``.
+    """
+    encoder = get_row_encoder(queryset.model, 'xlsx')
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(queryset.model.__name__)
+    worksheet.append(encoder.field_names)
+
+    for rows in iterate_rows(queryset, encoder.field_names, chunk_size, progress_callback):
+        for row in rows:
+            worksheet.append(encoder.encode(row))
+
+    workbook.save(stream)
+
+
+def export_wide_csv(querysets, chunk_size=settings.EXPORT_CHUNK_SIZE, progress_callback=None):
+    """
+    Export responses as comma-separated values, with one row per response
+    joined with its respondent's demographics and location and the question
+    it answers.
+
+    Each chunk of rows is fetched with a single query that joins the related
+    tables, so no lookups are made per row.
+
+    Args:
+        querysets: An iterable of ``QuerySet``s of models in
+            ``WIDE_EXPORT_MODELS``.
+        chunk_size (int): The maximum number of rows to fetch per query.
+        progress_callback: See :func:`iterate_rows`.
+
+    Returns:
+        A generator of UTF-8 encoded ``str`` chunks, starting with the header
+        ``WIDE_EXPORT_COLUMNS``.
+    """
+    writer = csv.writer(Echo(), encoding='utf-8')
+    yield writer.writerow(WIDE_EXPORT_COLUMNS)
+
+    for queryset in querysets:
+        lookups = dict(WIDE_EXPORT_RESPONDENT_LOOKUPS, **WIDE_EXPORT_LOOKUPS[queryset.model])
+        lookups = [(column, lookups[column]) for column in WIDE_EXPORT_COLUMNS
+                   if column in lookups]
+        encoder = get_row_encoder(queryset.model, 'csv',
+                                  tuple(lookup for _, lookup in lookups))
+
+        # Maps each column to an index into the fetched values, or ``None`` if blank
+        value_indices = {column: index for index, (column, _) in enumerate(lookups)}
+        value_indices = [value_indices.get(column) for column in WIDE_EXPORT_COLUMNS]
+        response_type = queryset.model.__name__
+
+        for rows in iterate_rows(queryset, encoder.field_names, chunk_size, progress_callback):
+            lines = []
+            for row in rows:
+                row = encoder.encode(row)
+                wide_row = [row[index] if index is not None else None
+                            for index in value_indices]
+                wide_row[0] = response_type
+                lines.append(writer.writerow(wide_row))
+            yield b''.join(lines)
+
+
+def generate_export_filename(model_name, data_format):
+    now = datetime.datetime.now()
+    return model_name + '-' + now.strftime('%Y-%m-%d') + '.' + data_format
+
+
+@profile
+def export_data(queryset, data_format='csv'):
+    """
+    Create and write data to a response as a file for download.
+
+    CSV files are streamed as they are generated, so memory usage does not
+    grow with the size of the ``queryset`` and the download begins
+    immediately. Excel spreadsheets must be zipped once complete, so they are
+    written to a temporary file first and streamed from there.
+
+    Args:
+        data_format (str): The file format the data should be exported as.
+            Current options are: ``csv`` (default), ``xlsx``.
+        queryset: The instances to export.
+
+    Returns:
+        A ``StreamingHttpResponse`` or ``FileResponse`` with the requested
+        data as an attached file, or an ``HttpResponseBadRequest`` with a
+        status code of 400 with an invalid ``data_format``.
+    """
+    if data_format not in ('csv', 'xlsx'):
+        return HttpResponseBadRequest('no such data format "{0}"'.format(data_format))
+
+    model_name = queryset.model.__name__
+    filename = generate_export_filename(model_name, data_format)
+    content_type, _ = mimetypes.guess_type(filename)
+
+    if data_format == 'csv':
+        response = StreamingHttpResponse(export_csv(queryset), content_type=content_type)
+    else:
+        temp_file = tempfile.TemporaryFile()
+        export_excel(temp_file, queryset)
+        size = temp_file.tell()
+        temp_file.seek(0)
+        response = FileResponse(temp_file, content_type=content_type)
+        response['Content-Length'] = size
+    response['Content-Disposition'] = 'attachment; filename="{0}"'.format(filename)
+    return response
+
+
+@profile
+def export_wide_data(querysets=None):
+    """
+    Create a wide CSV file of responses for download.
+
+    Args:
+        querysets: An iterable of ``QuerySet``s of response models to export.
+            By default, every response of every kind is exported.
+
+    Returns:
+        A ``StreamingHttpResponse`` with the responses as an attached file.
+    """
+    if querysets is None:
+        # The base manager skips the rating statistics annotated onto comments
+        querysets = [model._base_manager.all() for model in WIDE_EXPORT_MODELS]
+    filename = generate_export_filename('responses-wide', 'csv')
+    response = StreamingHttpResponse(export_wide_csv(querysets), content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="{0}"'.format(filename)
+    return response
+
+
+def export_snapshot(models_to_export=SNAPSHOT_MODELS, chunk_size=settings.EXPORT_CHUNK_SIZE):
+    """
+    Export every instance of several models as a ZIP archive, generated as it
+    is read.
+
+    The archive contains one CSV file per model, named after the model's label
+    (for instance, ``pcari/Comment.csv``), followed by ``manifest.json``. The
+    manifest lists, for each file, the model, the number of rows, the size in
+    bytes and the SHA-256 digest of its uncompressed contents.
+
+    The tables are read one after another rather than in a single
+    transaction, so rows written during the export may appear in some files
+    but not others.
+
+    Args:
+        models_to_export: An iterable of model classes.
+        chunk_size (int): The maximum number of rows to fetch per query.
+
+    Returns:
+        A generator of byte strings.
+    """
+    archive = ZipStream()
+    manifest = []
+    for model in models_to_export:
+        path = '{0}.csv'.format(model._meta.label.replace('.', '/'))
+        entry = OrderedDict([('path', path), ('model', model._meta.label), ('rows', 0)])
+        digest = hashlib.sha256()
+
+        def count_rows(num_rows, entry=entry):
+            entry['rows'] += num_rows
+
+        def hash_chunks(chunks, digest=digest):
+            for chunk in chunks:
+                digest.update(chunk)
+                yield chunk
+
+        # The base manager skips annotations like rating statistics
+        queryset = model._base_manager.all()
+        chunks = export_csv(queryset, chunk_size, progress_callback=count_rows)
+        for data in archive.write(path, hash_chunks(chunks)):
+            yield data
+        entry['bytes'] = archive.members[-1]['size']
+        entry['sha256'] = digest.hexdigest()
+        manifest.append(entry)
+
+    manifest = OrderedDict([
+        ('created', timezone.now().isoformat()),
+        ('files', manifest),
+    ])
+    for data in archive.write('manifest.json', [json.dumps(manifest, indent=2).encode('utf-8')]):
+        yield data
+    for data in archive.close():
+        yield data
+
+
+@profile
+def export_snapshot_data():
+    """
+    Create a full snapshot of the dataset (see :func:`export_snapshot`) for
+    download.
+
+    Returns:
+        A ``StreamingHttpResponse`` with the snapshot as an attached ZIP file.
+    """
+    filename = generate_export_filename('snapshot', 'zip')
+    response = StreamingHttpResponse(export_snapshot(), content_type='application/zip')
+    response['Content-Disposition'] = 'attachment; filename="{0}"'.format(filename)
+    return response
+
+
+def parse_cursor(text):
+    """
+    Parse a cursor produced by :func:`format_cursor`.
+
+    Args:
+        text (str): The cursor, or a blank string for the start of a table.
+
+    Returns:
+        tuple: A timestamp (a ``datetime.datetime``, or ``None`` for rows
+        without one) and a primary key, or ``None`` for a blank cursor.
+
+    Raises:
+        ValueError: if the cursor is malformed.
+    """
+    if not text:
+        return None
+    microseconds, _, primary_key = text.partition(':')
+    timestamp = None
+    if microseconds:
+        epoch = datetime.datetime(1970, 1, 1, tzinfo=timezone.utc)
+        timestamp = epoch + datetime.timedelta(microseconds=int(microseconds))
+    return timestamp, int(primary_key)
+
+
+def format_cursor(timestamp, primary_key):
+    """
+    Encode the position of a row in ``(modified, pk)`` order as a short,
+    URL-safe string of the form ``<microseconds since epoch>:<pk>``.
+    """
+    if timestamp is None:
+        return ':{0}'.format(primary_key)
+    delta = timestamp - datetime.datetime(1970, 1, 1, tzinfo=timezone.utc)
+    microseconds = (delta.days*86400 + delta.seconds)*10**6 + delta.microseconds
+    return '{0}:{1}'.format(microseconds, primary_key)
+
+
+def select_after_cursor(queryset, cursor):
+    """
+    Filter a ``QuerySet`` to the rows after a parsed cursor in
+    ``(modified, pk)`` order, where rows without a timestamp come first.
+    """
+    if cursor is None:
+        return queryset
+    timestamp, primary_key = cursor
+    if timestamp is None:
+        return queryset.filter(Q(modified__isnull=True, pk__gt=primary_key)
+                               | Q(modified__isnull=False))
+    # A range on the timestamp (rather than a disjunction) lets the index be searched
+    return queryset.filter(modified__gte=timestamp).exclude(modified=timestamp,
+                                                            pk__lte=primary_key)
+
+
+def select_through_cursor(queryset, cursor):
+    """ Filter a ``QuerySet`` to the rows up to and including a parsed cursor. """
+    timestamp, primary_key = cursor
+    if timestamp is None:
+        return queryset.filter(modified__isnull=True, pk__lte=primary_key)
+    queryset = queryset.filter(Q(modified__isnull=True) | Q(modified__lte=timestamp))
+    return queryset.exclude(modified=timestamp, pk__gt=primary_key)
+
+
+def find_incremental_window(model, cursor=None, limit=None):
+    """
+    Find the rows of a model to export after a cursor.
+
+    Rows saved within the last ``settings.INCREMENTAL_EXPORT_LAG`` seconds
+    are left for the next export, so rows whose transactions commit out of
+    timestamp order are not skipped.
+
+    Args:
+        model: A model in ``INCREMENTAL_EXPORT_MODELS``.
+        cursor (tuple): A parsed cursor (see :func:`parse_cursor`).
+        limit (int): The maximum number of rows to export, or ``None``.
+
+    Returns:
+        tuple: A ``QuerySet`` of the rows to export and the parsed cursor of
+        the last of them, which is ``cursor`` if there are none.
+    """
+    until = timezone.now() - datetime.timedelta(seconds=settings.INCREMENTAL_EXPORT_LAG)
+    queryset = model._base_manager.filter(Q(modified__lte=until) | Q(modified__isnull=True))
+    queryset = select_after_cursor(queryset, cursor)
+
+    # Only the indexed timestamps and primary keys are read to find the last row
+    ordered = queryset.order_by('modified', 'pk').values_list('modified', 'pk')
+    last = []
+    if limit is not None:
+        last = list(ordered[limit - 1:limit])
+    if not last:
+        last = list(ordered.reverse()[:1])
+    if not last:
+        return queryset.none(), cursor
+    return select_through_cursor(queryset, last[0]), last[0]
+
+
+def export_incremental(model, cursor=None, data_format='csv', limit=None,
+                       chunk_size=settings.EXPORT_CHUNK_SIZE):
+    """
+    Export the rows of a model created or modified after a cursor.
+
+    Rows are read in ``(modified, pk)`` order in chunks that resume after the
+    last row read, so with an index on ``modified`` the cost of an export is
+    proportional to the number of rows exported rather than the size of the
+    table. A row saved again after it was exported is exported again, so
+    consumers should upsert rows by primary key. Deleted rows are not
+    reported.
+
+    Args:
+        model: A model in ``INCREMENTAL_EXPORT_MODELS``.
+        cursor (str): The cursor returned by the previous export, or a blank
+            string to export from the start of the table.
+        data_format (str): Either ``csv`` (with a header) or ``jsonl`` (one
+            JSON object per line).
+        limit (int): The maximum number of rows to export, or ``None``.
+        chunk_size (int): The maximum number of rows to fetch per query.
+
+    Returns:
+        tuple: A generator of UTF-8 encoded ``str`` chunks and the cursor to
+        pass to the next export.
+
+    Raises:
+        ValueError: if the cursor or ``data_format`` is invalid.
+    """
+    if data_format not in ('csv', 'jsonl'):
+        raise ValueError('no such data format "{0}"'.format(data_format))
+    window, next_cursor = find_incremental_window(model, parse_cursor(cursor), limit)
+    encoder = get_row_encoder(model, data_format)
+
+    def generate_chunks():
+        if data_format == 'csv':
+            writer = csv.writer(Echo(), encoding='utf-8')
+            yield writer.writerow(encoder.field_names)
+
+        queryset = window.order_by('modified', 'pk')
+        queryset = queryset.values_list('modified', 'pk', *encoder.field_names)
+        last_cursor = None
+        while True:
+            chunk = list(select_after_cursor(queryset, last_cursor)[:chunk_size])
+            if not chunk:
+                break
+            last_cursor = chunk[-1][:2]
+            if data_format == 'csv':
+                lines = [writer.writerow(encoder.encode(row[2:])) for row in chunk]
+            else:
+                lines = [encoder.encode(row[2:]) for row in chunk]
+            yield b''.join(lines)
+            if len(chunk) < chunk_size:
+                break
+
+    return generate_chunks(), format_cursor(*next_cursor) if next_cursor else ''
+
+
+@profile
+def export_incremental_data(model, cursor=None, data_format='csv', limit=None):
+    """
+    Create an incremental export (see :func:`export_incremental`) for download.
+
+    The cursor for the next export is sent in the ``X-Next-Cursor`` header.
+
+    Returns:
+        A ``StreamingHttpResponse`` with the rows as an attached file, or an
+        ``HttpResponseBadRequest`` with a status code of 400 with an invalid
+        cursor or ``data_format``.
+    """
+    try:
+        chunks, next_cursor = export_incremental(model, cursor, data_format, limit)
+    except ValueError as error:
+        return HttpResponseBadRequest(unicode(error))
+    content_type = 'text/csv' if data_format == 'csv' else 'application/x-ndjson'
+    filename = generate_export_filename(model.__name__ + '-incremental', data_format)
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = 'attachment; filename="{0}"'.format(filename)
+    response['X-Next-Cursor'] = next_cursor
+    return response
+
+
+def dump_model(label, path, chunk_size=settings.EXPORT_CHUNK_SIZE):
+    """
+    Write every instance of a model to a file of newline-delimited JSON.
+
+    Instances are read in keyset-paginated chunks, so memory use does not grow
+    with the size of the table. Each line is an object of the fields exported
+    by :func:`select_fields_for_export`, with related instances given by
+    primary key.
+
+    Args:
+        label (str): The label of the model (for instance, "pcari.Comment").
+        path (str): The path of the file to write.
+        chunk_size (int): The maximum number of rows to fetch per query.
+
+    Returns:
+        tuple: The ``label``, the number of rows written and the number of
+        seconds taken.
+    """
+    start = time.time()
+    model = apps.get_model(label)
+    encoder = get_row_encoder(model, 'jsonl')
+    num_rows = 0
+    with open(path, 'wb') as output:
+        queryset = model._base_manager.all()
+        for rows in iterate_rows(queryset, encoder.field_names, chunk_size):
+            output.write(b''.join(encoder.encode(row) for row in rows))
+            num_rows += len(rows)
+    return label, num_rows, time.time() - start
+
+
+def queue_export_job(queryset, data_format, user=None):
+    """
+    Queue an export to be run in the background by the ``runexportjobs`` command.
+
+    Args:
+        queryset: A Django ``QuerySet`` of instances to export.
+        data_format (str): One of the formats in ``ExportJob.DATA_FORMATS``.
+        user: The user requesting the export, if any.
+
+    Returns:
+        ExportJob: The queued job.
+    """
+    job = ExportJob(data_format=data_format, num_rows=queryset.count(), requested_by=user)
+    job.queryset = queryset
+    job.save()
+    return job
+
+
+def write_export(stream, queryset, data_format, progress_callback=None):
+    """ Write a ``QuerySet`` to a binary stream in one of ``ExportJob.DATA_FORMATS``. """
+    if data_format == 'xlsx':
+        export_excel(stream, queryset, progress_callback=progress_callback)
+        return
+    if data_format == 'wide':
+        chunks = export_wide_csv([queryset], progress_callback=progress_callback)
+    else:
+        chunks = export_csv(queryset, progress_callback=progress_callback)
+    for chunk in chunks:
+        stream.write(chunk)
+
+
+def run_export_job(job_id):
+    """
+    Run a claimed export job, writing its artifact into ``settings.MEDIA_ROOT``.
+
+    The number of rows written is saved after every chunk, so the progress of
+    the job can be followed from the admin site. This function is called in
+    worker processes, so the job is referred to by its primary key.
+
+    Args:
+        job_id (int): The primary key of the :class:`pcari.models.ExportJob`.
+
+    Returns:
+        bool: Whether the job finished successfully.
+    """
+    jobs = ExportJob.objects.filter(pk=job_id)
+    job = jobs.get()
+    extension = 'xlsx' if job.data_format == 'xlsx' else 'csv'
+    filename = generate_export_filename(job.model.split('.')[-1], extension)
+    name = os.path.join(ExportJob._meta.get_field('artifact').upload_to,
+                        '{0}-{1}'.format(job.pk, filename))
+    path = default_storage.path(name)
+
+    def update_progress(num_rows):
+        jobs.update(rows_written=F('rows_written') + num_rows)
+
+    try:
+        try:
+            os.makedirs(os.path.dirname(path))
+        except OSError as error:  # Another worker may have created the directory
+            if error.errno != errno.EEXIST:
+                raise
+        with open(path, 'wb') as stream:
+            write_export(stream, job.queryset, job.data_format, update_progress)
+    except Exception:  # pylint: disable=broad-except
+        LOGGER.exception('Export job %d failed', job.pk)
+        if os.path.exists(path):
+            os.remove(path)
+        jobs.filter(status=ExportJob.RUNNING).update(
+            status=ExportJob.FAILED, error=traceback.format_exc(), finished=timezone.now())
+        return False
+
+    # The job may have been reaped or requeued while it ran
+    if not jobs.filter(status=ExportJob.RUNNING).update(
+            status=ExportJob.FINISHED, artifact=name, finished=timezone.now()):
+        if os.path.exists(path):
+            os.remove(path)
+        return False
+    return True
+
+
+def fetch_sorted_ids(queryset):
+    """ Fetch the primary keys of a ``QuerySet`` as a sorted NumPy array. """
+    primary_keys = queryset.order_by('pk').values_list('pk', flat=True)
+    return np.fromiter(primary_keys.iterator(), dtype=np.int64)
+
+
+@profile
+def fill_ratings_matrix(ratings_matrix, respondent_ids, question_ids,
+                        chunk_size=settings.EXPORT_CHUNK_SIZE):
+    """
+    Write quantitative question ratings into a matrix in fixed-size chunks.
+
+    Only the ratings in one chunk are held in memory at any time, so
+    ``ratings_matrix`` may be a memory-mapped array larger than the available
+    memory. Ratings by respondents or of questions absent from the given
+    identifiers are ignored. Like :func:`pcari.views.generate_ratings_matrix`, skipped ratings
+    and ratings of disabled questions are left untouched.
+
+    Args:
+        ratings_matrix (numpy.ndarray): An `m` by `n` matrix to write to.
+        respondent_ids (numpy.ndarray): A sorted length-`m` array of
+            respondent identifiers. The `i`-th row of ``ratings_matrix``
+            corresponds to the `i`-th respondent.
+        question_ids (numpy.ndarray): A sorted length-`n` array of quantitative
+            question identifiers, which correspond to columns.
+        chunk_size (int): The maximum number of ratings to fetch per query.
+    """
+    ratings = QuantitativeQuestionRating.objects.filter(question__enabled=True)
+    ratings = ratings.exclude(score=QuantitativeQuestionRating.SKIPPED)
+    features = 'id', 'respondent_id', 'question_id', 'score'
+
+    last_id = 0
+    while True:
+        chunk = ratings.filter(id__gt=last_id).order_by('id').values_list(*features)
+        chunk = np.array(list(chunk[:chunk_size]), dtype=np.int64).reshape(-1, len(features))
+        if not chunk.size:
+            break
+        rating_ids, chunk_respondent_ids, chunk_question_ids, scores = chunk.T
+        row_indices = np.searchsorted(respondent_ids, chunk_respondent_ids)
+        column_indices = np.searchsorted(question_ids, chunk_question_ids)
+        # Ratings made after the identifiers were fetched are not written
+        known = (np.take(respondent_ids, row_indices, mode='clip') == chunk_respondent_ids)
+        known &= (np.take(question_ids, column_indices, mode='clip') == chunk_question_ids)
+        ratings_matrix[row_indices[known], column_indices[known]] = scores[known]
+        last_id = rating_ids[-1]
+
+
+@profile
+def export_ratings_matrix(data_format='npz'):
+    """
+    Create a NumPy file of the ratings matrix for download.
+
+    Rows correspond to respondents and columns correspond to quantitative
+    questions, both in ascending order of their identifiers. Missing ratings
+    are ``np.nan``.
+
+    Args:
+        data_format (str): The file format the matrix should be exported as.
+            Current options are:
+            * ``npz`` (default): An uncompressed archive containing the
+              ``float32`` matrix as ``ratings``, and the respondent and
+              question identifiers as ``respondent_ids`` and ``question_ids``.
+            * ``npy``: The ``float32`` matrix alone, which may be opened with
+              ``numpy.load(..., mmap_mode='r')``.
+
+    Returns:
+        A ``FileResponse`` with the requested matrix as an attached file, or
+        an ``HttpResponseBadRequest`` with a status code of 400 with an invalid
+        ``data_format``.
+    """
+    if data_format not in ('npz', 'npy'):
+        return HttpResponseBadRequest('no such data format "{0}"'.format(data_format))
+
+    respondent_ids = fetch_sorted_ids(Respondent.objects)
+    question_ids = fetch_sorted_ids(QuantitativeQuestion.objects)
+    ratings_matrix = np.full((len(respondent_ids), len(question_ids)), np.nan,
+                             dtype=np.float32)
+    fill_ratings_matrix(ratings_matrix, respondent_ids, question_ids)
+
+    temp_file = tempfile.TemporaryFile()
+    if data_format == 'npz':
+        np.savez(temp_file, ratings=ratings_matrix, respondent_ids=respondent_ids,
+                 question_ids=question_ids)
+    else:
+        np.save(temp_file, ratings_matrix)
+    size = temp_file.tell()
+    temp_file.seek(0)
+
+    filename = generate_export_filename('ratings-matrix', data_format)
+    response = FileResponse(temp_file, content_type='application/octet-stream')
+    response['Content-Disposition'] = 'attachment; filename="{0}"'.format(filename)
+    response['Content-Length'] = size
+    return response
+
+
+@profile
+def fill_option_choice_matrix(choice_matrix, respondent_ids, question_ids, options,
+                              chunk_size=settings.EXPORT_CHUNK_SIZE):
+    """
+    Write option question choices into a matrix of option codes in
+    fixed-size chunks.
+
+    Like :func:`fill_ratings_matrix`, choices by respondents or of questions
+    absent from the given identifiers are ignored, as are blank choices and
+    choices of disabled questions.
+
+    Args:
+        choice_matrix (numpy.ndarray): An `m` by `n` integer matrix to write
+            to. Each entry written is an index into ``options``.
+        respondent_ids (numpy.ndarray): A sorted length-`m` array of
+            respondent identifiers, which correspond to rows.
+        question_ids (numpy.ndarray): A sorted length-`n` array of option
+            question identifiers, which correspond to columns.
+        options (list): A list of option texts, which is extended with each
+            option chosen that it does not already contain.
+        chunk_size (int): The maximum number of choices to fetch per query.
+    """
+    option_codes = {option: code for code, option in enumerate(options)}
+    choices = OptionQuestionChoice.objects.filter(question__enabled=True).exclude(option='')
+    features = 'id', 'respondent_id', 'question_id', 'option'
+
+    last_id = 0
+    while True:
+        chunk = list(choices.filter(id__gt=last_id).order_by('id')
+                     .values_list(*features)[:chunk_size])
+        if not chunk:
+            break
+        choice_ids, chunk_respondent_ids, chunk_question_ids, chunk_options = zip(*chunk)
+        codes = np.array([option_codes.setdefault(option, len(option_codes))
+                          for option in chunk_options], dtype=choice_matrix.dtype)
+        chunk_respondent_ids = np.array(chunk_respondent_ids, dtype=np.int64)
+        chunk_question_ids = np.array(chunk_question_ids, dtype=np.int64)
+        row_indices = np.searchsorted(respondent_ids, chunk_respondent_ids)
+        column_indices = np.searchsorted(question_ids, chunk_question_ids)
+        known = (np.take(respondent_ids, row_indices, mode='clip') == chunk_respondent_ids)
+        known &= (np.take(question_ids, column_indices, mode='clip') == chunk_question_ids)
+        choice_matrix[row_indices[known], column_indices[known]] = codes[known]
+        last_id = choice_ids[-1]
+
+    options[len(options):] = sorted(option_codes, key=option_codes.get)[len(options):]
+
+
+def label_question_columns(questions):
+    """
+    Label one column per question by its tag, falling back to its model name
+    and identifier for questions that are untagged or share a tag with another
+    question.
+    """
+    tag_counts = {}
+    for question in questions:
+        tag_counts[question.tag] = tag_counts.get(question.tag, 0) + 1
+    return [question.tag if question.tag and tag_counts[question.tag] == 1
+            else '{0} {1}'.format(type(question).__name__, question.pk)
+            for question in questions]
+
+
+@profile
+def export_pivoted_csv(chunk_size=settings.EXPORT_CHUNK_SIZE):
+    """
+    Export responses as comma-separated values, with one row per respondent
+    and one column per quantitative and option question.
+
+    The ratings and choices are first gathered into NumPy matrices (see
+    :func:`fill_ratings_matrix` and :func:`fill_option_choice_matrix`), which
+    take a few bytes per cell, then formatted one block of respondents at a
+    time. Skipped and missing answers are left blank.
+
+    Args:
+        chunk_size (int): The maximum number of responses to fetch per query,
+            and the number of rows formatted per chunk.
+
+    Returns:
+        A generator of UTF-8 encoded ``str`` chunks, starting with a header of
+        ``respondent_id`` followed by the labels of the quantitative
+        questions, then the option questions (see
+        :func:`label_question_columns`), each in ascending order of their
+        identifiers.
+    """
+    respondent_ids = fetch_sorted_ids(Respondent.objects)
+    quantitative_questions = list(QuantitativeQuestion.objects.order_by('pk'))
+    option_questions = list(OptionQuestion.objects.order_by('pk'))
+    quantitative_question_ids = np.array([question.pk for question in quantitative_questions],
+                                         dtype=np.int64)
+    option_question_ids = np.array([question.pk for question in option_questions],
+                                   dtype=np.int64)
+
+    ratings_matrix = np.full((len(respondent_ids), len(quantitative_question_ids)), np.nan,
+                             dtype=np.float32)
+    fill_ratings_matrix(ratings_matrix, respondent_ids, quantitative_question_ids, chunk_size)
+    choice_matrix = np.full((len(respondent_ids), len(option_question_ids)), -1,
+                            dtype=np.int32)
+    options = []
+    fill_option_choice_matrix(choice_matrix, respondent_ids, option_question_ids, options,
+                              chunk_size)
+
+    # Lookup tables from matrix entries to cells, with the last entry for blanks
+    rated = ~np.isnan(ratings_matrix)
+    max_score = int(ratings_matrix[rated].max()) if rated.any() else 0
+    score_cells = [unicode(score) for score in range(max_score + 1)] + ['']
+    option_cells = options + ['']
+    ratings_matrix[~rated] = len(score_cells) - 1
+    score_codes = ratings_matrix.astype(np.int32)
+    choice_matrix[choice_matrix < 0] = len(option_cells) - 1
+
+    writer = csv.writer(Echo(), encoding='utf-8')
+    yield writer.writerow(['respondent_id']
+                          + label_question_columns(quantitative_questions + option_questions))
+    for start in range(0, len(respondent_ids), chunk_size):
+        stop = start + chunk_size
+        rows = zip(respondent_ids[start:stop].tolist(),
+                   score_codes[start:stop].tolist(), choice_matrix[start:stop].tolist())
+        yield b''.join(writer.writerow([respondent_id] + [score_cells[code] for code in scores]
+                                       + [option_cells[code] for code in choices])
+                       for respondent_id, scores, choices in rows)
+
+
+@profile
+def export_pivoted_data():
+    """
+    Create a CSV file of responses pivoted by respondent for download.
+
+    Returns:
+        A ``StreamingHttpResponse`` with the responses as an attached file.
+    """
+    filename = generate_export_filename('responses-pivoted', 'csv')
+    response = StreamingHttpResponse(export_pivoted_csv(), content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="{0}"'.format(filename)
+    return response
@@ -0,0 +1,95 @@
+"""
+Benchmark export throughput on a freshly seeded database
+"""
+
+from __future__ import unicode_literals
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from pcari.benchmarks import BENCHMARKS, seed_database, run_benchmarks, compare_reports
+
+
+class Command(BaseCommand):
+    """
+    This command creates a test database (named as for ``manage.py test``),
+    seeds it with synthetic responses (see
+    :func:`pcari.benchmarks.seed_database`), runs the export benchmarks, and
+    destroys the database. The existing data are never read or modified.
+
+    The report is written as JSON. Passing the report of an earlier revision
+    with ``--compare`` prints how each benchmark changed.
+    """
+    help = 'Benchmarks export throughput on a freshly seeded database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('benchmarks', nargs='*', metavar='benchmark',
+                            help='The benchmarks to run (by default, all of: {0})'
+                            .format(', '.join(BENCHMARKS)))
+        parser.add_argument('-n', '--respondents', type=int, default=10000,
+                            help='The number of synthetic respondents to create')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='The seed for generating synthetic data')
+        parser.add_argument('--chunk-size', type=int, default=settings.EXPORT_CHUNK_SIZE,
+                            help='The number of rows to fetch per query')
+        parser.add_argument('-o', '--output', help='A path to write the JSON report to '
+                            '(by default, the report is written to standard output)')
+        parser.add_argument('-c', '--compare', metavar='BASELINE',
+                            help='A path to an earlier report to compare against')
+        parser.add_argument('--noinput', '--no-input', action='store_false',
+                            dest='interactive', help='Destroy an existing test database '
+                            'without asking')
+
+    def write_comparison(self, baseline, report):
+        for name, metric, old, new, change in compare_reports(baseline, report):
+            change = '' if change is None else ' ({0:+.1%})'.format(change)
+            self.stdout.write('{0} {1}: {2} -> {3}{4}'.format(name, metric, old, new, change))
+
+    def handle(self, *args, **options):
+        unknown = set(options['benchmarks']) - set(BENCHMARKS)
+        if unknown:
+            raise CommandError('no such benchmarks: {0}'.format(', '.join(sorted(unknown))))
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as baseline_file:
+                baseline = json.load(baseline_file)
+
+        connection = connections['default']
+        temp_dir = tempfile.mkdtemp()
+        test_settings = connection.settings_dict['TEST']
+        test_name = test_settings.get('NAME')
+        if connection.vendor == 'sqlite' and not test_name:
+            # Benchmarks run in child processes, which cannot share an in-memory database
+            test_settings['NAME'] = os.path.join(temp_dir, 'benchmark.sqlite3')
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=not options['interactive'], serialize=False)
+
+        try:
+            self.stderr.write('Seeding {0} respondents ...'.format(options['respondents']))
+            seed_database(options['respondents'], options['seed'])
+
+            def report_progress(name, result):
+                self.stderr.write('{0}: {1} rows in {2}s ({3} rows/s, peak RSS {4} MB)'.format(
+                    name, result['rows'], result['seconds'], result['rows_per_second'],
+                    result['peak_rss_mb']))
+            report = run_benchmarks(options['benchmarks'], options['chunk_size'],
+                                    callback=report_progress)
+            report['seed'] = options['seed']
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            test_settings['NAME'] = test_name
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+        text = json.dumps(report, indent=2, separators=(',', ': '))
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(text + '\n')
+        else:
+            self.stdout.write(text)
+        if baseline is not None:
+            self.write_comparison(baseline, report)
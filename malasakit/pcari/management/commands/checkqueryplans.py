@@ -0,0 +1,46 @@
+"""
+Check that hot queries are answered without full table scans
+"""
+
+from __future__ import unicode_literals
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pcari.queryplans import HOT_QUERIES, check_query_plans
+
+
+class Command(BaseCommand):
+    """
+    This command runs ``EXPLAIN`` on each query in
+    :data:`pcari.queryplans.HOT_QUERIES` and fails if any query scans one of
+    its tables in full (for instance, because a migration dropped an index).
+    Pass ``-v 2`` to print every plan.
+    """
+    help = 'Checks that hot queries are answered without full table scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('queries', nargs='*', metavar='query',
+                            help='The queries to check (by default, all of: {0})'
+                            .format(', '.join(HOT_QUERIES)))
+
+    def handle(self, *args, **options):
+        unknown = set(options['queries']) - set(HOT_QUERIES)
+        if unknown:
+            raise CommandError('no such queries: {0}'.format(', '.join(sorted(unknown))))
+        try:
+            results = check_query_plans(options['queries'])
+        except ValueError as error:
+            raise CommandError(unicode(error))
+
+        failures = []
+        for name, (plan, full_scans) in results.items():
+            if full_scans:
+                failures.append('{0} (scans {1})'.format(name, ', '.join(full_scans)))
+            if options['verbosity'] > 1 or full_scans:
+                self.stdout.write('{0}:'.format(name))
+                for line in plan:
+                    self.stdout.write('    {0}'.format(line))
+        if failures:
+            raise CommandError('full table scans in: {0}'.format('; '.join(failures)))
+        self.stdout.write('Checked {0} quer{1}, none scan a table in full'.format(
+            len(results), 'ies' if len(results) != 1 else 'y'))
@@ -0,0 +1,46 @@
+"""
+Compact response timestamps into hourly rollups
+"""
+
+from __future__ import unicode_literals
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime, parse_date
+
+from pcari.models import ResponseRollup
+
+
+class Command(BaseCommand):
+    """
+    This command recounts recent respondents and responses into
+    :class:`pcari.models.ResponseRollup` buckets. It is meant to be run
+    periodically (for instance, by ``cron``).
+    """
+    help = 'Compacts response timestamps into hourly rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument('-s', '--since', help='An ISO 8601 date or time '
+                            'to recount from (by default, the latest bucket)')
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Recount every bucket from scratch')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['rebuild']:
+            ResponseRollup.objects.all().delete()
+        elif options['since']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                date = parse_date(options['since'])
+                if date is None:
+                    raise CommandError("failed to parse '{0}'".format(options['since']))
+                since = datetime.datetime.combine(date, datetime.time())
+            # Times without an offset are in the current time zone
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+
+        num_buckets = ResponseRollup.objects.compact(since)
+        message = 'Wrote {0} bucket{1}'
+        self.stdout.write(message.format(num_buckets, 's' if num_buckets != 1 else ''))
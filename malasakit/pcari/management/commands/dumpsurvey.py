@@ -0,0 +1,88 @@
+"""
+Dump every survey model to newline-delimited JSON in parallel
+"""
+
+from __future__ import unicode_literals
+from multiprocessing import Pool
+import os
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from pcari.exports import dump_model
+
+APP_LABELS = ('pcari', 'feature_phone')
+
+
+def run_dump(args):
+    """ Unpack the arguments of :func:`pcari.exports.dump_model` in a worker process. """
+    return dump_model(*args)
+
+
+class Command(BaseCommand):
+    """
+    This command writes each model of the ``pcari`` and ``feature_phone``
+    applications to a ``<label>.ndjson`` file (see
+    :func:`pcari.exports.dump_model`), with one worker process per model by
+    default. Unlike ``dumpdata``, tables are read in chunks rather than
+    loaded into memory whole.
+    """
+    help = 'Dumps every survey model to newline-delimited JSON in parallel'
+    pool_class = Pool
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='A directory to write the files to')
+        parser.add_argument('models', nargs='*', metavar='model',
+                            help='Labels of the models to dump (by default, all of them)')
+        parser.add_argument('-p', '--processes', type=int,
+                            help='Number of worker processes (by default, one per model; '
+                            'zero dumps in this process)')
+        parser.add_argument('--chunk-size', type=int, default=settings.EXPORT_CHUNK_SIZE,
+                            help='The number of rows to fetch per query')
+
+    def report(self, label, num_rows, seconds):
+        rate = num_rows/seconds if seconds > 0 else float('inf')
+        message = '{0}: {1} rows in {2:.2f}s ({3:.0f} rows/s)'
+        self.stdout.write(message.format(label, num_rows, seconds, rate))
+
+    def handle(self, *args, **options):
+        if options['processes'] is not None and options['processes'] < 0:
+            raise CommandError('the number of processes must not be negative')
+        labels = options['models']
+        if not labels:
+            labels = [model._meta.label for app_label in APP_LABELS
+                      for model in apps.get_app_config(app_label).get_models()]
+        try:
+            labels = [apps.get_model(label)._meta.label for label in labels]
+        except (LookupError, ValueError) as error:
+            raise CommandError(unicode(error))
+
+        if not os.path.exists(options['output']):
+            os.makedirs(options['output'])
+        tasks = [(label, os.path.join(options['output'], label.lower() + '.ndjson'),
+                  options['chunk_size']) for label in labels]
+        processes = options['processes']
+        processes = len(tasks) if processes is None else processes
+
+        start, total_rows = time.time(), 0
+        if processes > 0:
+            # Forked workers must not share the parent's database connections
+            connections.close_all()
+            pool = self.pool_class(min(processes, len(tasks)),
+                                   initializer=connections.close_all)
+            try:
+                for label, num_rows, seconds in pool.imap_unordered(run_dump, tasks):
+                    self.report(label, num_rows, seconds)
+                    total_rows += num_rows
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            for task in tasks:
+                label, num_rows, seconds = run_dump(task)
+                self.report(label, num_rows, seconds)
+                total_rows += num_rows
+        self.report('Total', total_rows, time.time() - start)
@@ -0,0 +1,74 @@
+"""
+Export the rows of a model created or modified since the previous export
+"""
+
+from __future__ import unicode_literals
+import json
+import os
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from pcari.exports import INCREMENTAL_EXPORT_MODELS, export_incremental
+
+
+class Command(BaseCommand):
+    """
+    This command exports the rows of a model created or modified after a
+    cursor (see :func:`pcari.exports.export_incremental`), for loading into a
+    data warehouse.
+
+    Cursors may be kept in a JSON state file mapping model labels to the
+    cursor after the last row exported. The file is updated only once the
+    export has been written, so a failed export is simply retried from the
+    same cursor.
+    """
+    help = 'Exports the rows of a model created or modified since the previous export'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=list(INCREMENTAL_EXPORT_MODELS),
+                            help='The lowercase label of the model to export')
+        parser.add_argument('-o', '--output', default='-',
+                            help="A path to write the rows to, or '-' for standard output")
+        parser.add_argument('-f', '--format', choices=['csv', 'jsonl'], default='csv',
+                            help='The format to write')
+        parser.add_argument('-c', '--cursor', default='',
+                            help='The cursor to export from (by default, the start '
+                            'of the table or the cursor in the state file)')
+        parser.add_argument('-s', '--state', help='A JSON file of cursors to read '
+                            'from and update')
+        parser.add_argument('--chunk-size', type=int, default=settings.EXPORT_CHUNK_SIZE,
+                            help='The number of rows to fetch per query')
+
+    def handle(self, *args, **options):
+        label, cursors = options['model'], {}
+        if options['state'] and os.path.exists(options['state']):
+            with open(options['state']) as state_file:
+                cursors = json.load(state_file)
+        cursor = options['cursor'] or cursors.get(label, '')
+
+        try:
+            chunks, next_cursor = export_incremental(
+                INCREMENTAL_EXPORT_MODELS[label], cursor, options['format'],
+                chunk_size=options['chunk_size'],
+            )
+        except ValueError as error:
+            raise CommandError(unicode(error))
+
+        if options['output'] == '-':
+            output = getattr(sys.stdout, 'buffer', sys.stdout)
+        else:
+            output = open(options['output'], 'wb')
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        if options['state']:
+            cursors[label] = next_cursor
+            with open(options['state'], 'w') as state_file:
+                json.dump(cursors, state_file, indent=2, sort_keys=True)
+        self.stderr.write('Next cursor: {0}'.format(next_cursor))
@@ -0,0 +1,62 @@
+"""
+Write the ratings matrix to NumPy files incrementally
+"""
+
+from __future__ import unicode_literals
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+import numpy as np
+
+from pcari.exports import fetch_sorted_ids, fill_ratings_matrix
+from pcari.models import Respondent, QuantitativeQuestion
+
+
+class Command(BaseCommand):
+    """
+    This command writes the respondent by quantitative question ratings matrix
+    (see :func:`pcari.exports.export_ratings_matrix`) without holding the
+    matrix in memory.
+
+    The ``float32`` matrix is written to a memory-mapped ``.npy`` file one chunk
+    of ratings at a time. The respondent and question identifiers that label
+    the rows and columns are written alongside the matrix to files with
+    ``-respondent-ids`` and ``-question-ids`` suffixes. With the ``npz``
+    format, the three arrays are then packed into a single archive.
+    """
+    help = 'Writes the ratings matrix to NumPy files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='A path to write the matrix to, '
+                            "ending in '.npy' or '.npz'")
+        parser.add_argument('--chunk-size', type=int, default=settings.EXPORT_CHUNK_SIZE,
+                            help='The number of ratings to fetch per query')
+
+    def handle(self, *args, **options):
+        prefix, extension = os.path.splitext(options['output'])
+        respondent_ids = fetch_sorted_ids(Respondent.objects)
+        question_ids = fetch_sorted_ids(QuantitativeQuestion.objects)
+
+        matrix_path = prefix + '.npy'
+        shape = len(respondent_ids), len(question_ids)
+        ratings_matrix = np.lib.format.open_memmap(matrix_path, mode='w+',
+                                                   dtype=np.float32, shape=shape)
+        ratings_matrix[:] = np.nan
+        fill_ratings_matrix(ratings_matrix, respondent_ids, question_ids,
+                            chunk_size=options['chunk_size'])
+        ratings_matrix.flush()
+
+        if extension == '.npz':
+            np.savez(options['output'], ratings=ratings_matrix,
+                     respondent_ids=respondent_ids, question_ids=question_ids)
+            del ratings_matrix
+            os.remove(matrix_path)
+            paths = [options['output']]
+        else:
+            paths = [matrix_path, prefix + '-respondent-ids.npy', prefix + '-question-ids.npy']
+            np.save(paths[1], respondent_ids)
+            np.save(paths[2], question_ids)
+
+        message = 'Wrote {0} by {1} ratings matrix to {2}'
+        self.stdout.write(message.format(shape[0], shape[1], ', '.join(paths)))
@@ -0,0 +1,42 @@
+"""
+Write a full snapshot of the dataset to a ZIP archive
+"""
+
+from __future__ import unicode_literals
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from pcari.exports import export_snapshot
+
+
+class Command(BaseCommand):
+    """
+    This command writes every table of the survey (see
+    :func:`pcari.exports.export_snapshot`) to a ZIP archive of CSV files with
+    a manifest of row counts and checksums. The archive is written as it is
+    generated, so it may also be piped elsewhere by passing ``-`` as the
+    output.
+    """
+    help = 'Writes a full snapshot of the dataset to a ZIP archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="A path to write the archive to, or '-' "
+                            'for standard output')
+        parser.add_argument('--chunk-size', type=int, default=settings.EXPORT_CHUNK_SIZE,
+                            help='The number of rows to fetch per query')
+
+    def handle(self, *args, **options):
+        if options['output'] == '-':
+            output = getattr(sys.stdout, 'buffer', sys.stdout)
+        else:
+            output = open(options['output'], 'wb')
+        try:
+            for data in export_snapshot(chunk_size=options['chunk_size']):
+                output.write(data)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        if options['output'] != '-':
+            self.stdout.write('Wrote {0}'.format(options['output']))
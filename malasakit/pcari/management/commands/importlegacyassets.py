@@ -0,0 +1,60 @@
+"""
+Import images uploaded before the asset manifest existed
+"""
+
+from __future__ import unicode_literals
+from base64 import b64decode
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from pcari.assets import get_asset, save_image_asset
+
+LEGACY_LANDING_IMAGE_PATH = os.path.join('img', 'landing')
+LEGACY_BLOOM_ICON_PATH = os.path.join('data', 'bloom-icon.json')
+
+
+def read_landing_image(path):
+    with open(path, 'rb') as image_file:
+        return image_file.read()
+
+
+def read_bloom_icon(path):
+    with open(path, 'rb') as icon_file:
+        return b64decode(json.load(icon_file)['encoded-image'])
+
+
+class Command(BaseCommand):
+    """
+    This command processes the landing image (``img/landing``) and bloom icon
+    (``data/bloom-icon.json``) uploaded before images were processed into
+    content-hashed variants (see :mod:`pcari.assets`), and adds them to the
+    asset manifest. Assets already in the manifest are left alone, unless
+    ``--force`` is given. The legacy files are not deleted.
+    """
+    help = 'Imports images uploaded before the asset manifest existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Replace assets already in the manifest')
+
+    def handle(self, *args, **options):
+        legacy_assets = [
+            ('landing-image', LEGACY_LANDING_IMAGE_PATH, read_landing_image),
+            ('bloom-icon', LEGACY_BLOOM_ICON_PATH, read_bloom_icon),
+        ]
+        for name, legacy_path, read in legacy_assets:
+            path = os.path.join(settings.STATIC_ROOT, legacy_path)
+            if not os.path.exists(path):
+                continue
+            if get_asset(name) is not None and not options['force']:
+                self.stdout.write('Skipped {0}: already in the manifest'.format(name))
+                continue
+            try:
+                entry = save_image_asset(name, read(path))
+            except (ValueError, KeyError, TypeError) as error:
+                self.stderr.write('Could not import {0}: {1}'.format(legacy_path, error))
+                continue
+            self.stdout.write('Imported {0} as {1}'.format(legacy_path, entry['src']))
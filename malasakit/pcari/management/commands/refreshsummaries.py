@@ -0,0 +1,24 @@
+"""
+Recompute the quantitative question summaries shown to respondents
+"""
+
+from __future__ import unicode_literals
+
+from django.core.management.base import BaseCommand
+
+from pcari.views import refresh_question_summaries
+
+
+class Command(BaseCommand):
+    """
+    This command recomputes every :class:`pcari.models.QuantitativeQuestionSummary`
+    and evicts the cached peer responses page. The page refreshes stale
+    summaries on its own, so this command is only needed to publish new
+    ratings immediately (for instance, after an import).
+    """
+    help = 'Recomputes the quantitative question summaries'
+
+    def handle(self, *args, **options):
+        num_summaries = refresh_question_summaries()
+        message = 'Wrote {0} summar{1}'
+        self.stdout.write(message.format(num_summaries, 'ies' if num_summaries != 1 else 'y'))
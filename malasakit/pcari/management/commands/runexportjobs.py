@@ -0,0 +1,111 @@
+"""
+Run queued export jobs in a pool of worker processes
+"""
+
+from __future__ import unicode_literals
+import datetime
+from multiprocessing import Pool
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from pcari.exports import run_export_job
+from pcari.models import ExportJob
+
+
+class Command(BaseCommand):
+    """
+    This command claims queued :class:`pcari.models.ExportJob` instances and
+    runs them in a pool of worker processes, deleting artifacts older than
+    ``settings.EXPORT_RETENTION_DAYS`` as it goes. It is meant to run
+    continuously alongside the web server (for instance, under
+    ``supervisord``).
+
+    Jobs still running when the pool is terminated are requeued, and jobs
+    running for longer than ``settings.EXPORT_JOB_TIMEOUT`` (for instance,
+    because their worker crashed) are failed.
+    """
+    help = 'Runs queued export jobs in a pool of worker processes'
+    pool_class = Pool
+
+    def add_arguments(self, parser):
+        parser.add_argument('-p', '--processes', type=int,
+                            default=settings.EXPORT_WORKER_PROCESSES,
+                            help='Number of worker processes (zero runs jobs '
+                            'in this process)')
+        parser.add_argument('-i', '--interval', type=float, default=5,
+                            help='Seconds to wait between polling for jobs')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once no jobs are queued or running')
+
+    def clean_up(self):
+        """ Fail abandoned jobs, and delete old ones. """
+        cutoff = timezone.now() - datetime.timedelta(seconds=settings.EXPORT_JOB_TIMEOUT)
+        num_jobs = ExportJob.objects.reap(cutoff)
+        if num_jobs:
+            self.stdout.write('Failed {0} abandoned export{1}'.format(num_jobs, 's' if num_jobs != 1 else ''))
+        cutoff = timezone.now() - datetime.timedelta(days=settings.EXPORT_RETENTION_DAYS)
+        num_jobs = ExportJob.objects.purge(cutoff)
+        if num_jobs:
+            self.stdout.write('Deleted {0} old export{1}'.format(num_jobs, 's' if num_jobs != 1 else ''))
+
+    def run_inline(self, options):
+        while True:
+            self.clean_up()
+            job_ids = ExportJob.objects.claim(1)
+            for job_id in job_ids:
+                run_export_job(job_id)
+                self.stdout.write('Finished export job {0}'.format(job_id))
+            if not job_ids:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+
+    def report(self, job_id, result):
+        """ Report the outcome of a job, failing it if its worker raised an exception. """
+        if not result.successful():
+            try:
+                result.get()
+            except Exception as error:  # pylint: disable=broad-except
+                ExportJob.objects.filter(pk=job_id, status=ExportJob.RUNNING).update(
+                    status=ExportJob.FAILED, error=repr(error), finished=timezone.now())
+        if result.successful() and result.get():
+            self.stdout.write('Finished export job {0}'.format(job_id))
+        else:
+            self.stdout.write('Export job {0} failed'.format(job_id))
+
+    def run_pool(self, options):
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        pool = self.pool_class(options['processes'], initializer=connections.close_all)
+        pending = []
+        try:
+            while True:
+                self.clean_up()
+                for job_id, result in pending:
+                    if result.ready():
+                        self.report(job_id, result)
+                pending = [(job_id, result) for job_id, result in pending
+                           if not result.ready()]
+                for job_id in ExportJob.objects.claim(options['processes'] - len(pending)):
+                    pending.append((job_id, pool.apply_async(run_export_job, (job_id, ))))
+                if options['once'] and not pending:
+                    break
+                time.sleep(options['interval'])
+        finally:
+            pool.terminate()
+            pool.join()
+            unfinished = [job_id for job_id, result in pending if not result.ready()]
+            num_jobs = ExportJob.objects.requeue(unfinished)
+            if num_jobs:
+                self.stdout.write('Requeued {0} unfinished export{1}'.format(
+                    num_jobs, 's' if num_jobs != 1 else ''))
+
+    def handle(self, *args, **options):
+        if options['processes'] > 0:
+            self.run_pool(options)
+        else:
+            self.run_inline(options)
@@ -0,0 +1,58 @@
+"""
+Sign comments for near-duplicate detection
+"""
+
+from __future__ import unicode_literals
+
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef
+
+from pcari.duplicates import index_comments, link_near_duplicate
+from pcari.models import Comment, CommentSignature
+
+
+class Command(BaseCommand):
+    """
+    This command signs comments with MinHash and places them in buckets (see
+    :mod:`pcari.duplicates`). New and edited comments are signed as they are
+    saved, so this command is only needed for comments written before
+    signatures were introduced, or changed with bulk updates.
+
+    With ``--link``, each comment that nearly duplicates an earlier one is
+    linked to it through its ``original`` field, which excludes it from the
+    comments respondents rate.
+    """
+    help = 'Signs comments for near-duplicate detection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', dest='resign',
+                            help='Sign every comment again, not only unsigned ones')
+        parser.add_argument('--link', action='store_true',
+                            help='Link near-duplicate comments to the earliest comment '
+                            'they duplicate')
+        parser.add_argument('--threshold', type=float, default=None,
+                            help='The minimum similarity of linked comments')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='The number of comments to sign per transaction')
+
+    def handle(self, *args, **options):
+        comments = Comment._base_manager.all()
+        if not options['resign']:
+            comments = comments.exclude(pk__in=CommentSignature.objects.values('comment_id'))
+        num_signed = index_comments(comments, options['batch_size'])
+        self.stdout.write('Signed {0} comment{1}'.format(num_signed,
+                                                         's' if num_signed != 1 else ''))
+
+        if options['link']:
+            num_linked = 0
+            translations = Comment._base_manager.filter(original=OuterRef('pk'))
+            unlinked = (Comment._base_manager.filter(original=None, signature__isnull=False)
+                        .annotate(has_translations=Exists(translations))
+                        .only('pk', 'original', 'language').order_by('pk'))
+            for comment in unlinked.iterator():
+                original_id = link_near_duplicate(comment, options['threshold'],
+                                                  comment.has_translations)
+                if original_id is not None:
+                    num_linked += 1
+            self.stdout.write('Linked {0} near-duplicate comment{1}'.format(
+                num_linked, 's' if num_linked != 1 else ''))
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-19 04:36
+from __future__ import unicode_literals
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pcari', '0071_auto_20180214_2057'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResponseRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=64)),
+                ('channel', models.CharField(choices=[('web', 'Web'), ('phone', 'Feature phone')], max_length=8)),
+                ('language', models.CharField(blank=True, choices=[(b'en', 'English'), (b'tl', 'Filipino')], default='', max_length=8, validators=[django.core.validators.RegexValidator('^(|en|tl)$')])),
+                ('bucket', models.DateTimeField(db_index=True)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'default_permissions': ('add', 'change', 'delete', 'view'),
+            },
+        ),
+        migrations.AddField(
+            model_name='respondent',
+            name='timestamp',
+            field=models.DateTimeField(auto_now_add=True, null=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name='responserollup',
+            unique_together=set([('model', 'channel', 'language', 'bucket')]),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.3 on 2026-10-19 02:33
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pcari', '0072_responserollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuantitativeQuestionSummary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('num_ratings', models.PositiveIntegerField(default=0)),
+                ('mean_score', models.FloatField(blank=True, default=None, null=True)),
+                ('score_95ci_lower', models.FloatField(blank=True, default=None, null=True)),
+                ('score_95ci_upper', models.FloatField(blank=True, default=None, null=True)),
+                ('_histogram_text', models.TextField(blank=True, default=b'{}')),
+                ('last_updated', models.DateTimeField(auto_now=True)),
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='summary', to='pcari.QuantitativeQuestion')),
+            ],
+            options={
+                'default_permissions': ('add', 'change', 'delete', 'view'),
+                'verbose_name_plural': 'quantitative question summaries',
+            },
+        ),
+    ]
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import logging
+
+from django.db import DatabaseError, migrations, transaction
+
+LOGGER = logging.getLogger('pcari')
+
+SQLITE_CREATE_INDEX = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS pcari_comment_fts USING fts5(
+        message, tag, content='pcari_comment', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 1'
+    )
+    """,
+    "INSERT INTO pcari_comment_fts(pcari_comment_fts) VALUES ('rebuild')",
+    """
+    CREATE TRIGGER IF NOT EXISTS pcari_comment_fts_insert AFTER INSERT ON pcari_comment BEGIN
+        INSERT INTO pcari_comment_fts(rowid, message, tag)
+            VALUES (new.id, new.message, new.tag);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS pcari_comment_fts_delete AFTER DELETE ON pcari_comment BEGIN
+        INSERT INTO pcari_comment_fts(pcari_comment_fts, rowid, message, tag)
+            VALUES ('delete', old.id, old.message, old.tag);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS pcari_comment_fts_update
+    AFTER UPDATE OF message, tag ON pcari_comment BEGIN
+        INSERT INTO pcari_comment_fts(pcari_comment_fts, rowid, message, tag)
+            VALUES ('delete', old.id, old.message, old.tag);
+        INSERT INTO pcari_comment_fts(rowid, message, tag)
+            VALUES (new.id, new.message, new.tag);
+    END
+    """,
+]
+
+SQLITE_DROP_INDEX = [
+    'DROP TRIGGER IF EXISTS pcari_comment_fts_insert',
+    'DROP TRIGGER IF EXISTS pcari_comment_fts_delete',
+    'DROP TRIGGER IF EXISTS pcari_comment_fts_update',
+    'DROP TABLE IF EXISTS pcari_comment_fts',
+]
+
+MYSQL_FIND_INDEX = "SHOW INDEX FROM pcari_comment WHERE Key_name = 'pcari_comment_fulltext'"
+MYSQL_CREATE_INDEX = 'ALTER TABLE pcari_comment ADD FULLTEXT INDEX pcari_comment_fulltext (message, tag)'
+MYSQL_DROP_INDEX = 'ALTER TABLE pcari_comment DROP INDEX pcari_comment_fulltext'
+
+
+def create_index(apps, schema_editor):
+    # pylint: disable=unused-argument
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        try:
+            with transaction.atomic(using=connection.alias):
+                with connection.cursor() as cursor:
+                    for statement in SQLITE_CREATE_INDEX:
+                        cursor.execute(statement)
+        except DatabaseError as error:
+            # For instance, SQLite may be compiled without FTS5
+            LOGGER.warning('Unable to create the comment index: %s', error)
+    elif connection.vendor == 'mysql':
+        with connection.cursor() as cursor:
+            cursor.execute(MYSQL_FIND_INDEX)
+            if cursor.fetchone() is None:
+                cursor.execute(MYSQL_CREATE_INDEX)
+
+
+def drop_index(apps, schema_editor):
+    # pylint: disable=unused-argument
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            for statement in SQLITE_DROP_INDEX:
+                cursor.execute(statement)
+    elif connection.vendor == 'mysql':
+        with connection.cursor() as cursor:
+            cursor.execute(MYSQL_FIND_INDEX)
+            if cursor.fetchone() is not None:
+                cursor.execute(MYSQL_DROP_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pcari', '0075_timestamp_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
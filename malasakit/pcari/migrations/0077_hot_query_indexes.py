@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-19 03:37
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pcari', '0076_comment_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quantitativequestionrating',
+            index=models.Index(fields=['question', 'score'], name='pcari_qqr_question_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['original', 'flagged', 'question'], name='pcari_comment_visible_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['language', 'flagged'], name='pcari_comment_language_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-19 03:42
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pcari', '0077_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentBucket',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.BigIntegerField(db_index=True)),
+            ],
+            options={
+                'default_permissions': ('add', 'change', 'delete', 'view'),
+            },
+        ),
+        migrations.CreateModel(
+            name='CommentSignature',
+            fields=[
+                ('comment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='pcari.Comment')),
+                ('minhash', models.BinaryField()),
+            ],
+            options={
+                'default_permissions': ('add', 'change', 'delete', 'view'),
+            },
+        ),
+        migrations.AddField(
+            model_name='commentbucket',
+            name='comment',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='pcari.Comment'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-19 04:20
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import pcari.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pcari', '0078_comment_signatures'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='comment',
+            name='original',
+            field=models.ForeignKey(default=None, help_text='If this comment is a translation, this field references the original suggestion.', null=True, on_delete=pcari.models.delete_translations, related_name='translations', to='pcari.Comment'),
+        ),
+    ]
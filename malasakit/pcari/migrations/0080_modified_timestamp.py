@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-19 04:23
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+def copy_timestamps(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    for model_name in ['Respondent', 'Comment', 'CommentRating', 'QuantitativeQuestionRating', 'OptionQuestionChoice']:
+        model = apps.get_model('pcari', model_name)
+        model.objects.using(db_alias).update(modified=models.F('timestamp'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pcari', '0079_unlink_duplicates_on_delete'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='commentrating',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='optionquestionchoice',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='quantitativequestionrating',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='respondent',
+            name='modified',
+            field=models.DateTimeField(auto_now=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(copy_timestamps, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-19 04:49
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import pcari.models
+
+
+def mark_duplicates(apps, schema_editor):
+    # Until now, duplicates were the links between comments in the same language
+    db_alias = schema_editor.connection.alias
+    Comment = apps.get_model('pcari', 'Comment')
+    Comment.objects.using(db_alias).filter(
+        original__isnull=False, language=models.F('original__language'),
+    ).update(duplicate=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pcari', '0080_modified_timestamp'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='duplicate',
+            field=models.BooleanField(default=False, help_text='Indicates whether this comment nearly duplicates the original suggestion, rather than translating it.'),
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='original',
+            field=models.ForeignKey(default=None, help_text='If this comment is a translation or a near-duplicate, this field references the original suggestion.', null=True, on_delete=pcari.models.delete_translations, related_name='translations', to='pcari.Comment'),
+        ),
+        migrations.RunPython(mark_duplicates, migrations.RunPython.noop),
+    ]
@@ -22,20 +22,30 @@ Attributes:
 """
 
 from __future__ import division, unicode_literals
+from collections import defaultdict
+import cPickle as pickle
 import json
+import os
 
+from django.apps import apps
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
 from django.core.validators import RegexValidator
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db import models
-from django.db.models import F, Func, Count, Avg, Sum, StdDev, Case, When
+from django.db import models, transaction
+from django.db.models import F, Func, Count, Avg, Sum, StdDev, Case, When, Max
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import TruncHour
 from django.db.models.functions.base import Coalesce, Greatest, Least
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
 __all__ = ['Comment', 'QuantitativeQuestionRating', 'CommentRating',
            'QualitativeQuestion', 'QuantitativeQuestion', 'Respondent',
            'OptionQuestion', 'OptionQuestionChoice', 'Location',
+           'QuantitativeQuestionSummary', 'ResponseRollup', 'CommentSignature',
+           'CommentBucket', 'ExportJob',
            'get_concrete_fields', 'get_direct_fields']
 
 _LANGUAGE_CODES = [''] + [code for code, name in settings.LANGUAGES]
@@ -59,6 +69,21 @@ class Sqrt(Func):
     arity = 1
 
 
+def delete_translations(collector, field, sub_objs, using):
+    """
+    Handle the deletion of a comment referenced through ``original``: delete
+    its translations, but only unlink its near-duplicates (see
+    :func:`pcari.duplicates.link_near_duplicate`), which are responses in
+    their own right. Duplicates are marked by their ``duplicate`` field.
+    """
+    duplicates = sub_objs.filter(duplicate=True)
+    collector.add_field_update(field, None, duplicates)
+    collector.add_field_update(field.model._meta.get_field('duplicate'), False, duplicates)
+    collector.add_field_update(field.model._meta.get_field('modified'), timezone.now(),
+                               duplicates)
+    models.CASCADE(collector, field, sub_objs.filter(duplicate=False), using)
+
+
 class RatingStatisticsManager(models.Manager):
     """
     A ``RatingStatisticsManager`` annotates ``QuerySet``s of ratable models
@@ -120,9 +145,12 @@ class Response(models.Model):
         timestamp (datetime.datetime): When this response was made. (By
             default, this field is automatically set to the time when the
             instance is created. This field is not editable.)
+        modified (datetime.datetime): When this response was last saved.
+            (Bulk updates must set this field themselves.)
     """
     respondent = models.ForeignKey('Respondent', on_delete=models.CASCADE)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+    modified = models.DateTimeField(auto_now=True, null=True, db_index=True)
 
     class Meta(ViewMeta):
         abstract = True
@@ -182,6 +210,10 @@ class QuantitativeQuestionRating(Rating):
 
     class Meta(ViewMeta):
         unique_together = ('respondent', 'question')
+        indexes = [
+            # Covers the rating histograms of question summaries
+            models.Index(fields=['question', 'score'], name='pcari_qqr_question_score_idx'),
+        ]
 
 
 class CommentRating(Rating):
@@ -215,8 +247,12 @@ class Comment(Response):
             inspection. A flagged comment will not show up to other
             respondents.
         tag (str): A short summary of this comment's message.
-        original: If this comment is a translation, this field references the
-            original comment.
+        original: If this comment is a translation or a near-duplicate, this
+            field references the original comment. Deleting a comment deletes
+            its translations, but only unlinks its duplicates.
+        duplicate (bool): Whether this comment nearly duplicates its
+            ``original``, rather than translating it (see
+            :mod:`pcari.duplicates`).
         word_count (int): The number of words in the `message`. (Words are
             delimited with contiguous whitespace.)
     """
@@ -233,10 +269,13 @@ class Comment(Response):
                     'be displayed to participants.'))
     tag = models.CharField(max_length=256, blank=True, default='',
         help_text=_('One or more comma-separated topics this comment relates to.'))
-    original = models.ForeignKey('self', on_delete=models.CASCADE, null=True,
+    original = models.ForeignKey('self', on_delete=delete_translations, null=True,
         default=None, related_name='translations',
-        help_text=_('If this comment is a translation, this field references '
-                    'the original suggestion.'))
+        help_text=_('If this comment is a translation or a near-duplicate, '
+                    'this field references the original suggestion.'))
+    duplicate = models.BooleanField(default=False,
+        help_text=_('Indicates whether this comment nearly duplicates the '
+                    'original suggestion, rather than translating it.'))
 
     def __unicode__(self):
         if self.message is not None and self.message.strip():
@@ -250,6 +289,16 @@ class Comment(Response):
     def word_count(self):
         return len(self.message.split())
 
+    class Meta(ViewMeta):
+        # ``message`` cannot be indexed, since MySQL only indexes prefixes of text columns
+        indexes = [
+            # Covers the comments shown to respondents (see ``pcari.views.fetch_comments``)
+            models.Index(fields=['original', 'flagged', 'question'],
+                         name='pcari_comment_visible_idx'),
+            # Covers the comments played to callers (see ``feature_phone.views``)
+            models.Index(fields=['language', 'flagged'], name='pcari_comment_language_idx'),
+        ]
+
 
 class Question(models.Model):
     """
@@ -336,6 +385,92 @@ class QuantitativeQuestion(Question):
         return 'Quantitative question {0}: "{1}"'.format(self.pk, self.prompt)
 
 
+class QuantitativeQuestionSummaryManager(models.Manager):
+    """
+    A ``QuantitativeQuestionSummaryManager`` recomputes
+    :class:`QuantitativeQuestionSummary` instances in bulk.
+    """
+    def refresh(self):
+        """
+        Replace every summary with one computed from the current ratings.
+
+        Returns:
+            int: The number of summaries written.
+        """
+        histograms = defaultdict(dict)
+        ratings = QuantitativeQuestionRating.objects.exclude(score=Rating.SKIPPED)
+        ratings = ratings.order_by().values('question_id', 'score').annotate(count=Count('pk'))
+        for rating in ratings:
+            histograms[rating['question_id']][rating['score']] = rating['count']
+
+        features = ('id', 'num_ratings', 'mean_score', 'score_95ci_lower', 'score_95ci_upper')
+        summaries = []
+        for question_id, num_ratings, mean_score, lower, upper in \
+                QuantitativeQuestion.objects.values_list(*features):
+            summary = QuantitativeQuestionSummary(
+                question_id=question_id,
+                num_ratings=num_ratings,
+                mean_score=mean_score,
+                score_95ci_lower=lower,
+                score_95ci_upper=upper,
+            )
+            summary.histogram = histograms[question_id]
+            summaries.append(summary)
+
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(summaries)
+        return len(summaries)
+
+
+class QuantitativeQuestionSummary(models.Model):
+    """
+    A ``QuantitativeQuestionSummary`` stores descriptive statistics of the
+    ratings a :class:`QuantitativeQuestion` has received, as computed by
+    :class:`RatingStatisticsManager`, so they need not be recomputed for every
+    request.
+
+    Attributes:
+        question: The quantitative question summarized.
+        num_ratings (int): The number of ratings the question has received.
+        mean_score (float): The mean score, or ``None`` without ratings.
+        score_95ci_lower (float): The lowerbound of the 95% confidence interval
+            about the mean score.
+        score_95ci_upper (float): The upperbound of the 95% confidence interval
+            about the mean score.
+        _histogram_text (str): A JSON object mapping scores to the number of
+            times each was given. This field should only be used internally by
+            this model.
+        histogram (dict): A wrapper around :attr:`_histogram_text` that
+            automatically serializes and unserializes a Python ``dict`` from
+            integer scores to counts.
+        last_updated (datetime.datetime): When this summary was computed.
+    """
+    objects = QuantitativeQuestionSummaryManager()
+    question = models.OneToOneField('QuantitativeQuestion', on_delete=models.CASCADE,
+        related_name='summary')
+    num_ratings = models.PositiveIntegerField(default=0)
+    mean_score = models.FloatField(null=True, blank=True, default=None)
+    score_95ci_lower = models.FloatField(null=True, blank=True, default=None)
+    score_95ci_upper = models.FloatField(null=True, blank=True, default=None)
+    _histogram_text = models.TextField(blank=True, default=json.dumps({}))
+    last_updated = models.DateTimeField(auto_now=True)
+
+    @property
+    def histogram(self):
+        return {int(score): count for score, count in json.loads(self._histogram_text).items()}
+
+    @histogram.setter
+    def histogram(self, counts):
+        self._histogram_text = json.dumps(counts, sort_keys=True)
+
+    def __unicode__(self):
+        return 'Summary of {0}'.format(self.question)
+
+    class Meta(ViewMeta):
+        verbose_name_plural = 'quantitative question summaries'
+
+
 class OptionQuestion(Question):
     """
     An ``OptionQuestion`` is a question that asks the respondent to select one
@@ -466,6 +601,49 @@ class Location(models.Model):
         unique_together = ('country', 'province', 'municipality', 'division')
 
 
+class RespondentQuerySet(models.QuerySet):
+    """
+    A ``RespondentQuerySet`` can annotate respondents with how far they
+    progressed through the survey, so that listing many respondents does not
+    require a query per respondent.
+    """
+    @staticmethod
+    def count_rated(model):
+        ratings = model.objects.filter(respondent=OuterRef('pk')).exclude(score=Rating.SKIPPED)
+        ratings = ratings.order_by().values('respondent').annotate(count=Count('pk'))
+        return Coalesce(Subquery(ratings.values('count'),
+                                 output_field=models.PositiveIntegerField()), 0)
+
+    def annotate_progress(self):
+        """
+        Annotate each respondent with ``_num_questions_rated`` and
+        ``_num_comments_rated``, which :attr:`Respondent.num_questions_rated`
+        and :attr:`Respondent.num_comments_rated` use when present.
+
+        Each count is a correlated subquery rather than a join, so the two
+        counts do not multiply each other's rows.
+        """
+        return self.annotate(
+            _num_questions_rated=self.count_rated(QuantitativeQuestionRating),
+            _num_comments_rated=self.count_rated(CommentRating),
+        )
+
+    def count(self):
+        """
+        Count respondents without evaluating annotations in the ``SELECT``
+        clause, which Django would otherwise compute for every row counted.
+
+        Only querysets of whole respondents are counted by primary key. The
+        selected columns of ``values()``, ``DISTINCT`` and ``GROUP BY``
+        queries determine which rows are counted, so those are counted as is.
+        """
+        if self._result_cache is not None:
+            return len(self._result_cache)
+        if self._fields is None and not self.query.distinct and self.query.group_by is None:
+            return super(RespondentQuerySet, self.values('pk')).count()
+        return super(RespondentQuerySet, self).count()
+
+
 class Respondent(models.Model):
     """
     A ``Respondent`` represents a one-time participant in a survey.
@@ -492,6 +670,13 @@ class Respondent(models.Model):
             attribute. This excludes comments the respondent did not rate.
         comments: A Django ``QuerySet`` of all comments attached to this
             respondent.
+        timestamp (datetime.datetime): When this respondent was created. (This
+            field is not editable, and is ``None`` for respondents created
+            before the field was introduced.)
+        modified (datetime.datetime): When this respondent was last saved.
+            (Bulk updates must set this field themselves. This field is
+            ``None`` for respondents without a ``timestamp`` that were not
+            saved since.)
     """
     GENDERS = (
         ('', _('(Empty)')),
@@ -510,17 +695,25 @@ class Respondent(models.Model):
     sector = models.CharField(max_length=64, blank=True, default='')
     uuid = models.UUIDField(unique=True, default=None, editable=False,
         null=True, blank=True, help_text=_('Unique identifier generated client-side.'))
+    timestamp = models.DateTimeField(auto_now_add=True, null=True, db_index=True)
+    modified = models.DateTimeField(auto_now=True, null=True, db_index=True)
+
+    objects = RespondentQuerySet.as_manager()
 
     def __unicode__(self):
         return 'Respondent {0}'.format(self.pk)
 
     def num_questions_rated(self):
+        if hasattr(self, '_num_questions_rated'):
+            return self._num_questions_rated
         ratings = QuantitativeQuestionRating.objects.filter(respondent=self)
         return ratings.exclude(score=Rating.SKIPPED).count()
     num_questions_rated.short_description = 'Number of questions rated'
     num_questions_rated = property(num_questions_rated)
 
     def num_comments_rated(self):
+        if hasattr(self, '_num_comments_rated'):
+            return self._num_comments_rated
         ratings = CommentRating.objects.filter(respondent=self)
         return ratings.exclude(score=Rating.SKIPPED).count()
     num_comments_rated.short_description = 'Number of comments rated'
@@ -528,8 +721,340 @@ class Respondent(models.Model):
 
     @property
     def comments(self):
-        return Comment.objects.filter(respondent=self).all()
+        # Uses the comments prefetched with ``prefetch_related('comment_set')``, if any
+        return self.comment_set.all()
+
+    class Meta(ViewMeta):
+        pass
+
+
+class ResponseRollupManager(models.Manager):
+    """
+    A ``ResponseRollupManager`` maintains :class:`ResponseRollup` instances by
+    compacting the timestamps of tracked models into hourly buckets.
+
+    Attributes:
+        TRACKED_MODELS (tuple): Triples consisting of the label of a tracked
+            model, the channel that model collects data through, and the lookup
+            of the language of the respondent.
+    """
+    TRACKED_MODELS = (
+        ('pcari.Respondent', 'web', 'language'),
+        ('pcari.Comment', 'web', 'respondent__language'),
+        ('pcari.QuantitativeQuestionRating', 'web', 'respondent__language'),
+        ('pcari.CommentRating', 'web', 'respondent__language'),
+        ('pcari.OptionQuestionChoice', 'web', 'respondent__language'),
+        ('feature_phone.Respondent', 'phone', 'language'),
+        ('feature_phone.Response', 'phone', 'respondent__language'),
+    )
+
+    def compact(self, since=None):
+        """
+        Recount the instances of every tracked model created in or after the
+        bucket containing ``since``.
+
+        Buckets before ``since`` are left untouched, so running this
+        periodically only costs in proportion to the number of new instances.
+
+        Args:
+            since (datetime.datetime): The earliest time to recount. By
+                default, the most recent bucket is recounted, since it may have
+                been incomplete when last compacted. If there are no buckets
+                yet, every instance is counted.
+
+        Returns:
+            int: The number of buckets written.
+        """
+        if since is None:
+            since = self.aggregate(latest=Max('bucket'))['latest']
+        if since is not None:
+            # Buckets are truncated in UTC, which not every time zone is a whole hour from
+            since = since.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+        rollups = []
+        for label, channel, language_lookup in self.TRACKED_MODELS:
+            model = apps.get_model(label)
+            instances = model._base_manager.exclude(timestamp=None)
+            if since is not None:
+                instances = instances.filter(timestamp__gte=since)
+            buckets = (instances.annotate(bucket=TruncHour('timestamp', tzinfo=timezone.utc))
+                       .order_by().values('bucket', language_lookup)
+                       .annotate(count=Count('pk')))
+            rollups.extend(ResponseRollup(
+                model=model._meta.label_lower,
+                channel=channel,
+                language=bucket[language_lookup] or '',
+                bucket=bucket['bucket'],
+                count=bucket['count'],
+            ) for bucket in buckets)
+
+        with transaction.atomic():
+            stale_rollups = self.all()
+            if since is not None:
+                stale_rollups = stale_rollups.filter(bucket__gte=since)
+            stale_rollups.delete()
+            self.bulk_create(rollups)
+        return len(rollups)
+
+
+class ResponseRollup(models.Model):
+    """
+    A ``ResponseRollup`` counts how many instances of a model were created
+    within an hour, so that the rate at which data arrives can be inspected
+    without scanning the underlying tables.
+
+    Rollups are not updated as data are written. Instead, they are rebuilt
+    periodically from timestamps with the ``compactrollups`` command (see
+    :meth:`ResponseRollupManager.compact`).
+
+    Attributes:
+        CHANNELS (tuple): Choices for the :attr:`channel` field.
+        model (str): The lowercase label of the model counted (for instance,
+            "pcari.respondent").
+        channel (str): How the instances were collected.
+        language (str): The language of the respondents who created the
+            instances.
+        bucket (datetime.datetime): The start of the hour the instances were
+            created in.
+        count (int): The number of instances created.
+    """
+    CHANNELS = (
+        ('web', _('Web')),
+        ('phone', _('Feature phone')),
+    )
+
+    objects = ResponseRollupManager()
+    model = models.CharField(max_length=64)
+    channel = models.CharField(max_length=8, choices=CHANNELS)
+    language = models.CharField(max_length=8, choices=settings.LANGUAGES,
+        blank=True, default='', validators=[LANGUAGE_VALIDATOR])
+    bucket = models.DateTimeField(db_index=True)
+    count = models.PositiveIntegerField(default=0)
+
+    def __unicode__(self):
+        template = '{0} {1} instances of "{2}" at {3}'
+        return template.format(self.count, self.channel, self.model, self.bucket)
+
+    class Meta(ViewMeta):
+        unique_together = ('model', 'channel', 'language', 'bucket')
+
+
+class CommentSignature(models.Model):
+    """
+    A ``CommentSignature`` is a MinHash signature of a comment's message,
+    which estimates how similar the message is to others (see
+    :mod:`pcari.duplicates`).
+
+    Attributes:
+        comment: The comment signed.
+        minhash (bytes): The minimum hashes of the message's shingles under
+            each permutation, packed as unsigned 32-bit integers.
+    """
+    comment = models.OneToOneField('Comment', on_delete=models.CASCADE, primary_key=True,
+                                   related_name='signature')
+    minhash = models.BinaryField()
+
+    def __unicode__(self):
+        return 'Signature of comment {0}'.format(self.comment_id)
+
+    class Meta(ViewMeta):
+        pass
+
+
+class CommentBucket(models.Model):
+    """
+    A ``CommentBucket`` places a comment in one locality-sensitive hashing
+    bucket per band of its signature. Comments that share any bucket are
+    candidate near-duplicates.
+
+    Attributes:
+        comment: The comment in the bucket.
+        key (int): A hash of the band index and the band of the signature.
+    """
+    comment = models.ForeignKey('Comment', on_delete=models.CASCADE, related_name='+')
+    key = models.BigIntegerField(db_index=True)
+
+    def __unicode__(self):
+        return 'Comment {0} in bucket {1}'.format(self.comment_id, self.key)
+
+    class Meta(ViewMeta):
+        pass
+
+
+def delete_partial_artifacts(job_ids):
+    """
+    Delete the files export jobs wrote without finishing. (Workers name
+    files after their job, as in :func:`pcari.exports.run_export_job`.)
+    """
+    directory = ExportJob._meta.get_field('artifact').upload_to
+    if not job_ids or not default_storage.exists(directory):
+        return
+    prefixes = tuple('{0}-'.format(job_id) for job_id in job_ids)
+    _, filenames = default_storage.listdir(directory)
+    for filename in filenames:
+        if filename.startswith(prefixes):
+            default_storage.delete(os.path.join(directory, filename))
+
+
+class ExportJobManager(models.Manager):
+    """
+    An ``ExportJobManager`` hands :class:`ExportJob` instances to workers and
+    removes old ones. Jobs whose workers stopped before finishing (because
+    they crashed, or their pool was terminated) are requeued or failed, so
+    no job stays running forever.
+    """
+    def claim(self, limit):
+        """
+        Mark up to ``limit`` of the oldest queued jobs as running.
+
+        Each job is claimed with a conditional update, so concurrent workers
+        never claim the same job.
 
+        Args:
+            limit (int): The maximum number of jobs to claim.
+
+        Returns:
+            list: The primary keys of the jobs claimed.
+        """
+        claimed = []
+        queued = self.filter(status=ExportJob.QUEUED).order_by('created')
+        for job_id in queued.values_list('pk', flat=True)[:max(limit, 0)]:
+            if self.filter(pk=job_id, status=ExportJob.QUEUED).update(
+                    status=ExportJob.RUNNING, started=timezone.now()):
+                claimed.append(job_id)
+        return claimed
+
+    def requeue(self, job_ids):
+        """
+        Return running jobs to the queue, deleting any partial artifacts.
+
+        Args:
+            job_ids (list): The primary keys of the jobs to requeue.
+
+        Returns:
+            int: The number of jobs requeued.
+        """
+        jobs = self.filter(pk__in=job_ids, status=ExportJob.RUNNING)
+        job_ids = list(jobs.values_list('pk', flat=True))
+        num_jobs = jobs.update(status=ExportJob.QUEUED, started=None, rows_written=0)
+        delete_partial_artifacts(job_ids)
+        return num_jobs
+
+    def reap(self, before):
+        """
+        Fail jobs that started running before a given time, since their
+        workers have presumably stopped, and delete any partial artifacts.
+        Jobs are failed rather than requeued, in case the job itself stopped
+        its worker.
+
+        Args:
+            before (datetime.datetime): The cutoff time.
+
+        Returns:
+            int: The number of jobs failed.
+        """
+        jobs = self.filter(status=ExportJob.RUNNING, started__lt=before)
+        job_ids = list(jobs.values_list('pk', flat=True))
+        num_jobs = self.filter(pk__in=job_ids, status=ExportJob.RUNNING).update(
+            status=ExportJob.FAILED, finished=timezone.now(),
+            error='The job was abandoned: it did not finish within {0} seconds.'.format(
+                settings.EXPORT_JOB_TIMEOUT))
+        delete_partial_artifacts(job_ids)
+        return num_jobs
+
+    def purge(self, before):
+        """
+        Delete jobs that ended before a given time. (Their artifacts are
+        deleted by :func:`pcari.signals.delete_export_artifact`.)
+
+        Args:
+            before (datetime.datetime): The cutoff time.
+
+        Returns:
+            int: The number of jobs deleted.
+        """
+        jobs = self.filter(status__in=[ExportJob.FINISHED, ExportJob.FAILED],
+                           finished__lt=before)
+        num_jobs, _ = jobs.delete()
+        return num_jobs
+
+
+class ExportJob(models.Model):
+    """
+    An ``ExportJob`` is a request to export data that is too large to export
+    within a single HTTP request. Jobs are queued from the admin site and run
+    by the ``runexportjobs`` command, which writes the exported file into
+    ``settings.MEDIA_ROOT``.
+
+    Attributes:
+        STATUSES (tuple): Choices for the :attr:`status` field.
+        DATA_FORMATS (tuple): Choices for the :attr:`data_format` field.
+        model (str): The label of the model exported (for instance,
+            "pcari.Comment").
+        data_format (str): The file format to export.
+        _query (bytes): The pickled query selecting the instances to export.
+            This field should only be used internally by this model.
+        queryset: A wrapper around :attr:`model` and :attr:`_query` that
+            reconstructs the ``QuerySet`` to export.
+        status (str): Whether the job is queued, running, finished or failed.
+        num_rows (int): The number of rows to export, counted when queued.
+        rows_written (int): The number of rows exported so far.
+        artifact: The exported file, once the job has finished.
+        error (str): A description of why the job failed, if it did.
+        requested_by: The staff user who queued the job.
+        created (datetime.datetime): When the job was queued.
+        started (datetime.datetime): When a worker started the job.
+        finished (datetime.datetime): When the job finished or failed.
+    """
+    QUEUED, RUNNING, FINISHED, FAILED = 'queued', 'running', 'finished', 'failed'
+    STATUSES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (FINISHED, 'Finished'),
+        (FAILED, 'Failed'),
+    )
+    DATA_FORMATS = (
+        ('csv', 'CSV'),
+        ('xlsx', 'Excel spreadsheet'),
+        ('wide', 'Wide CSV'),
+    )
+
+    objects = ExportJobManager()
+    model = models.CharField(max_length=128)
+    data_format = models.CharField(max_length=8, choices=DATA_FORMATS)
+    _query = models.BinaryField()
+    status = models.CharField(max_length=8, choices=STATUSES, default=QUEUED,
+        db_index=True)
+    num_rows = models.PositiveIntegerField(default=0)
+    rows_written = models.PositiveIntegerField(default=0)
+    artifact = models.FileField(upload_to='exports/', blank=True)
+    error = models.TextField(blank=True, default='')
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL,
+        null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    started = models.DateTimeField(null=True, blank=True, default=None)
+    finished = models.DateTimeField(null=True, blank=True, default=None)
+
+    @property
+    def queryset(self):
+        queryset = apps.get_model(self.model).objects.all()
+        queryset.query = pickle.loads(bytes(self._query))
+        return queryset
+
+    @queryset.setter
+    def queryset(self, queryset):
+        self.model = queryset.model._meta.label
+        self._query = pickle.dumps(queryset.query, pickle.HIGHEST_PROTOCOL)
+
+    @property
+    def progress(self):
+        """ The fraction of rows written, between zero and one. """
+        if self.status == self.FINISHED:
+            return 1
+        return min(self.rows_written/self.num_rows, 1) if self.num_rows else 0
+
+    def __unicode__(self):
+        return 'Export of {0} as {1} ({2})'.format(self.model, self.data_format, self.status)
 
     class Meta(ViewMeta):
         pass
@@ -0,0 +1,194 @@
+"""
+This module defines the queries the application runs most often against its
+largest tables, and checks with ``EXPLAIN`` that the database answers each
+one without a full table scan.
+
+A full scan is a SQLite ``SCAN`` step that uses no index, or a MySQL plan row
+of type ``ALL``. Scans that walk an index in order (for instance, to find the
+newest responses) are allowed, since they stop once a page is filled.
+
+References:
+  * `SQLite EXPLAIN QUERY PLAN <https://www.sqlite.org/eqp.html>`_
+  * `MySQL EXPLAIN Output Format <https://dev.mysql.com/doc/refman/5.7/en/explain-output.html>`_
+"""
+
+from __future__ import unicode_literals
+from collections import OrderedDict, namedtuple
+import re
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections
+from django.db.models import Count
+
+from pcari.models import Comment, CommentRating, CommentBucket, OptionQuestionChoice
+from pcari.models import QuantitativeQuestion, QuantitativeQuestionRating, Rating
+from feature_phone import models as phone_models
+
+__all__ = ['HOT_QUERIES', 'explain', 'find_full_scans', 'check_query_plans']
+
+SQLITE_SCAN_PATTERN = re.compile(r'^SCAN (?:TABLE )?(\w+)(.*)$')
+
+CHANGELIST_PAGE_SIZE = 100
+
+
+class HotQuery(namedtuple('HotQuery', ['make_queryset', 'tables'])):
+    """
+    A ``HotQuery`` is a frequently run query.
+
+    Attributes:
+        make_queryset: A function that accepts no arguments and returns the
+            ``QuerySet`` to explain.
+        tables (tuple): The names of the tables the query must not scan.
+    """
+    __slots__ = ()
+
+
+# Maps query names to ``HotQuery`` instances
+HOT_QUERIES = OrderedDict()
+
+
+def register_hot_query(name, *models):
+    def register(make_queryset):
+        tables = tuple(model._meta.db_table for model in models)
+        HOT_QUERIES[name] = HotQuery(make_queryset, tables)
+        return make_queryset
+    return register
+
+
+@register_hot_query('fetch_comments', Comment)
+def select_visible_comments():
+    """ Mirrors :func:`pcari.views.fetch_comments`. """
+    return (Comment.objects.filter(original=None, question__enabled=True, flagged=False)
+            .exclude(message=''))
+
+
+@register_hot_query('select_comment_pks', Comment)
+def select_comments_by_language():
+    """ Mirrors :func:`feature_phone.views.select_comment_pks`. """
+    comments = Comment.objects.filter(language=settings.LANGUAGE_CODE).exclude(message='')
+    return comments.values_list('pk', 'score_sem')
+
+
+@register_hot_query('comment_buckets', CommentBucket)
+def select_bucketed_comments():
+    """ Mirrors the candidates of :func:`pcari.duplicates.find_near_duplicates`. """
+    return CommentBucket.objects.filter(key__in=range(16)).values('comment_id')
+
+
+@register_hot_query('question_statistics', QuantitativeQuestionRating)
+def select_question_statistics():
+    """ Mirrors the statistics of every quantitative question. """
+    return QuantitativeQuestion.objects.all()
+
+
+@register_hot_query('question_histograms', QuantitativeQuestionRating)
+def select_question_histograms():
+    """ Mirrors :meth:`pcari.models.QuantitativeQuestionSummaryManager.refresh`. """
+    ratings = QuantitativeQuestionRating.objects.exclude(score=Rating.SKIPPED)
+    return ratings.order_by().values('question_id', 'score').annotate(count=Count('pk'))
+
+
+def make_changelist_query(model):
+    def select_newest_responses():
+        """ Mirrors the first page of a response admin changelist. """
+        responses = model._default_manager.select_related('respondent')
+        return responses.order_by('-timestamp')[:CHANGELIST_PAGE_SIZE]
+    return select_newest_responses
+
+
+for response_model in (QuantitativeQuestionRating, CommentRating, OptionQuestionChoice):
+    register_hot_query(response_model._meta.model_name + '_changelist',
+                       response_model)(make_changelist_query(response_model))
+
+
+@register_hot_query('feature_phone_questions', phone_models.Question)
+def select_phone_questions():
+    """ Mirrors :func:`feature_phone.views.fetch_question_pks`. """
+    question_type = ContentType.objects.get_for_model(QuantitativeQuestion)
+    return phone_models.Question.objects.filter(related_object_type=question_type,
+                                                language=settings.LANGUAGE_CODE)
+
+
+def explain(queryset):
+    """
+    Ask the database how it will run the query of a ``QuerySet``.
+
+    Returns:
+        list: One ``dict`` per step of the plan. On SQLite, each step has a
+        ``detail`` key. On MySQL, each step has the columns of ``EXPLAIN``
+        (including ``table``, ``type`` and ``key``).
+
+    Raises:
+        ValueError: if the database is neither SQLite nor MySQL.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    elif connection.vendor == 'mysql':
+        prefix = 'EXPLAIN '
+    else:
+        raise ValueError('cannot explain queries on "{0}"'.format(connection.vendor))
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(prefix + sql, params)
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def describe_step(step):
+    """ Format one step of a plan from :func:`explain` as a line of text. """
+    if 'detail' in step:
+        return step['detail']
+    return '{0}: {1} (key: {2}, rows: {3}, {4})'.format(
+        step.get('table'), step.get('type'), step.get('key'), step.get('rows'),
+        step.get('Extra') or 'no extra')
+
+
+def find_full_scans(queryset, tables):
+    """
+    Find the tables the query of a ``QuerySet`` scans in full.
+
+    Args:
+        queryset: The ``QuerySet`` to explain.
+        tables: The names of the tables to check. Scans of other tables (for
+            instance, small lookup tables) are ignored.
+
+    Returns:
+        list: The names of the scanned tables, in plan order.
+    """
+    return [table for table in find_scanned_tables(explain(queryset)) if table in tables]
+
+
+def find_scanned_tables(plan):
+    """ Find the tables a plan from :func:`explain` scans without an index. """
+    scanned = []
+    for step in plan:
+        if 'detail' in step:
+            match = SQLITE_SCAN_PATTERN.match(step['detail'])
+            if match and ' USING ' not in match.group(2):
+                scanned.append(match.group(1))
+        elif step.get('type') == 'ALL':
+            scanned.append(step.get('table'))
+    return scanned
+
+
+def check_query_plans(names=None):
+    """
+    Explain hot queries and find which of them scan a table in full.
+
+    Args:
+        names (list): The names of the queries to check, in order. Defaults
+            to every query in ``HOT_QUERIES``.
+
+    Returns:
+        OrderedDict: Maps each query name to a tuple of its plan (a list of
+        lines of text) and the tables it scans in full.
+    """
+    results = OrderedDict()
+    for name in names or HOT_QUERIES:
+        hot_query = HOT_QUERIES[name]
+        plan = explain(hot_query.make_queryset())
+        full_scans = [table for table in find_scanned_tables(plan) if table in hot_query.tables]
+        results[name] = [describe_step(step) for step in plan], full_scans
+    return results
@@ -0,0 +1,209 @@
+"""
+This module defines a full-text index of comments, which lets moderators
+search messages and tags without scanning the entire comments table.
+
+The index is created by a migration, and depends on the database backend:
+
+* SQLite: An FTS5 virtual table, ``pcari_comment_fts``, that indexes the
+  comments table as external content. Triggers on the comments table keep the
+  index in sync with every insert, update and delete, including bulk
+  operations that bypass model signals. Because SQLite drops triggers when a
+  migration rebuilds a table, :func:`repair_comment_index` recreates them
+  after every migration.
+* MySQL: A ``FULLTEXT`` index over the message and tag columns, which InnoDB
+  maintains itself.
+
+On other backends, or SQLite builds without FTS5, searches fall back to
+case-insensitive substring matches.
+
+References:
+  * `SQLite FTS5 Extension <https://www.sqlite.org/fts5.html>`_
+  * `MySQL Full-Text Search Functions <https://dev.mysql.com/doc/refman/5.7/en/fulltext-search.html>`_
+"""
+
+from __future__ import unicode_literals
+import logging
+import re
+
+from django.db import connections, transaction
+from django.db.models import Q
+
+from pcari.models import Comment
+
+__all__ = ['repair_comment_index', 'is_comment_index_available', 'filter_comments',
+           'search_comments']
+
+LOGGER = logging.getLogger('pcari')
+
+COMMENT_INDEX_TABLE = 'pcari_comment_fts'
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+SQLITE_REBUILD_INDEX = "INSERT INTO {index}({index}) VALUES ('rebuild')"
+
+SQLITE_TRIGGERS = ['{index}_insert', '{index}_delete', '{index}_update']
+
+SQLITE_CREATE_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS {index}_insert AFTER INSERT ON {table} BEGIN
+        INSERT INTO {index}(rowid, message, tag) VALUES (new.id, new.message, new.tag);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS {index}_delete AFTER DELETE ON {table} BEGIN
+        INSERT INTO {index}({index}, rowid, message, tag)
+            VALUES ('delete', old.id, old.message, old.tag);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS {index}_update AFTER UPDATE OF message, tag ON {table} BEGIN
+        INSERT INTO {index}({index}, rowid, message, tag)
+            VALUES ('delete', old.id, old.message, old.tag);
+        INSERT INTO {index}(rowid, message, tag) VALUES (new.id, new.message, new.tag);
+    END
+    """,
+]
+
+# Ranks are negated so that, on both backends, higher ranks are better matches
+SQLITE_SEARCH = """
+    SELECT rowid, -bm25({index}) AS relevance FROM {index}
+    WHERE {index} MATCH %s ORDER BY relevance DESC LIMIT %s
+"""
+
+MYSQL_SEARCH = """
+    SELECT id, MATCH(message, tag) AGAINST (%s IN BOOLEAN MODE) AS relevance FROM {table}
+    WHERE MATCH(message, tag) AGAINST (%s IN BOOLEAN MODE) ORDER BY relevance DESC LIMIT %s
+"""
+
+
+def format_statement(statement):
+    return statement.format(index=COMMENT_INDEX_TABLE, table=Comment._meta.db_table)
+
+
+def execute_statements(connection, statements):
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(format_statement(statement))
+
+
+def find_sqlite_objects(connection, object_type, names):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT name FROM sqlite_master WHERE type = %s AND name IN ({0})'
+                       .format(', '.join(['%s']*len(names))),
+                       [object_type] + [format_statement(name) for name in names])
+        return {name for name, in cursor.fetchall()}
+
+
+def sqlite_index_exists(connection):
+    return bool(find_sqlite_objects(connection, 'table', [COMMENT_INDEX_TABLE]))
+
+
+def repair_comment_index(connection):
+    """
+    Recreate the SQLite triggers that keep the comment index in sync, if the
+    index exists but any trigger is missing (for instance, after a migration
+    rebuilt the comments table), and reindex every comment.
+
+    Returns:
+        bool: Whether the index was repaired.
+    """
+    if connection.vendor != 'sqlite' or not sqlite_index_exists(connection):
+        return False
+    if len(find_sqlite_objects(connection, 'trigger', SQLITE_TRIGGERS)) == len(SQLITE_TRIGGERS):
+        return False
+    with transaction.atomic(using=connection.alias):
+        execute_statements(connection, SQLITE_CREATE_TRIGGERS + [SQLITE_REBUILD_INDEX])
+    LOGGER.info('Repaired the comment index')
+    return True
+
+
+def is_comment_index_available(using='default'):
+    """ Check whether comments can be searched with the full-text index. """
+    connection = connections[using]
+    if connection.vendor == 'sqlite':
+        return sqlite_index_exists(connection)
+    return connection.vendor == 'mysql'
+
+
+def make_match_query(text, vendor):
+    """
+    Translate free text into a full-text query that matches comments
+    containing every word, or a prefix of the last word, so that partially
+    typed words match. Punctuation and query operators are discarded, so the
+    query is always well-formed.
+
+    Returns:
+        str: The query, or an empty string if the text contains no words.
+    """
+    tokens = TOKEN_PATTERN.findall(text)
+    if vendor == 'sqlite':
+        terms = ['"{0}"'.format(token) for token in tokens]
+    else:
+        terms = ['+{0}'.format(token) for token in tokens]
+    if terms:
+        terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def filter_comments_by_substring(queryset, text):
+    for token in TOKEN_PATTERN.findall(text):
+        queryset = queryset.filter(Q(message__icontains=token) | Q(tag__icontains=token))
+    return queryset
+
+
+def filter_comments(queryset, text):
+    """
+    Filter a ``QuerySet`` of comments down to those matching the search text.
+
+    Returns:
+        A ``QuerySet``. Each word of ``text`` must appear in the message or
+        tag of each comment.
+    """
+    connection = connections[queryset.db]
+    if not is_comment_index_available(queryset.db):
+        return filter_comments_by_substring(queryset, text)
+    query = make_match_query(text, connection.vendor)
+    if not query:
+        return queryset
+    table = connection.ops.quote_name(Comment._meta.db_table)
+    if connection.vendor == 'sqlite':
+        condition = '{0}.id IN (SELECT rowid FROM {1} WHERE {1} MATCH %s)'
+        condition = condition.format(table, COMMENT_INDEX_TABLE)
+    else:
+        condition = 'MATCH({0}.message, {0}.tag) AGAINST (%s IN BOOLEAN MODE)'.format(table)
+    return queryset.extra(where=[condition], params=[query])
+
+
+def search_comments(text, limit=50, using='default'):
+    """
+    Find the comments that best match the search text.
+
+    Args:
+        text (str): Free text to search for.
+        limit (int): The maximum number of comments to return.
+        using (str): The alias of the database to search.
+
+    Returns:
+        list: ``(comment, rank)`` pairs, from the best match to the worst.
+        Ranks are only comparable within one search, and are ``None`` when
+        the full-text index is unavailable, in which case the most recent
+        matching comments are returned.
+    """
+    connection = connections[using]
+    comments = Comment._base_manager.using(using)
+    if not is_comment_index_available(using):
+        comments = filter_comments_by_substring(comments, text).order_by('-timestamp')
+        return [(comment, None) for comment in comments[:limit]]
+
+    query = make_match_query(text, connection.vendor)
+    if not query:
+        return []
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(SQLITE_SEARCH.format(index=COMMENT_INDEX_TABLE), [query, limit])
+        else:
+            cursor.execute(MYSQL_SEARCH.format(table=Comment._meta.db_table),
+                           [query, query, limit])
+        ranks = cursor.fetchall()
+    comments = comments.in_bulk([comment_id for comment_id, _ in ranks])
+    return [(comments[comment_id], rank) for comment_id, rank in ranks
+            if comment_id in comments]
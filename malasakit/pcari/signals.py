@@ -8,9 +8,17 @@ References:
 from __future__ import unicode_literals
 from math import sqrt
 
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
 from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete, post_migrate
 from django.dispatch import receiver
 
+from pcari.duplicates import index_comment, link_near_duplicate
+from pcari.models import Comment, QuantitativeQuestion, QuantitativeQuestionSummary, ExportJob
+from pcari.search import repair_comment_index
+
 
 def make_stddev_aggregate(sample=False):
     """
@@ -59,3 +67,46 @@ def extend_sqlite(connection=None, **_):
                                                make_stddev_aggregate())
         connection.connection.create_aggregate('STDDEV_SAMP', 1,
                                                make_stddev_aggregate(sample=True))
+
+
+def peer_responses_cache_key(language):
+    """ Return the cache key of the rendered peer responses page in a language. """
+    return 'pcari:peer-responses:{0}'.format(language)
+
+
+def invalidate_peer_responses():
+    """ Evict the rendered peer responses page in every language from the cache. """
+    cache.delete_many([peer_responses_cache_key(language)
+                       for language, _ in settings.LANGUAGES])
+
+
+@receiver(post_save, sender=QuantitativeQuestion)
+@receiver(post_delete, sender=QuantitativeQuestion)
+@receiver(post_save, sender=QuantitativeQuestionSummary)
+@receiver(post_delete, sender=QuantitativeQuestionSummary)
+def handle_summary_change(**_):
+    """ Invalidate the peer responses page when the data it shows change. """
+    invalidate_peer_responses()
+
+
+@receiver(post_save, sender=Comment)
+def sign_comment(instance=None, raw=False, **_):
+    """ Index a saved comment for near-duplicate detection, and link it if enabled. """
+    if raw:
+        return
+    if index_comment(instance) and settings.LINK_DUPLICATE_COMMENTS:
+        link_near_duplicate(instance)
+
+
+@receiver(post_delete, sender=ExportJob)
+def delete_export_artifact(instance=None, **_):
+    """ Remove the file an export job wrote when the job is deleted. """
+    if instance.artifact:
+        instance.artifact.delete(save=False)
+
+
+@receiver(post_migrate)
+def repair_search_index(sender=None, using=DEFAULT_DB_ALIAS, **_):
+    """ Restore the comment index triggers if a migration rebuilt the comments table. """
+    if sender.name == 'pcari':
+        repair_comment_index(connections[using])
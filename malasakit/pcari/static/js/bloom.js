@@ -42,13 +42,13 @@ var ICON_IMAGE = "PD94bWwgdmVyc2lvbj0iMS4wIiBlbmNvZGluZz0iaXNvLTg4NTktMSI/"
                + "ODYuMTA4LDUwMC4yMDcsMTU1LjUwOSw0NzcuMzcxLDEyNy40NHoiIGZp"
                + "bGw9IiNkYWE1MjAiLz48L2c+PC9zdmc+Cg==";
 
-var CONTENT_TYPE = 'image/svg+xml';
+var ICON_URL = 'data:image/svg+xml;base64,' + ICON_IMAGE;
 
-if (Resource.exists('bloom-icon')) {
-    var resource = Resource.load('bloom-icon');
-    if (resource.data !== null) {
-        ICON_IMAGE = resource.data['encoded-image'] || ICON_IMAGE;
-        CONTENT_TYPE = resource.data['content-type'] || CONTENT_TYPE;
+// Use the uploaded icon, if any (see the asset manifest served at `data/assets.json`)
+if (Resource.exists('assets')) {
+    var resource = Resource.load('assets');
+    if (resource.data !== null && resource.data['bloom-icon']) {
+        ICON_URL = STATIC_URL_ROOT + '/' + resource.data['bloom-icon'].src;
     }
 }
 
@@ -192,7 +192,7 @@ function renderComments() {
     });
     var iconSize = Math.max(0.1*width, 32);
     nodes.append('image')
-         .attr('xlink:href', 'data:' + CONTENT_TYPE + ';base64,' + ICON_IMAGE)
+         .attr('xlink:href', ICON_URL)
          .attr('width', iconSize)
          .attr('height', iconSize);
     nodes.append('text').text(node => node.tag).attr('x', iconSize + 3).attr('y', 15)
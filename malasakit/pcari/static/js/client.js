@@ -39,8 +39,8 @@ const STATIC_RESOURCES = [
         lifetime: 0
     },
     {
-        name: 'bloom-icon',
-        endpoint: STATIC_URL_ROOT + '/data/bloom-icon.json',
+        name: 'assets',
+        endpoint: STATIC_URL_ROOT + '/data/assets.json',
         lifetime: 0
     }
 ];
@@ -9,6 +9,9 @@ const CACHE_NAME = 'malasakit-cache';
 const APP_ROOT = '/';  // TODO: change to `/pcari/` in production
 const STATIC_ROOT = APP_ROOT + 'static/';
 
+// Lists the content-hashed images uploaded through the admin site
+const ASSET_MANIFEST = 'data/assets.json';
+
 const LANGUAGE_CODES = ['en', 'tl', 'ceb', 'ilo'];
 const VIEWS = [
     'landing/',
@@ -22,14 +25,12 @@ const VIEWS = [
 
 const STATIC_RESOURCES = [
     'css/main.min.css',
-    'data/bloom-icon.json',
     'js/jquery-3.2.1.min.js',
     'js/d3.v4.min.js',
     'js/client.js',
     'js/bloom.js',
     'js/sw-bootstrap.js',
     'js/uuid4.js',
-    'img/landing',
     'img/green-emoticon.png',
     'img/yellow-emoticon.jpg',
     'img/red-emoticon.png'
@@ -55,14 +56,46 @@ function makeURLsToCache() {
 
 var urlsToCache = makeURLsToCache();
 
+// Processed images are listed in the asset manifest, which only exists once an
+// image has been uploaded. Until then, the landing page shows `img/landing`.
+const LEGACY_LANDING_IMAGE = 'img/landing';
+
+function listAssetURLs(manifest) {
+    var urls = [STATIC_ROOT + ASSET_MANIFEST];
+    if (!manifest['landing-image']) {
+        urls.push(STATIC_ROOT + LEGACY_LANDING_IMAGE);
+    }
+    for (var name in manifest) {
+        // Browsers pick any variant of a `srcset`, so every variant must be available offline
+        manifest[name].variants.forEach(function(variant) {
+            urls.push(STATIC_ROOT + variant.path);
+        });
+    }
+    return urls;
+}
+
+function fetchAssetURLs() {
+    return fetch(STATIC_ROOT + ASSET_MANIFEST)
+        .then(function(response) {
+            if (!response.ok) {
+                return [STATIC_ROOT + LEGACY_LANDING_IMAGE];
+            }
+            return response.json().then(listAssetURLs);
+        })
+        .catch(function() {
+            return [STATIC_ROOT + LEGACY_LANDING_IMAGE];
+        });
+}
+
 function installEvent(event) {
-    console.log("Installing. Resources to prefetch:", urlsToCache);
     event.waitUntil(
-        caches.delete(CACHE_NAME).then(function (res) {
-            caches.open(CACHE_NAME)
+        Promise.all([caches.delete(CACHE_NAME), fetchAssetURLs()]).then(function(results) {
+            var urls = urlsToCache.concat(results[1]);
+            console.log("Installing. Resources to prefetch:", urls);
+            return caches.open(CACHE_NAME)
                 .then(function(cache) {
                     console.log('Cache opened!');
-                    return cache.addAll(urlsToCache);
+                    return cache.addAll(urls);
                 })
         })
     );
@@ -0,0 +1,47 @@
+"""
+This module defines custom tags for referencing processed image assets (see
+:mod:`pcari.assets`).
+"""
+
+from __future__ import unicode_literals
+
+from django import template
+from django.templatetags.static import static
+
+from pcari.assets import get_asset
+
+# pylint: disable=invalid-name
+register = template.Library()
+
+
+@register.simple_tag
+def asset_url(name, fallback):
+    """
+    Get the URL of the default variant of an asset.
+
+    Args:
+        name: The name of the asset in the manifest.
+        fallback: The path of a static file to use if the asset has never
+            been uploaded.
+
+    Returns:
+        The URL as a string.
+    """
+    asset = get_asset(name)
+    return static(asset['src'] if asset else fallback)
+
+
+@register.simple_tag
+def asset_srcset(name):
+    """
+    Get a ``srcset`` attribute value listing every sized variant of an asset,
+    so browsers on small screens download small variants.
+
+    >>> asset_srcset('landing-image')
+    '/static/img/landing-image-480.0123456789ab.jpg 480w, ...'
+    """
+    asset = get_asset(name)
+    if asset is None:
+        return ''
+    return ', '.join('{0} {1}w'.format(static(variant['path']), variant['width'])
+                     for variant in asset['variants'] if variant['width'] is not None)
@@ -0,0 +1,501 @@
+"""
+This module defines unit tests for the admin site.
+"""
+
+from __future__ import unicode_literals
+import base64
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth.models import User, Permission
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from pcari.admin import EstimatedCountPaginator, get_viewable_model_names
+from pcari.assets import load_manifest
+from pcari.exports import SNAPSHOT_MODELS
+from pcari.models import Respondent, Location, Comment, CommentRating
+from pcari.models import QuantitativeQuestion, QualitativeQuestion, QuantitativeQuestionRating
+from pcari.models import OptionQuestion, OptionQuestionChoice
+from pcari.search import is_comment_index_available, repair_comment_index
+from feature_phone.models import Question as PhoneQuestion
+
+RESPONSE_CHANGELISTS = [
+    'admin:pcari_comment_changelist',
+    'admin:pcari_commentrating_changelist',
+    'admin:pcari_quantitativequestionrating_changelist',
+    'admin:pcari_optionquestionchoice_changelist',
+]
+
+
+def count_queries(client, url, data=None):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url, data or {})
+    return response, len(context)
+
+
+class ViewPermissionTestCase(TestCase):
+    def setUp(self):
+        self.client = Client()
+        user = User.objects.create_user('viewer', 'viewer@example.com', 'password',
+                                        is_staff=True)
+        user.user_permissions.set(Permission.objects.filter(
+            codename__in=['view_respondent', 'view_response']))
+        self.client.login(username='viewer', password='password')
+        Respondent.objects.create()
+
+    def test_view_only_changelists(self):
+        for name in ['admin:pcari_respondent_changelist',
+                     'admin:feature_phone_response_changelist']:
+            response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, 200, name)
+        response = self.client.get(reverse('admin:pcari_comment_changelist'))
+        self.assertEqual(response.status_code, 403)
+
+    def test_view_only_change_form(self):
+        respondent = Respondent.objects.get()
+        url = reverse('admin:pcari_respondent_change', args=(respondent.pk,))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('location', response.context['adminform'].form.fields)
+
+    def grant(self, *codenames):
+        user = User.objects.get(username='viewer')
+        user.user_permissions.add(*Permission.objects.filter(codename__in=codenames))
+
+    def test_ratings_matrix_permission(self):
+        url = reverse('admin:ratings-matrix')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.grant('view_quantitativequestionrating', 'change_commentrating')
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_wide_export_permission(self):
+        url = reverse('admin:wide-export')
+        self.grant('view_quantitativequestionrating', 'view_optionquestionchoice',
+                   'view_comment')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.grant('view_commentrating')
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_snapshot_permission(self):
+        url = reverse('admin:snapshot')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.grant(*['view_' + model._meta.model_name for model in SNAPSHOT_MODELS])
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_incremental_export_permission(self):
+        url = reverse('admin:incremental-export')
+        response = self.client.get(url, {'model': 'pcari.respondent'})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(url, {'model': 'pcari.comment'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_pivoted_export_permission(self):
+        url = reverse('admin:pivoted-export')
+        self.grant('view_quantitativequestionrating')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.grant('view_optionquestionchoice')
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_comment_search_permission(self):
+        url = reverse('admin:comment-search')
+        self.assertEqual(self.client.get(url, {'q': 'seawall'}).status_code, 403)
+        self.grant('view_comment')
+        self.assertEqual(self.client.get(url, {'q': 'seawall'}).status_code, 200)
+
+    def test_permissions_resolved_once(self):
+        calls = []
+        get_all_permissions = User.get_all_permissions
+
+        def count_calls(user, obj=None):
+            calls.append(user.pk)
+            return get_all_permissions(user, obj)
+        User.get_all_permissions = count_calls
+        try:
+            response = self.client.get(reverse('admin:pcari_respondent_changelist'))
+        finally:
+            User.get_all_permissions = get_all_permissions
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(calls), 1)
+        request = response.wsgi_request
+        self.assertEqual(get_viewable_model_names(request),
+                         frozenset(['respondent', 'response']))
+
+
+class RespondentAdminTestCase(TestCase):
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.login(username='admin', password='password')
+        self.url = reverse('admin:pcari_respondent_changelist')
+
+        self.location = Location.objects.create(division='Naga City')
+        self.questions = [QuantitativeQuestion.objects.create() for _ in range(3)]
+        self.qualitative_question = QualitativeQuestion.objects.create()
+        self.add_respondents(5)
+
+    def add_respondents(self, num_respondents):
+        for index in range(num_respondents):
+            respondent = Respondent.objects.create(location=self.location if index % 2 else None)
+            for question_index, question in enumerate(self.questions):
+                score = None if question_index == index % len(self.questions) else 5
+                QuantitativeQuestionRating.objects.create(question=question,
+                                                          respondent=respondent, score=score)
+            comment = Comment.objects.create(respondent=respondent, message='Comment',
+                                             question=self.qualitative_question)
+            CommentRating.objects.create(respondent=respondent, comment=comment, score=index)
+
+    def count_changelist_queries(self):
+        response, num_queries = count_queries(self.client, self.url)
+        self.assertEqual(response.status_code, 200)
+        return num_queries
+
+    def test_changelist_queries_constant(self):
+        num_queries = self.count_changelist_queries()
+        self.add_respondents(20)
+        self.assertEqual(self.count_changelist_queries(), num_queries)
+
+    def test_changelist_columns(self):
+        response = self.client.get(self.url)
+        respondents = {respondent.pk: respondent
+                       for respondent in response.context['cl'].result_list}
+        self.assertEqual(len(respondents), 5)
+        for respondent in Respondent.objects.all():
+            annotated = respondents[respondent.pk]
+            self.assertEqual(annotated.num_questions_rated, respondent.num_questions_rated)
+            self.assertEqual(annotated.num_questions_rated, len(self.questions) - 1)
+            self.assertEqual(annotated.num_comments_rated, respondent.num_comments_rated)
+            self.assertEqual(list(annotated.comments), list(respondent.comments))
+        self.assertContains(response, 'Naga City')
+
+
+class ResponseAdminTestCase(TestCase):
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.login(username='admin', password='password')
+
+        self.quantitative_question = QuantitativeQuestion.objects.create(prompt='Flooding')
+        self.qualitative_question = QualitativeQuestion.objects.create(prompt='Suggestions')
+        self.option_question = OptionQuestion.objects.create(prompt='Evacuated',
+                                                             options=['Yes', 'No'])
+        self.add_responses(3)
+
+    def add_responses(self, num_respondents):
+        for index in range(num_respondents):
+            respondent = Respondent.objects.create()
+            QuantitativeQuestionRating.objects.create(question=self.quantitative_question,
+                                                      respondent=respondent, score=index)
+            OptionQuestionChoice.objects.create(question=self.option_question,
+                                                respondent=respondent, option='Yes')
+            comment = Comment.objects.create(question=self.qualitative_question,
+                                             respondent=respondent,
+                                             message='Build a seawall {0}'.format(index))
+            CommentRating.objects.create(comment=comment, respondent=respondent, score=index)
+
+    def test_changelist_queries_constant(self):
+        num_queries = {}
+        for name in RESPONSE_CHANGELISTS:
+            response, num_queries[name] = count_queries(self.client, reverse(name))
+            self.assertEqual(response.status_code, 200)
+        self.add_responses(10)
+        for name in RESPONSE_CHANGELISTS:
+            response, count = count_queries(self.client, reverse(name))
+            self.assertEqual(response.context['cl'].result_count, 13)
+            self.assertEqual(count, num_queries[name], name)
+
+    def test_search(self):
+        searches = [
+            ('admin:pcari_commentrating_changelist', 'seawall 1', 1),
+            ('admin:pcari_quantitativequestionrating_changelist', 'flood', 3),
+            ('admin:pcari_quantitativequestionrating_changelist', 'drought', 0),
+            ('admin:pcari_optionquestionchoice_changelist', 'evacuated', 3),
+            ('admin:pcari_comment_changelist', 'seawall', 3),
+        ]
+        for name, query, num_results in searches:
+            response = self.client.get(reverse(name), {'q': query})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['cl'].result_count, num_results, name)
+
+
+class CommentSearchTestCase(TestCase):
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.login(username='admin', password='password')
+
+        question = QualitativeQuestion.objects.create()
+        respondent = Respondent.objects.create()
+        self.comments = [
+            Comment.objects.create(question=question, respondent=respondent, message=message,
+                                   tag=tag)
+            for message, tag in [
+                ('Build a seawall along the coast', 'infrastructure'),
+                ('The seawall failed, so build a higher seawall', 'infrastructure'),
+                ('More evacuation drills at the barangay hall', 'preparedness'),
+            ]
+        ]
+
+    def search(self, query):
+        response = self.client.get(reverse('admin:comment-search'), {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)['results']
+
+    def test_index_available(self):
+        self.assertTrue(is_comment_index_available())
+
+    def test_changelist_search(self):
+        url = reverse('admin:pcari_comment_changelist')
+        for query, expected in [('seawall', [0, 1]), ('sea', [0, 1]), ('build coast', [0]),
+                                ('Preparedness', [2]), ('"drills" OR', [])]:
+            response = self.client.get(url, {'q': query})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(sorted(comment.pk for comment in response.context['cl'].result_list),
+                             [self.comments[index].pk for index in expected], query)
+
+    def test_ranking(self):
+        results = self.search('seawall')
+        self.assertEqual([result['id'] for result in results],
+                         [self.comments[1].pk, self.comments[0].pk])
+        self.assertGreater(results[0]['rank'], results[1]['rank'])
+        self.assertEqual(results[0]['msg'], self.comments[1].message)
+        self.assertEqual(self.search('!!!'), [])
+
+    def test_index_kept_in_sync(self):
+        Comment.objects.filter(pk=self.comments[2].pk).update(message='Plant mangroves')
+        self.assertEqual([result['id'] for result in self.search('mangrove')],
+                         [self.comments[2].pk])
+        self.assertEqual(self.search('drills'), [])
+        self.comments[0].delete()
+        self.assertEqual([result['id'] for result in self.search('seawall')],
+                         [self.comments[1].pk])
+
+    def test_repair(self):
+        self.assertFalse(repair_comment_index(connection))
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER pcari_comment_fts_update')
+            cursor.execute("UPDATE pcari_comment SET message = 'Plant mangroves'")
+        self.assertEqual(self.search('mangroves'), [])
+        self.assertTrue(repair_comment_index(connection))
+        self.assertEqual(len(self.search('mangroves')), 3)
+        Comment.objects.filter(pk=self.comments[0].pk).update(message='Relocate')
+        self.assertEqual(len(self.search('mangroves')), 2)
+
+
+@override_settings(ADMIN_EXACT_COUNT_THRESHOLD=5)
+class EstimatedCountPaginatorTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.question = QuantitativeQuestion.objects.create()
+        self.add_ratings(8)
+
+    def tearDown(self):
+        cache.clear()
+
+    def add_ratings(self, num_ratings, score=1):
+        for _ in range(num_ratings):
+            QuantitativeQuestionRating.objects.create(respondent=Respondent.objects.create(),
+                                                      question=self.question, score=score)
+
+    def count(self, queryset):
+        if not isinstance(queryset, list):
+            queryset = queryset.order_by('pk')
+        return EstimatedCountPaginator(queryset, 2).count
+
+    def test_exact_count(self):
+        ratings = QuantitativeQuestionRating.objects.filter(score=2)
+        self.assertEqual(self.count(ratings), 0)
+        self.add_ratings(5, score=2)
+        self.assertEqual(self.count(ratings), 5)
+        self.assertEqual(self.count(list(ratings)), 5)
+
+    def test_cached_count(self):
+        ratings = QuantitativeQuestionRating.objects.filter(score=1)
+        self.assertEqual(self.count(ratings), 8)
+        self.add_ratings(4)
+        self.assertEqual(self.count(ratings), 8)
+        cache.clear()
+        self.assertEqual(self.count(ratings), 12)
+
+    def test_table_statistics(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.add_ratings(4)
+        self.assertEqual(self.count(QuantitativeQuestionRating.objects.all()), 8)
+        self.assertEqual(self.count(QuantitativeQuestionRating.objects.filter(score=1)), 12)
+
+    def test_changelist(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.login(username='admin', password='password')
+        url = reverse('admin:pcari_quantitativequestionrating_changelist')
+        response = self.client.get(url)
+        self.assertEqual(response.context['cl'].result_count, 8)
+        self.add_ratings(4)
+        response = self.client.get(url, {'score': 1})
+        self.assertEqual(response.context['cl'].result_count, 12)
+        self.assertIsNone(response.context['cl'].full_result_count)
+
+
+class FeaturePhoneSyncTestCase(TestCase):
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.login(username='admin', password='password')
+        self.url = reverse('admin:pcari_quantitativequestion_changelist')
+        self.add_questions(3)
+
+    def add_questions(self, num_questions):
+        for index in range(num_questions):
+            QuantitativeQuestion.objects.create(prompt='Question {0}'.format(index))
+
+    def sync(self):
+        data = {'action': 'export_to_feature_phone',
+                '_selected_action': QuantitativeQuestion.objects.values_list('pk', flat=True)}
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(self.url, data, follow=True)
+        self.assertEqual(response.status_code, 200)
+        return [unicode(message) for message in response.context['messages']], len(context)
+
+    def test_sync(self):
+        num_languages = len(settings.LANGUAGES)
+        messages, _ = self.sync()
+        self.assertIn('3 questions ({0} created, 0 updated, 0 unchanged)'
+                      .format(3*num_languages), messages[0])
+        self.assertEqual(PhoneQuestion.objects.count(), 3*num_languages)
+        question = QuantitativeQuestion.objects.get(prompt='Question 0')
+        phone_question = PhoneQuestion.objects.get(
+            key='pcari-quantitativequestion-{0}-en'.format(question.pk))
+        self.assertEqual(phone_question.related_object, question)
+        self.assertEqual((phone_question.language, phone_question.text), ('en', 'Question 0'))
+
+        QuantitativeQuestion.objects.filter(pk=question.pk).update(prompt='Flooding')
+        messages, _ = self.sync()
+        self.assertIn('({0} created, {1} updated, {2} unchanged)'.format(
+            0, num_languages, 2*num_languages), messages[0])
+        phone_question.refresh_from_db()
+        self.assertEqual(phone_question.text, 'Flooding')
+
+    def test_sync_queries_constant(self):
+        _, num_queries = self.sync()
+        PhoneQuestion.objects.all().delete()
+        self.add_questions(10)
+        _, num_queries_more = self.sync()
+        self.assertEqual(num_queries_more, num_queries)
+
+
+class AssetUploadTestCase(TestCase):
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.login(username='admin', password='password')
+        self.static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.static_root)
+        static_root_override = override_settings(STATIC_ROOT=self.static_root)
+        static_root_override.enable()
+        self.addCleanup(static_root_override.disable)
+
+    @staticmethod
+    def make_image(size, mode='RGB', image_format='JPEG'):
+        buf = io.BytesIO()
+        Image.new(mode, size, 'red').save(buf, image_format)
+        buf.seek(0)
+        buf.name = 'upload.' + image_format.lower()
+        return buf
+
+    def upload(self, name, uploaded_file):
+        response = self.client.post(reverse('admin:change-' + name), {name: uploaded_file},
+                                    follow=True)
+        self.assertEqual(response.status_code, 200)
+        return response.context['messages']
+
+    def read_variant(self, variant):
+        return Image.open(os.path.join(self.static_root, variant['path']))
+
+    def test_landing_image(self):
+        messages = self.upload('landing-image', self.make_image((3000, 2000)))
+        self.assertEqual(messages, ['Successfully changed landing image.'])
+        asset = load_manifest()['landing-image']
+        self.assertEqual(asset['type'], 'image/jpeg')
+        self.assertEqual([(variant['width'], variant['height']) for variant in asset['variants']],
+                         [(480, 320), (960, 640), (1920, 1280)])
+        self.assertEqual(asset['src'], asset['variants'][1]['path'])
+        for variant in asset['variants']:
+            self.assertRegexpMatches(variant['path'], r'^img/landing-image-\d+\.[0-9a-f]{12}\.jpg$')
+            self.assertEqual(self.read_variant(variant).size,
+                             (variant['width'], variant['height']))
+
+        response = self.client.get(reverse('pcari:landing'))
+        self.assertContains(response, 'src="{0}{1}"'.format(settings.STATIC_URL, asset['src']))
+        self.assertContains(response, '{0}{1} 1920w'.format(settings.STATIC_URL,
+                                                            asset['variants'][2]['path']))
+
+    def test_small_images_not_enlarged(self):
+        self.upload('landing-image', self.make_image((600, 300)))
+        asset = load_manifest()['landing-image']
+        self.assertEqual([(variant['width'], variant['height']) for variant in asset['variants']],
+                         [(480, 240), (600, 300)])
+        self.assertEqual(asset['src'], asset['variants'][1]['path'])
+
+    def test_bloom_icon_replaced(self):
+        self.upload('bloom-icon', self.make_image((512, 512), 'RGBA', 'PNG'))
+        old_asset = load_manifest()['bloom-icon']
+        self.assertEqual(old_asset['type'], 'image/png')
+        self.assertEqual([variant['width'] for variant in old_asset['variants']], [128, 256])
+        self.assertEqual(self.read_variant(old_asset['variants'][0]).mode, 'RGBA')
+
+        svg = io.BytesIO(b'<?xml version="1.0"?><svg xmlns="http://www.w3.org/2000/svg"/>')
+        svg.name = 'icon.svg'
+        messages = self.upload('bloom-icon', svg)
+        self.assertEqual(messages, ['Successfully uploaded bloom icon.'])
+        asset = load_manifest()['bloom-icon']
+        self.assertEqual(asset['type'], 'image/svg+xml')
+        self.assertEqual(len(asset['variants']), 1)
+        with open(os.path.join(self.static_root, asset['src']), 'rb') as icon_file:
+            self.assertEqual(icon_file.read(), svg.getvalue())
+        self.assertEqual(asset['previous'], [variant['path'] for variant in old_asset['variants']])
+        for path in asset['previous']:
+            self.assertTrue(os.path.exists(os.path.join(self.static_root, path)))
+
+        self.upload('bloom-icon', self.make_image((64, 64), 'RGBA', 'PNG'))
+        self.assertEqual(load_manifest()['bloom-icon']['previous'], [asset['src']])
+        self.assertTrue(os.path.exists(os.path.join(self.static_root, asset['src'])))
+        for variant in old_asset['variants']:
+            self.assertFalse(os.path.exists(os.path.join(self.static_root, variant['path'])))
+
+    def test_invalid_image(self):
+        not_an_image = io.BytesIO(b'not an image')
+        not_an_image.name = 'landing.jpg'
+        messages = self.upload('landing-image', not_an_image)
+        self.assertEqual(messages, ['Could not process image: unsupported image format.'])
+        self.assertEqual(load_manifest(), {})
+
+    def test_import_legacy_assets(self):
+        os.makedirs(os.path.join(self.static_root, 'img'))
+        os.makedirs(os.path.join(self.static_root, 'data'))
+        with open(os.path.join(self.static_root, 'img', 'landing'), 'wb') as landing_file:
+            landing_file.write(self.make_image((1000, 500)).getvalue())
+        with open(os.path.join(self.static_root, 'data', 'bloom-icon.json'), 'wb') as icon_file:
+            encoded_image = base64.b64encode(self.make_image((64, 64), 'RGBA', 'PNG').getvalue())
+            json.dump({'encoded-image': encoded_image.decode('ascii')}, icon_file)
+
+        stdout = io.BytesIO()
+        call_command('importlegacyassets', stdout=stdout)
+        manifest = load_manifest()
+        self.assertEqual([variant['width'] for variant in manifest['landing-image']['variants']],
+                         [480, 960, 1000])
+        self.assertEqual(manifest['bloom-icon']['type'], 'image/png')
+        self.assertIn('Imported img/landing', stdout.getvalue())
+
+        landing_image = manifest['landing-image']
+        self.upload('landing-image', self.make_image((300, 300)))
+        call_command('importlegacyassets', stdout=io.BytesIO())
+        self.assertNotEqual(load_manifest()['landing-image']['src'], landing_image['src'])
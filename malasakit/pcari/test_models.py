@@ -3,12 +3,17 @@ This module defines unit tests of model behavior.
 """
 
 from __future__ import unicode_literals
+from io import BytesIO
 import math
 import random
+import warnings
 
 from django.core.exceptions import ValidationError
-from django.db import IntegrityError
-from django.test import TestCase, TransactionTestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
 
 from pcari.models import (
     Respondent,
@@ -21,7 +26,11 @@ from pcari.models import (
     OptionQuestionChoice,
     Rating,
     Location,
+    ResponseRollup,
 )
+from pcari.duplicates import make_signature, estimate_similarity, find_near_duplicates
+from pcari.models import CommentSignature, CommentBucket
+from pcari.queryplans import HOT_QUERIES, find_full_scans
 
 RATING_CHOICES = list(range(0, 9)) + [Rating.SKIPPED]
 
@@ -191,6 +200,62 @@ class PropertyTestCase(TestCase):
             self.assertLess(first.timestamp, second.timestamp)
 
 
+class RespondentQuerySetTestCase(TestCase):
+    """ Ensure respondent counts match the rows a queryset returns. """
+    def setUp(self):
+        for language in ['en', 'en', 'tl']:
+            Respondent.objects.create(language=language)
+
+    def test_count_annotated(self):
+        respondents = Respondent.objects.annotate_progress().filter(language='en')
+        self.assertEqual(respondents.count(), 2)
+        self.assertEqual(respondents.count(), len(respondents))
+
+    def test_count_distinct_values(self):
+        languages = Respondent.objects.values('language').distinct()
+        self.assertEqual(languages.count(), 2)
+        self.assertEqual(languages.count(), len(languages))
+        languages = Respondent.objects.values_list('language', flat=True).distinct()
+        self.assertEqual(languages.count(), len(languages))
+
+
+class RollupTestCase(TestCase):
+    """ Ensure response rollups count instances correctly. """
+    serialized_rollback = True
+
+    def count_respondents(self):
+        rollups = ResponseRollup.objects.filter(model='pcari.respondent')
+        rollups = rollups.values('language').annotate(total=Sum('count'))
+        return {rollup['language']: rollup['total'] for rollup in rollups}
+
+    def test_compact(self):
+        for language in ['en', 'en', 'tl']:
+            Respondent.objects.create(language=language)
+        ResponseRollup.objects.compact()
+        self.assertEqual(self.count_respondents(), {'en': 2, 'tl': 1})
+
+        # Recompacting recounts the latest bucket without duplicating it
+        respondent = Respondent.objects.create(language='tl')
+        QuantitativeQuestionRating.objects.create(
+            question=QuantitativeQuestion.objects.create(),
+            respondent=respondent,
+        )
+        ResponseRollup.objects.compact()
+        self.assertEqual(self.count_respondents(), {'en': 2, 'tl': 2})
+        rating_rollups = ResponseRollup.objects.filter(model='pcari.quantitativequestionrating')
+        self.assertEqual(list(rating_rollups.values_list('channel', 'count')), [('web', 1)])
+
+    def test_command(self):
+        Respondent.objects.create(language='en')
+        with warnings.catch_warnings():
+            # Django warns when filtering with a naive datetime
+            warnings.simplefilter('error', RuntimeWarning)
+            for since in ['2000-01-01', '2000-01-01T08:30', '2000-01-01T08:30+05:30']:
+                call_command('compactrollups', since=since, stdout=BytesIO())
+                self.assertEqual(self.count_respondents(), {'en': 1})
+        self.assertRaises(CommandError, call_command, 'compactrollups', since='yesterday')
+
+
 class IntegrityTestCase(TransactionTestCase):
     """ Ensure the data passes tests for uniqueness and not being null. """
     serialized_rollback = True
@@ -290,3 +355,106 @@ class ValidationTestCase(TestCase):
             errors = dict(context.exception)
             self.assertEqual(len(errors), 1)
             self.assertTrue('gender' in errors)
+
+
+class QueryPlanTestCase(TestCase):
+    def test_hot_queries_use_indexes(self):
+        output = BytesIO()
+        call_command('checkqueryplans', stdout=output)
+        self.assertIn('Checked {0} queries'.format(len(HOT_QUERIES)), output.getvalue())
+
+    def test_find_full_scans(self):
+        comments = Comment.objects.filter(message='Build a seawall')
+        self.assertEqual(find_full_scans(comments, ['pcari_comment']), ['pcari_comment'])
+        self.assertEqual(find_full_scans(comments, ['pcari_commentrating']), [])
+        comments = Comment.objects.filter(language='en')
+        self.assertEqual(find_full_scans(comments, ['pcari_comment']), [])
+
+    def test_missing_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DROP INDEX pcari_comment_language_idx')
+        with self.assertRaises(CommandError) as context:
+            call_command('checkqueryplans', 'select_comment_pks', stdout=BytesIO())
+        self.assertIn('select_comment_pks', unicode(context.exception))
+
+
+class NearDuplicateTestCase(TestCase):
+    MESSAGE = 'Please build a seawall along the coast of the barangay before the next typhoon'
+
+    def setUp(self):
+        self.respondent = Respondent.objects.create()
+        self.question = QualitativeQuestion.objects.create()
+
+    def make_comment(self, message):
+        return Comment.objects.create(respondent=self.respondent, question=self.question,
+                                      message=message)
+
+    def test_signature(self):
+        signature = make_signature(self.MESSAGE)
+        self.assertEqual(estimate_similarity(signature, make_signature(self.MESSAGE.upper())), 1)
+        copy = make_signature(self.MESSAGE + ', please!')
+        self.assertGreater(estimate_similarity(signature, copy), 0.8)
+        other = make_signature('More evacuation drills at the school, and a louder siren')
+        self.assertLess(estimate_similarity(signature, other), 0.3)
+        self.assertIsNone(make_signature(' ?! '))
+
+    def test_find_near_duplicates(self):
+        comment = self.make_comment(self.MESSAGE)
+        copy = self.make_comment(self.MESSAGE + '!!')
+        other = self.make_comment('More evacuation drills at the school')
+        self.assertEqual([comment_id for comment_id, _ in find_near_duplicates(comment)],
+                         [copy.pk])
+        self.assertEqual(find_near_duplicates(other), [])
+
+        copy.message = 'Plant mangroves to slow the storm surge'
+        copy.save()
+        self.assertEqual(find_near_duplicates(comment), [])
+        copy.message = ''
+        copy.save()
+        self.assertFalse(CommentSignature.objects.filter(comment=copy).exists())
+        self.assertFalse(CommentBucket.objects.filter(comment=copy).exists())
+
+    def test_links_disabled_by_default(self):
+        self.make_comment(self.MESSAGE)
+        copy = self.make_comment(self.MESSAGE)
+        self.assertIsNone(Comment.objects.get(pk=copy.pk).original)
+
+    @override_settings(LINK_DUPLICATE_COMMENTS=True)
+    def test_link_near_duplicates(self):
+        comment = self.make_comment(self.MESSAGE)
+        copies = [self.make_comment(self.MESSAGE + suffix) for suffix in ['.', '!', '?']]
+        other = self.make_comment('More evacuation drills at the school')
+        for copy in copies:
+            self.assertEqual(Comment.objects.get(pk=copy.pk).original, comment)
+        unlinked = Comment.objects.filter(original=None).values_list('pk', flat=True)
+        self.assertEqual(sorted(unlinked), [comment.pk, other.pk])
+
+    @override_settings(LINK_DUPLICATE_COMMENTS=True)
+    def test_duplicates_unlinked_on_delete(self):
+        comment = self.make_comment(self.MESSAGE)
+        copy = self.make_comment(self.MESSAGE + '.')
+        # Translations are not told apart by language, which may be unset
+        translation = Comment.objects.create(respondent=self.respondent, question=self.question,
+                                             message='Magtanim ng bakawan', original=comment)
+        copy = Comment.objects.get(pk=copy.pk)
+        self.assertEqual((copy.original, copy.duplicate), (comment, True))
+        comment.delete()
+        copy = Comment.objects.get(pk=copy.pk)
+        self.assertEqual((copy.original, copy.duplicate), (None, False))
+        self.assertFalse(Comment.objects.filter(pk=translation.pk).exists())
+
+    def test_backfill(self):
+        Comment.objects.bulk_create([
+            Comment(respondent=self.respondent, question=self.question, message=message)
+            for message in [self.MESSAGE, self.MESSAGE + '.', 'Plant mangroves', '']
+        ])
+        self.assertEqual(CommentSignature.objects.count(), 0)
+        output = BytesIO()
+        call_command('signcomments', link=True, stdout=output)
+        self.assertIn('Signed 3 comments', output.getvalue())
+        self.assertIn('Linked 1 near-duplicate comment', output.getvalue())
+        self.assertEqual(Comment.objects.filter(duplicate=True).count(), 1)
+        self.assertEqual(CommentBucket.objects.count(), 3*16)
+        output = BytesIO()
+        call_command('signcomments', stdout=output)
+        self.assertIn('Signed 0 comments', output.getvalue())
@@ -3,24 +3,43 @@ This module defines unit tests for views.
 """
 
 from __future__ import unicode_literals
+import datetime
+import hashlib
+from io import BytesIO
 import json
 import logging
 import os
 import random
+import shutil
+import tempfile
 import time
+import uuid
 import warnings
+import zipfile
 
 from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command, CommandError
 from django.db import IntegrityError
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 import numpy as np
+from openpyxl import load_workbook
+import unicodecsv as csv
 
-from pcari.models import Respondent
+from pcari.models import Respondent, Location
 from pcari.models import QuantitativeQuestion, QualitativeQuestion
 from pcari.models import Comment, QuantitativeQuestionRating, CommentRating
+from pcari.models import QuantitativeQuestionSummary, ResponseRollup, ExportJob
+from pcari.models import OptionQuestion, OptionQuestionChoice
+from pcari.benchmarks import seed_database, run_benchmark, compare_reports
+from pcari.encoders import get_row_encoder
+from pcari.exports import SNAPSHOT_MODELS, WIDE_EXPORT_COLUMNS, export_csv
 from pcari.views import (generate_ratings_matrix, normalize_ratings_matrix,
-                         calculate_principal_components)
+                         calculate_principal_components, SUMMARY_REFRESH_LOCK_KEY)
 
 PAGE_ENDPOINTS = ['landing', 'quantitative-questions', 'peer-responses',
                   'rate-comments', 'personal-information', 'end']
@@ -119,6 +138,635 @@ class ResourceFetchTestCase(TestCase):
             for attribute in 'msg', 'tag', 'qid':
                 self.assertTrue(attribute in comment_data)
 
+    def test_fetch_question_ratings_page(self):
+        questions = [QuantitativeQuestion.objects.create() for _ in range(5)]
+        disabled_question = QuantitativeQuestion.objects.create(enabled=False)
+        for _ in range(random.randrange(100, 300)):
+            respondent = Respondent.objects.create()
+            for question in questions + [disabled_question]:
+                QuantitativeQuestionRating.objects.create(
+                    question=question,
+                    respondent=respondent,
+                    score=random.choice([None] + list(range(1, 7))),
+                )
+
+        response = self.client.get(reverse('fetch-question-ratings'))
+        expected = json.loads(response.content)
+        expected = {int(key): (rating['qid'], rating['score'])
+                    for key, rating in expected.items()}
+
+        actual, after, page_sizes = {}, 0, []
+        while after is not None:
+            page_response = self.client.get(reverse('fetch-question-ratings-page'),
+                                            {'after': after, 'limit': 100})
+            self.assertEqual(page_response.status_code, 200)
+            page = json.loads(page_response.content)
+            self.assertLessEqual(len(page['ids']), 100)
+            self.assertEqual(len(page['ids']), len(page['qids']))
+            self.assertEqual(len(page['ids']), len(page['scores']))
+            self.assertEqual(page['ids'], sorted(page['ids']))
+            actual.update(zip(page['ids'], zip(page['qids'], page['scores'])))
+            page_sizes.append(len(page_response.content))
+            after = page['next']
+
+        self.assertEqual(actual, expected)
+        self.assertLess(sum(page_sizes), len(response.content))
+
+        response = self.client.get(reverse('fetch-question-ratings-page'), {'after': '?'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ResponseThroughputTestCase(TestCase):
+    serialized_rollback = True
+
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.login(username='admin', password='password')
+
+    def test_fetch_response_throughput(self):
+        for language in ['en', 'en', 'tl']:
+            Respondent.objects.create(language=language)
+        ResponseRollup.objects.compact()
+
+        url = reverse('admin:response-throughput')
+        for interval in ['hour', 'day']:
+            response = self.client.get(url, {'interval': interval})
+            self.assertEqual(response.status_code, 200)
+            data = json.loads(response.content)
+            self.assertEqual(data['interval'], interval)
+            counts = {}
+            for bucket in data['buckets']:
+                self.assertEqual(bucket['model'], 'pcari.respondent')
+                self.assertEqual(bucket['channel'], 'web')
+                counts[bucket['language']] = counts.get(bucket['language'], 0) + bucket['count']
+            self.assertEqual(counts, {'en': 2, 'tl': 1})
+
+        response = self.client.get(url, {'interval': 'week'})
+        self.assertEqual(response.status_code, 400)
+
+
+class RatingsMatrixExportTestCase(TestCase):
+    serialized_rollback = True
+
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.login(username='admin', password='password')
+
+        questions = [QuantitativeQuestion.objects.create() for _ in range(4)]
+        questions.append(QuantitativeQuestion.objects.create(enabled=False))
+        for _ in range(random.randrange(10, 50)):
+            respondent = Respondent.objects.create()
+            for question in random.sample(questions, 3):
+                QuantitativeQuestionRating.objects.create(
+                    question=question,
+                    respondent=respondent,
+                    score=random.choice([None] + list(range(1, 7))),
+                )
+
+    def assert_matches_ratings_matrix(self, ratings, respondent_ids, question_ids):
+        respondent_id_map, question_id_map, expected = generate_ratings_matrix()
+        self.assertEqual(ratings.dtype, np.float32)
+        self.assertEqual(ratings.shape, expected.shape)
+        self.assertEqual(sorted(respondent_id_map), list(respondent_ids))
+        self.assertEqual(sorted(question_id_map), list(question_ids))
+        for row_index, respondent_id in enumerate(respondent_ids):
+            for column_index, question_id in enumerate(question_ids):
+                value = expected[respondent_id_map[respondent_id],
+                                 question_id_map[question_id]]
+                actual = ratings[row_index, column_index]
+                if np.isnan(value):
+                    self.assertTrue(np.isnan(actual))
+                else:
+                    self.assertEqual(actual, value)
+
+    def test_download_ratings_matrix(self):
+        url = reverse('admin:ratings-matrix')
+        response = self.client.get(url, {'format': 'npz'})
+        self.assertEqual(response.status_code, 200)
+        archive = np.load(BytesIO(b''.join(response.streaming_content)))
+        self.assert_matches_ratings_matrix(archive['ratings'], archive['respondent_ids'],
+                                           archive['question_ids'])
+
+        response = self.client.get(url, {'format': 'npy'})
+        self.assertEqual(response.status_code, 200)
+        ratings = np.load(BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(ratings.shape, archive['ratings'].shape)
+
+        response = self.client.get(url, {'format': 'csv'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_export_ratings_matrix_command(self):
+        directory = tempfile.mkdtemp()
+        try:
+            prefix = os.path.join(directory, 'ratings')
+            call_command('exportratingsmatrix', prefix + '.npy', chunk_size=7,
+                         stdout=open(os.devnull, 'w'))
+            ratings = np.load(prefix + '.npy', mmap_mode='r')
+            self.assert_matches_ratings_matrix(ratings,
+                                               np.load(prefix + '-respondent-ids.npy'),
+                                               np.load(prefix + '-question-ids.npy'))
+            del ratings
+        finally:
+            shutil.rmtree(directory)
+
+
+class DataExportTestCase(TestCase):
+    serialized_rollback = True
+
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.login(username='admin', password='password')
+
+        question = QuantitativeQuestion.objects.create(prompt='Question')
+        for index in range(10):
+            respondent = Respondent.objects.create(age=index or None, uuid=uuid.uuid4())
+            QuantitativeQuestionRating.objects.create(question=question, respondent=respondent,
+                                                      score=index % 7 or None)
+            Comment.objects.create(respondent=respondent, question=QualitativeQuestion.objects.create(),
+                                   message='\u00e9t\u00e9 "{0}",\n'.format(index))
+
+    def read_rows(self, content):
+        return list(csv.reader(BytesIO(content), encoding='utf-8'))
+
+    def test_export_action(self):
+        url = reverse('admin:pcari_quantitativequestionrating_changelist')
+        ratings = QuantitativeQuestionRating.objects.order_by('pk')
+        response = self.client.post(url, {
+            'action': 'export_selected_as_csv',
+            '_selected_action': [rating.pk for rating in ratings],
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        rows = self.read_rows(b''.join(response.streaming_content))
+        field_names = rows[0]
+        self.assertEqual(sorted(field_names), ['id', 'modified', 'question', 'respondent', 'score',
+                                              'timestamp'])
+        self.assertEqual(len(rows), ratings.count() + 1)
+        for rating, row in zip(ratings, rows[1:]):
+            row = dict(zip(field_names, row))
+            self.assertEqual(row['id'], unicode(rating.pk))
+            self.assertEqual(row['respondent'], unicode(rating.respondent_id))
+            self.assertEqual(row['question'], unicode(rating.question_id))
+            self.assertEqual(row['score'], unicode(rating.score) if rating.score is not None else '')
+
+    def test_chunks(self):
+        comments = Comment.objects.order_by('pk')
+        chunks = list(export_csv(comments.filter(pk__gt=comments[2].pk), chunk_size=3))
+        self.assertEqual(len(chunks), 4)
+        rows = self.read_rows(b''.join(chunks))
+        field_names = rows[0]
+        messages = [row[field_names.index('message')] for row in rows[1:]]
+        self.assertEqual(messages, [comment.message for comment in comments[3:]])
+
+    def test_excel_export(self):
+        url = reverse('admin:pcari_respondent_changelist')
+        respondents = Respondent.objects.order_by('pk')
+        response = self.client.post(url, {
+            'action': 'export_selected_as_xlsx',
+            '_selected_action': [respondent.pk for respondent in respondents],
+        })
+        self.assertEqual(response.status_code, 200)
+        workbook = load_workbook(BytesIO(b''.join(response.streaming_content)), read_only=True)
+        rows = [[cell.value for cell in row] for row in workbook['Respondent'].rows]
+        field_names = list(rows[0])
+        self.assertEqual(len(rows), respondents.count() + 1)
+        for respondent, row in zip(respondents, rows[1:]):
+            row = dict(zip(field_names, row))
+            self.assertEqual(row['id'], respondent.pk)
+            self.assertEqual(row['age'], respondent.age)
+            self.assertEqual(row['uuid'], unicode(respondent.uuid))
+
+    def test_wide_export(self):
+        location = Location.objects.create(country='Philippines', province='Camarines Sur')
+        Respondent.objects.update(location=location, gender='F')
+        url = reverse('admin:wide-export')
+        with self.assertNumQueries(6):  # One query per response model, after authentication
+            response = self.client.get(url)
+            rows = self.read_rows(b''.join(response.streaming_content))
+        self.assertEqual(tuple(rows[0]), WIDE_EXPORT_COLUMNS)
+        rows = [dict(zip(rows[0], row)) for row in rows[1:]]
+        self.assertEqual(len(rows), QuantitativeQuestionRating.objects.count() + Comment.objects.count())
+
+        for row in rows:
+            self.assertEqual(row['gender'], 'F')
+            self.assertEqual(row['province'], 'Camarines Sur')
+            if row['response_type'] == 'QuantitativeQuestionRating':
+                rating = QuantitativeQuestionRating.objects.get(pk=row['response_id'])
+                self.assertEqual(row['question_prompt'], 'Question')
+                self.assertEqual(row['score'], unicode(rating.score) if rating.score else '')
+                self.assertEqual(row['message'], '')
+            else:
+                comment = Comment.objects.get(pk=row['response_id'])
+                self.assertEqual(row['message'], comment.message)
+                self.assertEqual(row['respondent_uuid'], unicode(comment.respondent.uuid))
+
+    def test_row_encoder_registry(self):
+        encoder = get_row_encoder(Respondent, 'json')
+        self.assertIs(get_row_encoder(Respondent, 'json'), encoder)
+        self.assertIsNot(get_row_encoder(Respondent, 'csv'), encoder)
+        respondent = Respondent.objects.order_by('pk').first()
+        row = Respondent.objects.values_list(*encoder.field_names).get(pk=respondent.pk)
+        cells = dict(zip(encoder.field_names, encoder.encode(row)))
+        self.assertEqual(cells['uuid'], unicode(respondent.uuid))
+        self.assertEqual(cells['timestamp'], respondent.timestamp.isoformat())
+        self.assertIsNone(cells['location'])
+
+        encoder = get_row_encoder(Comment, 'jsonl', ('respondent__uuid', 'message'))
+        self.assertEqual(encoder.fields, (Respondent._meta.get_field('uuid'),
+                                          Comment._meta.get_field('message')))
+        comment = Comment.objects.order_by('pk').first()
+        line = json.loads(encoder.encode((comment.respondent.uuid, comment.message)))
+        self.assertEqual(line, {'respondent__uuid': unicode(comment.respondent.uuid),
+                                'message': comment.message})
+        self.assertRaises(ValueError, get_row_encoder, Comment, 'xml')
+
+    def test_pivoted_export(self):
+        tagged = QuantitativeQuestion.objects.create(tag='Flooding')
+        option_question = OptionQuestion.objects.create(tag='Flooding', options=['Yes', 'No'])
+        respondents = list(Respondent.objects.order_by('pk'))
+        QuantitativeQuestionRating.objects.create(question=tagged, respondent=respondents[1],
+                                                  score=3)
+        OptionQuestionChoice.objects.create(question=option_question,
+                                            respondent=respondents[2], option='No')
+        OptionQuestionChoice.objects.create(question=option_question,
+                                            respondent=respondents[3], option='')
+
+        response = self.client.get(reverse('admin:pivoted-export'))
+        rows = self.read_rows(b''.join(response.streaming_content))
+        question = QuantitativeQuestion.objects.get(prompt='Question')
+        self.assertEqual(rows[0], ['respondent_id', 'QuantitativeQuestion {0}'.format(question.pk),
+                                   'QuantitativeQuestion {0}'.format(tagged.pk),
+                                   'OptionQuestion {0}'.format(option_question.pk)])
+        self.assertEqual([row[0] for row in rows[1:]],
+                         [unicode(respondent.pk) for respondent in respondents])
+
+        respondent_id_map, question_id_map, ratings_matrix = generate_ratings_matrix()
+        for respondent, row in zip(respondents, rows[1:]):
+            scores = ratings_matrix[respondent_id_map[respondent.pk]]
+            for question_id, cell in zip([question.pk, tagged.pk], row[1:3]):
+                score = scores[question_id_map[question_id]]
+                self.assertEqual(cell, '' if np.isnan(score) else unicode(int(score)))
+        self.assertEqual([row[3] for row in rows[1:5]], ['', '', 'No', ''])
+
+        tagged.delete()
+        rows = self.read_rows(b''.join(self.client.get(reverse('admin:pivoted-export'))
+                                       .streaming_content))
+        self.assertEqual(rows[0][1:], ['QuantitativeQuestion {0}'.format(question.pk), 'Flooding'])
+
+    def test_background_export(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        url = reverse('admin:pcari_quantitativequestionrating_changelist')
+        ratings = QuantitativeQuestionRating.objects.order_by('pk')
+        data = {
+            'action': 'export_selected_as_csv',
+            '_selected_action': [rating.pk for rating in ratings],
+        }
+        expected = b''.join(self.client.post(url, data).streaming_content)
+
+        with self.settings(EXPORT_JOB_THRESHOLD=5, MEDIA_ROOT=media_root):
+            response = self.client.post(url, data)
+            self.assertEqual(response.status_code, 302)
+            job = ExportJob.objects.get()
+            self.assertEqual((job.status, job.num_rows), (ExportJob.QUEUED, ratings.count()))
+
+            call_command('runexportjobs', processes=0, once=True, stdout=BytesIO())
+            job.refresh_from_db()
+            self.assertEqual(job.status, ExportJob.FINISHED)
+            self.assertEqual(job.rows_written, ratings.count())
+            response = self.client.get(reverse('admin:pcari_exportjob_download', args=(job.pk, )))
+            self.assertEqual(b''.join(response.streaming_content), expected)
+
+            path = job.artifact.path
+            ExportJob.objects.update(finished=job.finished - datetime.timedelta(days=30))
+            call_command('runexportjobs', processes=0, once=True, stdout=BytesIO())
+            self.assertFalse(ExportJob.objects.exists())
+            self.assertFalse(os.path.exists(path))
+
+    def test_abandoned_jobs(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        os.mkdir(os.path.join(media_root, 'exports'))
+        jobs = []
+        for _ in range(2):
+            job = ExportJob(data_format='csv', status=ExportJob.RUNNING, started=timezone.now())
+            job.queryset = QuantitativeQuestionRating.objects.all()
+            job.save()
+            jobs.append(job)
+            with open(os.path.join(media_root, 'exports', '{0}-partial.csv'.format(job.pk)),
+                      'wb') as partial:
+                partial.write(b'partial')
+        stale, requeued = jobs
+
+        with self.settings(MEDIA_ROOT=media_root):
+            ExportJob.objects.filter(pk=stale.pk).update(
+                started=timezone.now() - datetime.timedelta(seconds=settings.EXPORT_JOB_TIMEOUT + 1))
+            self.assertEqual(ExportJob.objects.requeue([requeued.pk]), 1)
+            call_command('runexportjobs', processes=0, once=True, stdout=BytesIO())
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, ExportJob.FAILED)
+        self.assertIn('abandoned', stale.error)
+        requeued.refresh_from_db()
+        self.assertEqual(requeued.status, ExportJob.FINISHED)
+        self.assertEqual(os.listdir(os.path.join(media_root, 'exports')),
+                         [os.path.basename(requeued.artifact.name)])
+
+    def test_snapshot(self):
+        response = self.client.get(reverse('admin:snapshot'))
+        self.assertEqual(response.status_code, 200)
+        archive = zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+        self.assertIsNone(archive.testzip())
+        manifest = json.loads(archive.read('manifest.json'))
+        self.assertEqual(len(manifest['files']), len(SNAPSHOT_MODELS))
+        for entry in manifest['files']:
+            contents = archive.read(entry['path'])
+            self.assertEqual(entry['bytes'], len(contents))
+            self.assertEqual(entry['sha256'], hashlib.sha256(contents).hexdigest())
+            self.assertEqual(entry['rows'], len(self.read_rows(contents)) - 1)
+        entries = {entry['model']: entry for entry in manifest['files']}
+        self.assertEqual(entries['pcari.Comment']['rows'], Comment.objects.count())
+        self.assertEqual(entries['pcari.Respondent']['rows'], Respondent.objects.count())
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'snapshot.zip')
+        call_command('exportsnapshot', path, chunk_size=3, stdout=BytesIO())
+        with zipfile.ZipFile(path) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(json.loads(archive.read('manifest.json'))['files'], manifest['files'])
+
+    def test_dump_survey(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        call_command('dumpsurvey', directory, 'pcari.Comment', 'pcari.Respondent',
+                     processes=0, chunk_size=4, stdout=BytesIO())
+        self.assertEqual(sorted(os.listdir(directory)),
+                         ['pcari.comment.ndjson', 'pcari.respondent.ndjson'])
+        with open(os.path.join(directory, 'pcari.comment.ndjson'), 'rb') as dump:
+            lines = [json.loads(line) for line in dump]
+        comments = Comment.objects.order_by('pk')
+        self.assertEqual([line['id'] for line in lines], [comment.pk for comment in comments])
+        for line, comment in zip(lines, comments):
+            self.assertEqual(line['message'], comment.message)
+            self.assertEqual(line['respondent'], comment.respondent_id)
+            self.assertEqual(parse_datetime(line['timestamp']), comment.timestamp)
+
+    def read_dump(self, processes):
+        from pcari.management.commands.dumpsurvey import Command
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        command = Command()
+        command.pool_class = InlinePool
+        call_command(command, directory, processes=processes, chunk_size=4, stdout=BytesIO())
+        files = {}
+        for filename in os.listdir(directory):
+            with open(os.path.join(directory, filename), 'rb') as dump:
+                files[filename] = dump.read()
+        return files
+
+    def test_dump_survey_in_parallel(self):
+        self.assertEqual(self.read_dump(2), self.read_dump(0))
+        self.assertRaises(CommandError, call_command, 'dumpsurvey', tempfile.gettempdir(),
+                          processes=-1)
+
+
+class InlineResult(object):
+    """ The result of a task run by :class:`InlinePool`. """
+    def __init__(self, value=None, error=None):
+        self.value, self.error = value, error
+
+    def ready(self):
+        return True
+
+    def successful(self):
+        return self.error is None
+
+    def get(self):
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class InlinePool(object):
+    """
+    A pool with the interface of a process pool that runs each task as soon
+    as it is submitted, in the calling thread. The in-memory test database is
+    private to its connection, which several threads cannot use at once, so
+    commands are tested through this pool rather than real workers.
+    """
+    def __init__(self, processes, initializer=None):
+        self.processes = processes
+        if initializer is not None:
+            initializer()
+
+    def apply_async(self, func, args=()):
+        try:
+            return InlineResult(func(*args))
+        except Exception as error:  # pylint: disable=broad-except
+            return InlineResult(error=error)
+
+    def imap_unordered(self, func, iterable):
+        return (func(item) for item in iterable)
+
+    def close(self):
+        pass
+
+    def terminate(self):
+        pass
+
+    def join(self):
+        pass
+
+
+class ExportWorkerPoolTestCase(TestCase):
+    """ Run export jobs through the worker pool of ``runexportjobs``. """
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        question = QuantitativeQuestion.objects.create(prompt='Question')
+        for score in range(1, 7):
+            QuantitativeQuestionRating.objects.create(
+                question=question, respondent=Respondent.objects.create(), score=score)
+
+    def test_pool(self):
+        from pcari.management.commands.runexportjobs import Command
+        for data_format in ['csv', 'wide', 'xlsx']:
+            job = ExportJob(data_format=data_format)
+            job.queryset = QuantitativeQuestionRating.objects.all()
+            job.save()
+
+        command, stdout = Command(), BytesIO()
+        command.pool_class = InlinePool
+        with self.settings(MEDIA_ROOT=self.media_root):
+            call_command(command, processes=2, interval=0.01, once=True, stdout=stdout)
+        self.assertEqual(set(ExportJob.objects.values_list('status', 'rows_written')),
+                         {(ExportJob.FINISHED, 6)})
+        self.assertEqual(stdout.getvalue().count('Finished export job'), 3)
+        self.assertEqual(len(os.listdir(os.path.join(self.media_root, 'exports'))), 3)
+
+
+class BenchmarkTestCase(TestCase):
+    def test_seed_and_benchmark(self):
+        seed_database(12, batch_size=5)
+        self.assertEqual(Respondent.objects.count(), 12)
+        self.assertEqual(QuantitativeQuestionRating.objects.count(),
+                         12*QuantitativeQuestion.objects.count())
+        self.assertEqual(Comment.objects.count(), 12)
+        self.assertEqual(CommentRating.objects.count(), 2*(12 - 5))
+
+        result = run_benchmark('export_csv', chunk_size=7)
+        self.assertEqual(result['rows'], QuantitativeQuestionRating.objects.count())
+        self.assertGreater(result['bytes'], 0)
+        self.assertGreater(result['peak_rss_mb'], 0)
+
+        baseline = {'results': {'export_csv': dict(result, seconds=result['seconds']*2 or 1)}}
+        comparison = compare_reports(baseline, {'results': {'export_csv': result}})
+        self.assertEqual([row[:2] for row in comparison],
+                         [('export_csv', 'seconds'), ('export_csv', 'rows_per_second'),
+                          ('export_csv', 'peak_rss_mb')])
+        self.assertEqual(comparison[2][4], 0)
+
+        for name in ['encode_rows_jsonl', 'fetch_question_ratings']:
+            result = run_benchmark(name)
+            self.assertGreater(result['rows'], 0)
+            self.assertGreater(result['bytes'], result['rows'])
+
+
+class IncrementalExportTestCase(TestCase):
+    serialized_rollback = True
+
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.login(username='admin', password='password')
+        self.url = reverse('admin:incremental-export')
+
+        question = QuantitativeQuestion.objects.create()
+        start = timezone.now() - datetime.timedelta(days=1)
+        for index in range(20):
+            rating = QuantitativeQuestionRating.objects.create(
+                question=question, respondent=Respondent.objects.create(), score=index % 6 + 1)
+            # Several ratings share each timestamp to exercise tie-breaking on the primary key
+            timestamp = start + datetime.timedelta(minutes=index//3)
+            QuantitativeQuestionRating.objects.filter(pk=rating.pk).update(timestamp=timestamp,
+                                                                           modified=timestamp)
+
+    def fetch_page(self, cursor='', limit=None, data_format='jsonl'):
+        params = {'model': 'pcari.quantitativequestionrating', 'cursor': cursor,
+                  'format': data_format}
+        if limit is not None:
+            params['limit'] = limit
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        lines = b''.join(response.streaming_content).splitlines()
+        return lines, response['X-Next-Cursor']
+
+    def test_pages(self):
+        ids, cursor = [], ''
+        for _ in range(5):
+            lines, cursor = self.fetch_page(cursor, limit=7)
+            ids.extend(json.loads(line)['id'] for line in lines)
+        ratings = QuantitativeQuestionRating.objects.order_by('modified', 'pk')
+        self.assertEqual(ids, [rating.pk for rating in ratings])
+
+        lines, next_cursor = self.fetch_page(cursor)
+        self.assertEqual((lines, next_cursor), ([], cursor))
+        new_rating = QuantitativeQuestionRating.objects.create(
+            question=QuantitativeQuestion.objects.get(), respondent=Respondent.objects.create())
+        self.assertEqual(self.fetch_page(cursor)[0], [])  # Too recent
+        QuantitativeQuestionRating.objects.filter(pk=new_rating.pk).update(
+            modified=timezone.now() - datetime.timedelta(hours=1))
+        lines, _ = self.fetch_page(cursor, data_format='csv')
+        self.assertEqual(len(lines), 2)
+        self.assertIn(unicode(new_rating.pk), lines[1].split(b',')[0])
+
+    @override_settings(INCREMENTAL_EXPORT_LAG=0)
+    def test_modified_rows_exported_again(self):
+        _, cursor = self.fetch_page()
+        rating = QuantitativeQuestionRating.objects.order_by('pk').first()
+        rating.score = 7
+        rating.save()
+        lines, next_cursor = self.fetch_page(cursor)
+        self.assertEqual([(json.loads(line)['id'], json.loads(line)['score']) for line in lines],
+                         [(rating.pk, 7)])
+        self.assertEqual(self.fetch_page(next_cursor)[0], [])
+
+    def test_invalid_parameters(self):
+        for params in [{'model': 'auth.user'}, {'model': 'pcari.comment', 'cursor': 'x'},
+                       {'model': 'pcari.comment', 'limit': 0},
+                       {'model': 'pcari.comment', 'format': 'xml'}]:
+            self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+    def test_command(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        state, output = os.path.join(directory, 'state.json'), os.path.join(directory, 'out.csv')
+        label = 'pcari.quantitativequestionrating'
+        call_command('exportincremental', label, output=output, state=state,
+                     chunk_size=4, stderr=BytesIO())
+        with open(output, 'rb') as output_file:
+            self.assertEqual(len(output_file.read().splitlines()), 21)
+        with open(state) as state_file:
+            cursor = json.load(state_file)[label]
+        self.assertEqual(cursor, self.fetch_page(limit=20)[1])
+
+        call_command('exportincremental', label, output=output, state=state, stderr=BytesIO())
+        with open(output, 'rb') as output_file:
+            self.assertEqual(len(output_file.read().splitlines()), 1)
+
+
+class PeerResponsesTestCase(TestCase):
+    serialized_rollback = True
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.url = os.path.join(settings.URL_ROOT, 'en', 'peer-responses', '')
+        self.questions = [QuantitativeQuestion.objects.create(prompt='Question {0}'.format(index))
+                          for index in range(3)]
+        QuantitativeQuestion.objects.create(prompt='Disabled', enabled=False)
+        for score in [1, 2, 2, 6, QuantitativeQuestionRating.SKIPPED]:
+            QuantitativeQuestionRating.objects.create(question=self.questions[0],
+                                                      respondent=Respondent.objects.create(),
+                                                      score=score)
+
+    def test_summaries(self):
+        self.client.get(self.url)
+        summary = QuantitativeQuestionSummary.objects.get(question=self.questions[0])
+        question = QuantitativeQuestion.objects.get(pk=self.questions[0].pk)
+        self.assertEqual(summary.num_ratings, question.num_ratings)
+        self.assertAlmostEqual(summary.mean_score, question.mean_score)
+        self.assertAlmostEqual(summary.score_95ci_lower, question.score_95ci_lower)
+        self.assertAlmostEqual(summary.score_95ci_upper, question.score_95ci_upper)
+        self.assertEqual(summary.histogram, {1: 1, 2: 2, 6: 1})
+        self.assertEqual(QuantitativeQuestionSummary.objects.count(), 4)
+
+    def test_cached_page(self):
+        content = self.client.get(self.url).content
+        self.assertIn(b'Question 0', content)
+        self.assertNotIn(b'Question 1', content)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.content, content)
+
+    def test_invalidation(self):
+        self.client.get(self.url)
+        question = self.questions[0]
+        question.prompt = 'Updated'
+        question.save()
+        self.assertIn(b'Updated', self.client.get(self.url).content)
+
+    def test_one_refresh_at_a_time(self):
+        cache.add(SUMMARY_REFRESH_LOCK_KEY, True)
+        self.assertNotIn(b'Question 0', self.client.get(self.url).content)
+        self.assertFalse(QuantitativeQuestionSummary.objects.exists())
+        cache.delete(SUMMARY_REFRESH_LOCK_KEY)
+        self.assertIn(b'Question 0', self.client.get(self.url).content)
+        self.assertIsNone(cache.get(SUMMARY_REFRESH_LOCK_KEY))
+
 
 class ResponseSaveTestCase(TestCase):
     serialized_rollback = True
@@ -44,6 +44,8 @@ api_urlpatterns = [
         name='fetch-qualitative-questions'),
     url(r'^fetch/question-ratings/$', views.fetch_question_ratings,
         name='fetch-question-ratings'),
+    url(r'^fetch/question-ratings/page/$', views.fetch_question_ratings_page,
+        name='fetch-question-ratings-page'),
     url(r'^fetch/locations/$', views.fetch_locations, name='fetch-locations'),
     url(r'^save-response/$', views.save_response, name='save-response'),
 ]
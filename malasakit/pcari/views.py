@@ -11,38 +11,38 @@ These views can be broadly categorized into two groups:
 References:
   * `Django Introduction to Views <https://docs.djangoproject.com/en/dev/topics/http/views/>`_
   * `View Decorators <https://docs.djangoproject.com/en/dev/topics/http/decorators/>`_
-  * `Creating Files for Download <https://docs.djangoproject.com/en/dev/howto/outputting-csv/>`_
 """
 
 from __future__ import unicode_literals
 import datetime
 import logging
 import json
-import mimetypes
 import random
 import time
-from uuid import UUID
 
 import decorator
 from django.conf import settings
-from django.db.models import OneToOneRel
+from django.core.cache import cache
+from django.db.models import Sum, Min
+from django.db.models.functions import TruncDay, TruncHour
 from django.http import JsonResponse, HttpResponse, HttpResponseBadRequest
 from django.shortcuts import render
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.views.decorators.http import require_GET, require_POST
 from django.views.generic.base import TemplateView
-from django.utils import translation
+from django.utils import timezone, translation
 from django.utils.decorators import method_decorator
+from django.utils.dateparse import parse_datetime
 from django.utils.html import escape as escape_html
 from django.utils.translation import ugettext_lazy as _, ugettext
 import numpy as np
-from openpyxl import Workbook
-import unicodecsv as csv
 
 from pcari.models import Respondent, Location
 from pcari.models import QuantitativeQuestion, OptionQuestion, QualitativeQuestion
 from pcari.models import Comment, CommentRating, QuantitativeQuestionRating, OptionQuestionChoice
-from pcari.models import get_concrete_fields
+from pcari.models import QuantitativeQuestionSummary, ResponseRollup
+from pcari.encoders import get_row_encoder
+from pcari.signals import peer_responses_cache_key, invalidate_peer_responses
 
 __all__ = [
     'generate_ratings_matrix',
@@ -53,8 +53,9 @@ __all__ = [
     'fetch_option_questions',
     'fetch_qualitative_questions',
     'fetch_question_ratings',
+    'fetch_question_ratings_page',
+    'fetch_response_throughput',
     'save_response',
-    'export_data',
     'landing',
     'qualitative_questions',
     'peer_responses',
@@ -64,6 +65,12 @@ __all__ = [
 
 LOGGER = logging.getLogger('pcari')
 
+# The fields of each rating sent to clients, in order
+RATING_LOOKUPS = ('id', 'question', 'score')
+
+# Held in the cache while a request recomputes the question summaries
+SUMMARY_REFRESH_LOCK_KEY = 'pcari:summary-refresh-lock'
+
 
 @decorator.decorator
 def profile(function, *args, **kwargs):
@@ -400,15 +407,66 @@ def fetch_question_ratings(request):
             }
     """
     # pylint: disable=unused-argument
+    encoder = get_row_encoder(QuantitativeQuestionRating, 'json', RATING_LOOKUPS)
     ratings = QuantitativeQuestionRating.objects.filter(question__enabled=True)
     return JsonResponse({
-        unicode(rating.id): {
-            'qid': rating.question_id,
-            'score': rating.score,
-        } for rating in ratings
+        unicode(rating_id): {
+            'qid': question_id,
+            'score': score,
+        } for rating_id, question_id, score in (
+            encoder.encode(row) for row in ratings.values_list(*encoder.field_names).iterator())
     })
 
 
+@profile
+@require_GET
+def fetch_question_ratings_page(request):
+    """
+    Fetch one page of quantitative question ratings as JSON columns.
+
+    Unlike :func:`fetch_question_ratings`, ratings are paginated with a cursor
+    on the rating ID, so the size of each response is bounded. Each attribute
+    is encoded as a column, which avoids repeating keys for every rating.
+
+    Args:
+        request: May contain an `after` GET parameter, the ID of the last
+            rating of the previous page (by default, the first page is
+            fetched), and a `limit` GET parameter that specifies the maximum
+            number of ratings to fetch.
+
+    Returns:
+        A ``JsonResponse`` containing a JSON object of the form::
+
+            {
+                "ids": [<rating.id>, ...],
+                "qids": [<question.id>, ...],
+                "scores": [<rating.score>, ...],
+                "next": <cursor>
+            }
+
+        The ``i``-th element of each list describes the same rating. Ratings
+        are ordered by ID. The ``next`` cursor should be passed as the `after`
+        parameter to fetch the next page, and is ``null`` on the last page.
+    """
+    try:
+        after = int(request.GET.get('after', '0'))
+        limit = int(request.GET.get('limit', unicode(settings.DEFAULT_RATINGS_PAGE_SIZE)))
+    except ValueError as error:
+        return HttpResponseBadRequest(unicode(error))
+    limit = max(1, min(limit, settings.MAX_RATINGS_PAGE_SIZE))
+
+    encoder = get_row_encoder(QuantitativeQuestionRating, 'json', RATING_LOOKUPS)
+    ratings = QuantitativeQuestionRating.objects.filter(question__enabled=True, id__gt=after)
+    ratings = ratings.order_by('id').values_list(*encoder.field_names)[:limit]
+    ids, qids, scores = zip(*map(encoder.encode, ratings)) or ((), (), ())
+    return JsonResponse({
+        'ids': ids,
+        'qids': qids,
+        'scores': scores,
+        'next': ids[-1] if len(ids) == limit else None,
+    }, json_dumps_params={'separators': (',', ':')})
+
+
 @profile
 @require_GET
 def fetch_locations(request):
@@ -416,10 +474,67 @@ def fetch_locations(request):
     locations = Location.objects
     if request.GET.get('enabled-only', True):
         locations = locations.filter(enabled=True)
-    fields = ['country', 'province', 'municipality', 'division']
+    encoder = get_row_encoder(Location, 'json', ('country', 'province', 'municipality', 'division'))
+    rows = locations.values_list('pk', *encoder.field_names)
     return JsonResponse({
-        unicode(location.pk): {field: getattr(location, field) for field in fields}
-        for location in locations.iterator()
+        unicode(row[0]): dict(zip(encoder.field_names, encoder.encode(row[1:])))
+        for row in rows.iterator()
+    })
+
+
+@profile
+@require_GET
+def fetch_response_throughput(request):
+    """
+    Fetch the number of respondents and responses received over time as JSON.
+
+    Only :class:`pcari.models.ResponseRollup` instances are read, so the counts
+    are only as recent as the last compaction.
+
+    Args:
+        request: May contain an `interval` GET parameter, either `hour` or
+            `day` (default), that specifies the width of each bucket, and a
+            `since` GET parameter, an ISO 8601 time before which buckets are
+            omitted.
+
+    Returns:
+        A ``JsonResponse`` containing a JSON object of the form::
+
+            {
+                "interval": "<interval>",
+                "buckets": [
+                    {
+                        "start": "<ISO 8601 time>",
+                        "model": "<rollup.model>",
+                        "channel": "<rollup.channel>",
+                        "language": "<rollup.language>",
+                        "count": <number of instances>
+                    },
+                    ...
+                ]
+            }
+
+        Buckets are sorted by start time. A ``HttpResponseBadRequest`` is
+        returned if either parameter is malformed.
+    """
+    truncators = {'hour': TruncHour, 'day': TruncDay}
+    interval = request.GET.get('interval', 'day')
+    if interval not in truncators:
+        return HttpResponseBadRequest('no such interval "{0}"'.format(interval))
+
+    rollups = ResponseRollup.objects.all()
+    if 'since' in request.GET:
+        since = parse_datetime(request.GET['since'])
+        if since is None:
+            return HttpResponseBadRequest('malformed time "{0}"'.format(request.GET['since']))
+        rollups = rollups.filter(bucket__gte=since)
+
+    buckets = (rollups.annotate(start=truncators[interval]('bucket'))
+               .order_by('start').values('start', 'model', 'channel', 'language')
+               .annotate(count=Sum('count')))
+    return JsonResponse({
+        'interval': interval,
+        'buckets': [dict(bucket, start=bucket['start'].isoformat()) for bucket in buckets],
     })
 
 
@@ -578,100 +693,6 @@ def save_response(request):
     return HttpResponse()
 
 
-def select_fields_for_export(model):
-    concrete_fields = get_concrete_fields(model)
-    return [unicode(field.name) for field in concrete_fields if field
-            if not isinstance(field, OneToOneRel)]
-
-
-@profile
-def export_csv(stream, queryset):
-    """
-    Export the given ``QuerySet`` as comma-separated values to a stream.
-
-    Args:
-        stream: A ``file``-like object with a ``write`` method.
-        queryset: A Django ``QuerySet`` of instances to export.
-
-    Returns:
-        `None`. Has a side effect of writing to the ``stream``.
-    """
-    field_names = select_fields_for_export(queryset.model)
-
-    writer = csv.writer(stream, encoding='utf-8')
-    writer.writerow(field_names)
-
-    for instance in queryset.iterator():
-        row = [getattr(instance, field_name) for field_name in field_names]
-        row = [unicode(cell) if cell is not None else '' for cell in row]
-        writer.writerow(row)
-
-
-@profile
-def export_excel(stream, queryset):
-    """
-    Export the given ``QuerySet`` as an Excel spreadsheet.
-
-    Args:
-        stream: A ``file``-like object with a ``write`` method.
-        queryset: A Django ``QuerySet`` of instances to export.
-
-    Returns:
-        `None`. Has a side effect of writing to the ``stream``.
-    """
-    field_names = select_fields_for_export(queryset.model)
-
-    workbook = Workbook(write_only=True)
-    worksheet = workbook.create_sheet(queryset.model.__name__)
-    worksheet.append(field_names)
-
-    for instance in queryset.iterator():
-        row = [getattr(instance, field_name) for field_name in field_names]
-        row.append([(unicode(value) if isinstance(value, UUID) else value)
-                    for value in row])
-
-    workbook.save(stream)
-
-
-def generate_export_filename(model_name, data_format):
-    now = datetime.datetime.now()
-    return model_name + '-' + now.strftime('%Y-%m-%d') + '.' + data_format
-
-
-@profile
-def export_data(queryset, data_format='csv'):
-    """
-    Create and write data to a response as a file for download.
-
-    Args:
-        data_format (str): The file format the data should be exported as.
-            Current options are: ``csv`` (default), ``xlsx``.
-        queryset: The instances to export.
-
-    Returns:
-        An ``HttpResponse`` with the requested data as an attached file, or an
-        ``HttpResponseBadRequest`` with a status code of 400 with an invalid
-        ``data_format``.
-    """
-    export_functions = {
-        'csv': export_csv,
-        'xlsx': export_excel,
-    }
-    try:
-        export = export_functions[data_format]
-    except KeyError:
-        return HttpResponseBadRequest('no such data format "{0}"'.format(data_format))
-
-    model_name = queryset.model.__name__
-    filename = generate_export_filename(model_name, data_format)
-    content_type, _ = mimetypes.guess_type(filename)
-
-    response = HttpResponse(content_type=content_type)
-    response['Content-Disposition'] = 'attachment; filename="{0}"'.format(filename)
-    export(response, queryset)
-    return response
-
-
 @method_decorator(profile, name='dispatch')
 @method_decorator(ensure_csrf_cookie, name='dispatch')
 class CSRFTemplateView(TemplateView):
@@ -686,14 +707,61 @@ def landing(request):
     return render(request, 'landing.html', context)
 
 
+def refresh_question_summaries():
+    """
+    Recompute every quantitative question summary and evict the pages that
+    show them.
+
+    Returns:
+        int: The number of summaries written.
+    """
+    num_summaries = QuantitativeQuestionSummary.objects.refresh()
+    invalidate_peer_responses()
+    return num_summaries
+
+
 @profile
 @ensure_csrf_cookie
 def peer_responses(request):
-    """ Render a page showing respondents how others rated the quantitative questions. """
-    questions = QuantitativeQuestion.objects.filter(enabled=True)
-    questions = [question for question in questions if question.num_ratings]
-    context = {'questions': questions}
-    return render(request, 'peer-responses.html', context)
+    """
+    Render a page showing respondents how others rated the quantitative questions.
+
+    The rendered page is identical for every visitor in a language, so it is
+    cached per language until the question summaries it shows change or
+    ``settings.PEER_RESPONSES_CACHE_TIMEOUT`` seconds elapse. Stale summaries
+    are recomputed on a cache miss by one request at a time: concurrent
+    misses render the stale summaries without caching them, rather than
+    recomputing them too.
+
+    The page cache, and the lock on recomputing summaries, only span
+    processes if ``CACHES`` names a backend shared by every process (for
+    instance, memcached). With the default per-process cache, each process
+    may recompute the summaries once per timeout, and pages cached in other
+    processes are only evicted once the timeout passes.
+    """
+    key = peer_responses_cache_key(translation.get_language())
+    content = cache.get(key)
+    if content is None:
+        cacheable = True
+        oldest = QuantitativeQuestionSummary.objects.aggregate(oldest=Min('last_updated'))
+        expiry = timezone.now() - datetime.timedelta(seconds=settings.PEER_RESPONSES_CACHE_TIMEOUT)
+        if oldest['oldest'] is None or oldest['oldest'] < expiry:
+            # ``add`` only succeeds if the key is absent, so the lock has one holder
+            if cache.add(SUMMARY_REFRESH_LOCK_KEY, True, settings.SUMMARY_REFRESH_LOCK_TIMEOUT):
+                try:
+                    refresh_question_summaries()
+                finally:
+                    cache.delete(SUMMARY_REFRESH_LOCK_KEY)
+            else:
+                cacheable = False
+        summaries = QuantitativeQuestionSummary.objects.filter(question__enabled=True,
+                                                               num_ratings__gt=0)
+        summaries = summaries.select_related('question').order_by('question_id')
+        context = {'summaries': summaries}
+        content = render(request, 'peer-responses.html', context).content
+        if cacheable:
+            cache.set(key, content, settings.PEER_RESPONSES_CACHE_TIMEOUT)
+    return HttpResponse(content)
 
 
 @profile
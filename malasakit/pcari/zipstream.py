@@ -0,0 +1,138 @@
+"""
+This module defines a ZIP archive writer that generates the archive as it is
+being read, so large archives can be streamed to a client without first being
+written to memory or disk.
+
+Python's ``zipfile`` module needs a seekable file to fill in the sizes and
+checksum of each member after compressing it. Instead, this writer sets bit 3
+of each member's flags and appends a data descriptor carrying those values,
+which every common unarchiver (and ``zipfile`` itself) understands.
+
+References:
+  * `ZIP File Format Specification <https://pkware.cachefly.net/webdocs/casestudies/APPNOTE.TXT>`_
+"""
+
+from __future__ import unicode_literals
+import struct
+import time
+import zipfile
+import zlib
+
+__all__ = ['ZipStream']
+
+# General purpose flags: sizes follow the data (bit 3), names are UTF-8 (bit 11)
+FLAG_DATA_DESCRIPTOR = 0x08
+FLAG_UTF8 = 0x800
+DATA_DESCRIPTOR_SIGNATURE = b'PK\x07\x08'
+STRUCT_DATA_DESCRIPTOR = b'<4s3L'
+ZIP_VERSION = 20
+MAX_SIZE = 0xFFFFFFFF
+
+
+def to_dos_time(timestamp):
+    """ Convert a Unix timestamp into the date and time fields of a ZIP header. """
+    year, month, day, hours, minutes, seconds = time.localtime(timestamp)[:6]
+    year = max(year, 1980)
+    dos_date = (year - 1980) << 9 | month << 5 | day
+    dos_time = hours << 11 | minutes << 5 | seconds//2
+    return dos_date, dos_time
+
+
+class ZipStream(object):
+    """
+    A ``ZipStream`` generates the bytes of a deflated ZIP archive one member at
+    a time.
+
+    Usage::
+
+        archive = ZipStream()
+        for data in archive.write('data.csv', chunks):
+            output.write(data)
+        for data in archive.close():
+            output.write(data)
+
+    Zip64 extensions are not implemented, so no member or archive may exceed
+    4 GiB.
+
+    Attributes:
+        offset (int): The number of bytes generated so far.
+        members (list): A ``dict`` for each member written, with the keys
+            ``name``, ``crc``, ``compressed_size``, ``size``, ``offset``,
+            ``date`` and ``time``.
+    """
+    def __init__(self, compression_level=6):
+        self.compression_level = compression_level
+        self.offset = 0
+        self.members = []
+
+    def _emit(self, data):
+        self.offset += len(data)
+        if self.offset > MAX_SIZE:
+            raise ValueError('archive exceeds 4 GiB (Zip64 is unsupported)')
+        return data
+
+    def write(self, name, chunks, timestamp=None):
+        """
+        Generate the bytes of an archive member.
+
+        Args:
+            name (str): The path of the member within the archive.
+            chunks: An iterable of byte strings whose concatenation is the
+                contents of the member. The chunks are consumed lazily.
+            timestamp (float): The modification time of the member, as a Unix
+                timestamp. Defaults to the current time.
+
+        Returns:
+            A generator of byte strings.
+        """
+        encoded_name = name.encode('utf-8')
+        dos_date, dos_time = to_dos_time(time.time() if timestamp is None else timestamp)
+        member = {'name': name, 'offset': self.offset, 'date': dos_date, 'time': dos_time}
+
+        yield self._emit(struct.pack(
+            zipfile.structFileHeader, zipfile.stringFileHeader, ZIP_VERSION, 0,
+            FLAG_DATA_DESCRIPTOR | FLAG_UTF8, zipfile.ZIP_DEFLATED, dos_time, dos_date,
+            0, 0, 0, len(encoded_name), 0,
+        ) + encoded_name)
+
+        compressor = zlib.compressobj(self.compression_level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        crc, size, compressed_size = 0, 0, 0
+        for chunk in chunks:
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            data = compressor.compress(chunk)
+            if data:
+                compressed_size += len(data)
+                yield self._emit(data)
+        data = compressor.flush()
+        compressed_size += len(data)
+        yield self._emit(data)
+        if size > MAX_SIZE:
+            raise ValueError('member "{0}" exceeds 4 GiB (Zip64 is unsupported)'.format(name))
+
+        member.update(crc=crc & 0xFFFFFFFF, size=size, compressed_size=compressed_size)
+        self.members.append(member)
+        yield self._emit(struct.pack(STRUCT_DATA_DESCRIPTOR, DATA_DESCRIPTOR_SIGNATURE,
+                                     member['crc'], compressed_size, size))
+
+    def close(self):
+        """
+        Generate the central directory, which ends the archive.
+
+        Returns:
+            A generator of byte strings.
+        """
+        directory_offset = self.offset
+        for member in self.members:
+            encoded_name = member['name'].encode('utf-8')
+            yield self._emit(struct.pack(
+                zipfile.structCentralDir, zipfile.stringCentralDir, ZIP_VERSION, 0,
+                ZIP_VERSION, 0, FLAG_DATA_DESCRIPTOR | FLAG_UTF8, zipfile.ZIP_DEFLATED,
+                member['time'], member['date'], member['crc'], member['compressed_size'],
+                member['size'], len(encoded_name), 0, 0, 0, 0, 0, member['offset'],
+            ) + encoded_name)
+        yield self._emit(struct.pack(
+            zipfile.structEndArchive, zipfile.stringEndArchive, 0, 0,
+            len(self.members), len(self.members), self.offset - directory_offset,
+            directory_offset, 0,
+        ))